@@ -4,19 +4,28 @@
 from __future__ import annotations
 
 import os
+import base64
+import codecs
+import gzip
+import http.client
 import json
+import queue
+import socket
+import ssl
+import stat
+import struct
+import tempfile
+import threading
+import time
+import urllib.request
+import zlib
+from collections import deque
+from datetime import datetime, timezone
 from pathlib import Path
+from typing import BinaryIO
+from urllib.parse import SplitResult, unquote, urlsplit
 from ansible.plugins.callback import CallbackBase
 
-try:
-    # stdlib http to avoid external deps
-    from urllib.request import Request, urlopen
-    from urllib.error import URLError, HTTPError
-except Exception:  # pragma: no cover
-    Request = None  # type: ignore
-    urlopen = None  # type: ignore
-    URLError = HTTPError = Exception  # type: ignore
-
 DOCUMENTATION = r'''
 callback: dashboard_log
 type: notification
@@ -81,11 +90,520 @@ options:
         key: dashboard_log_file
     type: path
     default: ./ansible.last.log
+  dashboard_queue_size:
+    description:
+      - Maximum number of log lines and progress updates waiting for the background sender. Updates beyond
+        this are dropped so a slow or unreachable dashboard never holds up the playbook; job start and
+        completion calls are always queued.
+    env:
+      - name: DASHBOARD_QUEUE_SIZE
+    ini:
+      - section: callback_dashboard_log
+        key: queue_size
+    type: int
+    default: 10000
+  dashboard_drain_timeout:
+    description:
+      - Seconds to wait at the end of the run for queued API calls to be delivered.
+    env:
+      - name: DASHBOARD_DRAIN_TIMEOUT
+    ini:
+      - section: callback_dashboard_log
+        key: drain_timeout
+    type: float
+    default: 10
+  dashboard_batch_linger_ms:
+    description:
+      - How long the sender keeps collecting log lines and progress updates for a job before sending them
+        as one request.
+    env:
+      - name: DASHBOARD_BATCH_LINGER_MS
+    ini:
+      - section: callback_dashboard_log
+        key: batch_linger_ms
+    type: int
+    default: 100
+  dashboard_batch_max_lines:
+    description:
+      - Send a batch as soon as it holds this many lines.
+    env:
+      - name: DASHBOARD_BATCH_MAX_LINES
+    ini:
+      - section: callback_dashboard_log
+        key: batch_max_lines
+    type: int
+    default: 500
+  dashboard_batch_max_bytes:
+    description:
+      - Send a batch as soon as its lines add up to this many characters.
+    env:
+      - name: DASHBOARD_BATCH_MAX_BYTES
+    ini:
+      - section: callback_dashboard_log
+        key: batch_max_bytes
+    type: int
+    default: 262144
+  dashboard_compress:
+    description:
+      - Gzip request bodies of at least O(dashboard_compress_min_bytes) when the dashboard supports it.
+    env:
+      - name: DASHBOARD_COMPRESS
+    ini:
+      - section: callback_dashboard_log
+        key: compress
+    type: bool
+    default: false
+  dashboard_compress_min_bytes:
+    description:
+      - Smallest JSON body, in bytes, that is gzip-compressed when O(dashboard_compress) is enabled.
+    env:
+      - name: DASHBOARD_COMPRESS_MIN_BYTES
+    ini:
+      - section: callback_dashboard_log
+        key: compress_min_bytes
+    type: int
+    default: 4096
+  dashboard_buffer_max_bytes:
+    description:
+      - Size cap for the in-memory copy of the run kept for the end-of-run fallback upload, and for lines
+        held while the job ID is still unknown. The oldest lines are dropped once it is reached.
+    env:
+      - name: DASHBOARD_BUFFER_MAX_BYTES
+    ini:
+      - section: callback_dashboard_log
+        key: buffer_max_bytes
+    type: int
+    default: 8388608
+  dashboard_buffer_spill:
+    description:
+      - Instead of dropping the oldest buffered lines, compress them into an anonymous temporary file.
+    env:
+      - name: DASHBOARD_BUFFER_SPILL
+    ini:
+      - section: callback_dashboard_log
+        key: buffer_spill
+    type: bool
+    default: false
+  dashboard_scope_sample:
+    description:
+      - Number of host names listed in a derived scope; larger plays are summarised with a count.
+    env:
+      - name: DASHBOARD_SCOPE_SAMPLE
+    ini:
+      - section: callback_dashboard_log
+        key: scope_sample
+    type: int
+    default: 20
+  dashboard_failure_artifacts:
+    description:
+      - Upload the full result of each failed or unreachable task once, gzip-compressed, as a job artifact
+        the dashboard serves on demand. The log then carries only a truncated preview and the artifact URL.
+      - Needs a dashboard that advertises the C(artifacts) capability; otherwise only the preview is sent.
+    env:
+      - name: DASHBOARD_FAILURE_ARTIFACTS
+    ini:
+      - section: callback_dashboard_log
+        key: failure_artifacts
+    type: bool
+    default: false
+  dashboard_relay_socket:
+    description:
+      - Unix socket of a local C(dashboard_relay.py) daemon (shipped in the C(ansible/) directory). When set and
+        the socket exists, API calls and log updates go through the relay, which merges the output of every
+        playbook on the control node into batched uploads over one connection. Without it, or if the relay
+        stops answering, the plugin talks to the dashboard directly.
+    env:
+      - name: DASHBOARD_RELAY_SOCKET
+    ini:
+      - section: callback_dashboard_log
+        key: relay_socket
 '''
 CALLBACK_VERSION = 2.0
 CALLBACK_TYPE = 'notification'
 CALLBACK_NAME = 'dashboard_log'
 
+# Preview sizes for task results in the log stream, in characters.
+FAILURE_PREVIEW_CHARS = 1000
+SHORT_RESULT_CHARS = 500
+SHORT_RESULT_KEYS = ("changed", "msg", "rc", "stdout", "stderr", "failed", "skipped")
+
+# Errors showing that a kept-alive connection was closed before the request was
+# answered; only these are retried (RemoteDisconnected is a ConnectionResetError).
+STALE_CONNECTION_ERRORS = (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError)
+
+# How long a GET /api/capabilities answer is trusted, in seconds (as in the relay),
+# so a dashboard that was down or upgraded mid-run is asked again.
+CAPABILITIES_TTL = 60.0
+
+# The only play variables the plugin reads; see CallbackModule._play_settings.
+PLAY_SETTING_KEYS = ('dashboard_url', 'dashboard_job_name', 'dashboard_scope', 'dashboard_triggered_by')
+
+
+class _LogBuffer:
+    """
+    Console-style copy of the run for the end-of-run fallback upload, capped at
+    `max_bytes`. Past the cap the oldest lines are dropped or, with `spill`,
+    compressed into an anonymous temp file that iter_chunks() replays first.
+    """
+
+    def __init__(self, max_bytes: int = 8 * 1024 * 1024, spill: bool = False):
+        self._max_bytes = max(1, max_bytes)
+        self._spill = spill
+        self._lines: deque[str] = deque()
+        self._size = 0
+        self._file: BinaryIO | None = None
+        self._compressor: zlib._Compress | None = None
+        self._lock = threading.Lock()
+        self.dropped = 0
+
+    def __bool__(self) -> bool:
+        return bool(self._lines) or self._file is not None
+
+    def append(self, text: str):
+        with self._lock:
+            self._lines.append(text)
+            self._size += len(text) + 1
+            while self._size > self._max_bytes and len(self._lines) > 1:
+                old = self._lines.popleft()
+                self._size -= len(old) + 1
+                self._evict(old)
+
+    def _evict(self, line: str):
+        if self._spill:
+            try:
+                if self._file is None or self._compressor is None:
+                    self._file = tempfile.TemporaryFile(prefix='dashboard_log_')
+                    self._compressor = zlib.compressobj(6)
+                self._file.write(self._compressor.compress(f"{line}\n".encode('utf-8', 'replace')))
+                return
+            except Exception:
+                pass
+        self.dropped += 1
+
+    def clear(self):
+        with self._lock:
+            self._lines.clear()
+            self._size = 0
+            self.dropped = 0
+            if self._file is not None:
+                try:
+                    self._file.close()
+                except Exception:
+                    pass
+            self._file = None
+            self._compressor = None
+
+    def iter_chunks(self, chunk_size: int = 7000):
+        """Yield the buffered text in pieces of at most `chunk_size` characters."""
+        return _chunk_text(self._iter_text(), chunk_size)
+
+    def _iter_text(self):
+        with self._lock:
+            dropped = self.dropped
+            lines = list(self._lines)
+            spilled = self._file
+            if spilled is not None:
+                # Sync-flush so everything spilled so far is readable while
+                # further lines can still be appended to the same stream.
+                spilled.write(self._compressor.flush(zlib.Z_SYNC_FLUSH))
+                end = spilled.tell()
+        if dropped:
+            yield f"[dashboard_log] {dropped} earlier line(s) dropped to stay within the buffer limit\n"
+        if spilled is not None:
+            inflater = zlib.decompressobj()
+            decoder = codecs.getincrementaldecoder('utf-8')('replace')
+            position = 0
+            while position < end:
+                with self._lock:
+                    spilled.seek(position)
+                    block = spilled.read(min(64 * 1024, end - position))
+                    spilled.seek(0, os.SEEK_END)
+                position += len(block)
+                text = decoder.decode(inflater.decompress(block))
+                if text:
+                    yield text
+        for line in lines:
+            yield f"{line}\n"
+
+
+def _chunk_text(pieces, chunk_size: int):
+    parts: list[str] = []
+    length = 0
+    for piece in pieces:
+        while piece:
+            take = piece[:chunk_size - length]
+            piece = piece[len(take):]
+            parts.append(take)
+            length += len(take)
+            if length >= chunk_size:
+                yield ''.join(parts)
+                parts, length = [], 0
+    if parts:
+        yield ''.join(parts)
+
+
+
+def _iter_json(value, cap: int, depth: int = 0):
+    """Yield JSON text for `value` piece by piece; strings are cut to `cap` characters."""
+    if isinstance(value, str):
+        yield json.dumps(value[:cap])
+    elif value is None or isinstance(value, (bool, int, float)):
+        yield json.dumps(value)
+    elif isinstance(value, (bytes, bytearray)):
+        yield json.dumps(bytes(value[:cap]).decode('utf-8', 'replace'))
+    elif depth >= 32:
+        yield '"..."'
+    elif isinstance(value, dict):
+        yield '{'
+        for index, (key, item) in enumerate(value.items()):
+            yield f"{', ' if index else ''}{json.dumps(str(key)[:cap])}: "
+            yield from _iter_json(item, cap, depth + 1)
+        yield '}'
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        yield '['
+        for index, item in enumerate(value):
+            if index:
+                yield ', '
+            yield from _iter_json(item, cap, depth + 1)
+        yield ']'
+    else:
+        yield json.dumps(str(value)[:cap])
+
+
+def _bounded_json(value, limit: int) -> str:
+    """
+    JSON text for `value` cut to `limit` characters, with '...' appended when cut.
+    The walk stops once the budget is spent, so a failed task with a huge stdout
+    costs about as much as the preview instead of a dump of the whole result.
+    """
+    parts: list[str] = []
+    size = 0
+    for piece in _iter_json(value, limit):
+        if size + len(piece) > limit:
+            parts.append(piece[:limit - size])
+            parts.append('...')
+            break
+        parts.append(piece)
+        size += len(piece)
+    return ''.join(parts)
+
+
+# Framing shared with ansible/dashboard_relay.py: `!II` (header length, body
+# length), a JSON header, then the raw body.
+_FRAME_PREFIX = struct.Struct('!II')
+
+
+def _send_frame(sock, header: dict, body: bytes = b''):
+    data = json.dumps(header).encode('utf-8')
+    sock.sendall(_FRAME_PREFIX.pack(len(data), len(body)) + data + body)
+
+
+def _recv_exact(sock, size: int) -> bytes:
+    parts = []
+    while size:
+        chunk = sock.recv(min(size, 1024 * 1024))
+        if not chunk:
+            raise ConnectionError('dashboard relay closed the connection')
+        parts.append(chunk)
+        size -= len(chunk)
+    return b''.join(parts)
+
+
+def _recv_frame(sock) -> tuple[dict, bytes]:
+    header_len, body_len = _FRAME_PREFIX.unpack(_recv_exact(sock, _FRAME_PREFIX.size))
+    header = json.loads(_recv_exact(sock, header_len).decode('utf-8'))
+    return header, _recv_exact(sock, body_len) if body_len else b''
+
+
+class _RelayResponseLost(ConnectionError):
+    """The relay took a request but its answer never came; it may have reached the dashboard."""
+
+
+class _RelayClient:
+    """
+    Connection to a local dashboard_relay daemon. Updates are written and
+    forgotten; requests wait for the relay's response frame. Only the sender
+    thread uses it.
+    """
+
+    def __init__(self, path: str, timeout: float = 30.0):
+        info = os.stat(path)
+        # Never hand the run's output to a socket another user could have planted.
+        if not stat.S_ISSOCK(info.st_mode) or info.st_uid not in (os.getuid(), 0):
+            raise OSError(f"{path} is not a relay socket owned by this user")
+        self._sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._sock.settimeout(timeout)
+        try:
+            self._sock.connect(path)
+            _send_frame(self._sock, {'op': 'hello'})
+            header, _ = _recv_frame(self._sock)
+        except Exception:
+            self._sock.close()
+            raise
+        self.url = str(header.get('url') or '').rstrip('/')
+        self._next_id = 0
+
+    def send_update(self, job_id: int, lines: list, progress: int | None, results: list):
+        header = {
+            'op': 'update',
+            'job_id': int(job_id),
+            'lines': [{'message': text, 'level': level or 'info', 'ts': ts} for text, level, ts in lines],
+        }
+        if progress is not None:
+            header['progress'] = progress
+        if results:
+            header['task_results'] = results
+        _send_frame(self._sock, header)
+
+    def request(self, method: str, path: str, body: bytes | None, headers: dict):
+        """Forward one API call; returns (status, body) like _request, or None if the dashboard was unreachable."""
+        self._next_id += 1
+        _send_frame(self._sock, {'op': 'request', 'id': self._next_id, 'method': method, 'path': path, 'headers': headers}, body or b'')
+        try:
+            while True:
+                header, content = _recv_frame(self._sock)
+                if header.get('op') == 'response' and header.get('id') == self._next_id:
+                    break
+        except Exception as exc:
+            raise _RelayResponseLost(f"no answer from the dashboard relay: {exc}") from exc
+        status = int(header.get('status') or 0)
+        return (status, content) if status else None
+
+    def close(self):
+        try:
+            self._sock.close()
+        except Exception:
+            pass
+
+
+class _DashboardSender:
+    """
+    Daemon thread delivering queued API calls so callback hooks never wait on the network.
+
+    Log lines, task results and progress values for a job are coalesced: the worker keeps
+    collecting them until `linger` seconds pass, `max_lines` or `max_bytes` is
+    reached, or a plain API call (job start/complete) arrives, then hands the
+    whole run to `send_updates` in one go. Queue order is preserved throughout.
+    """
+
+    def __init__(self, post, send_updates, maxsize: int = 10000, linger: float = 0.1,
+                 max_lines: int = 500, max_bytes: int = 256 * 1024):
+        self._post = post
+        self._send_updates = send_updates
+        # Unbounded so job start/complete calls are never refused; only updates
+        # count against `maxsize`.
+        self._queue: queue.Queue = queue.Queue()
+        self._maxsize = max(1, maxsize)
+        self._linger = max(0.0, linger)
+        self._max_lines = max(1, max_lines)
+        self._max_bytes = max(1, max_bytes)
+        self._thread = None
+        self._lock = threading.Lock()
+        self.dropped = 0
+
+    def submit(self, url: str, payload: dict, on_response=None, expect_json: bool = False):
+        self._ensure_thread()
+        self._queue.put_nowait(('call', url, payload, on_response, expect_json))
+
+    def submit_task(self, fn):
+        """Run `fn` on the sender thread, in queue order; for work too slow for a callback hook."""
+        self._ensure_thread()
+        self._queue.put_nowait(('task', fn))
+
+    def submit_update(self, job_id: int, text: str | None, level: str, progress: int | None,
+                      result: dict | None = None) -> bool:
+        self._ensure_thread()
+        if self._queue.qsize() >= self._maxsize:
+            self.dropped += 1
+            return False
+        ts = datetime.now(timezone.utc).isoformat() if text is not None else None
+        self._queue.put_nowait(('update', int(job_id), text, level, progress, ts, result))
+        return True
+
+    def drain(self, deadline: float) -> bool:
+        """Wait until every queued call has been attempted or `deadline` (monotonic) passes."""
+        with self._queue.all_tasks_done:
+            while self._queue.unfinished_tasks:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._queue.all_tasks_done.wait(remaining)
+        return True
+
+    def _ensure_thread(self):
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run, name='dashboard-log-sender', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        carry = None
+        while True:
+            item = carry if carry is not None else self._queue.get()
+            carry = None
+            if item[0] != 'update':
+                self._call(item)
+                continue
+            carry = self._coalesce(item)
+
+    def _call(self, item):
+        try:
+            if item[0] == 'task':
+                item[1]()
+                return
+            _, url, payload, on_response, expect_json = item
+            response = self._post(url, payload, expect_json=expect_json)
+            if on_response is not None:
+                on_response(response)
+        except Exception:
+            pass
+        finally:
+            self._queue.task_done()
+
+    def _coalesce(self, first):
+        """Send one batch of updates for first's job; return the item that ended it, if any."""
+        job_id = first[1]
+        lines = []
+        results = []
+        progress = None
+        size = 0
+        taken = 0
+        deadline = time.monotonic() + self._linger
+        item = first
+        carry = None
+        while True:
+            _, _, text, level, value, ts, result = item
+            taken += 1
+            if text is not None:
+                lines.append((text, level, ts))
+                size += len(text)
+            if result is not None:
+                results.append(result)
+            if value is not None:
+                progress = value
+            if len(lines) + len(results) >= self._max_lines or size >= self._max_bytes:
+                break
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item[0] != 'update' or item[1] != job_id:
+                carry = item
+                break
+        try:
+            self._send_updates(job_id, lines, progress, results)
+        except Exception:
+            pass
+        finally:
+            for _ in range(taken):
+                self._queue.task_done()
+        return carry
+
+
 class CallbackModule(CallbackBase):
     def __init__(self):  # noqa: D401
         super().__init__()
@@ -94,18 +612,54 @@ class CallbackModule(CallbackBase):
         self.dashboard_url = self._get_setting('DASHBOARD_URL', 'http://localhost:8000')
         self.log_file = self._get_setting('DASHBOARD_LOG_FILE', './ansible.last.log')
         self.job_id = None
-        self._buffer = []  # fallback buffer if log_file is missing
-        self._pending_lines = []
+        self._buffer_max_bytes = self._int_setting('DASHBOARD_BUFFER_MAX_BYTES', 8 * 1024 * 1024)
+        self._buffer_spill = self._get_setting('DASHBOARD_BUFFER_SPILL', 'false').strip().lower() in ('1', 'true', 'yes', 'on')
+        self._buffer = _LogBuffer(self._buffer_max_bytes, self._buffer_spill)  # fallback buffer if log_file is missing
+        # Lines waiting for a job_id; capped at the same size as the buffer.
+        self._pending_lines: deque[tuple[str, str]] = deque()
+        self._pending_bytes = 0
+        self._pending_dropped = 0
+        # Task result events waiting for a job_id; capped at DASHBOARD_QUEUE_SIZE.
+        self._pending_results: list[dict] = []
+        # Guards _pending_lines and _pending_results: the sender thread queues messages when a job start returns.
+        self._pending_lock = threading.RLock()
         self._sent_any = False
         self._job_started = False
-        self._progress_total = 0
-        self._tasks_started = 0
-        self._last_progress_sent = 0
-        self._seen_play_uids = set()
+        self._job_start_pending = False
+        self._queue_size = self._int_setting('DASHBOARD_QUEUE_SIZE', 10000)
+        self._drain_timeout = self._float_setting('DASHBOARD_DRAIN_TIMEOUT', 10.0)
+        self._batch_linger_ms = self._int_setting('DASHBOARD_BATCH_LINGER_MS', 100)
+        self._batch_max_lines = self._int_setting('DASHBOARD_BATCH_MAX_LINES', 500)
+        self._batch_max_bytes = self._int_setting('DASHBOARD_BATCH_MAX_BYTES', 256 * 1024)
+        self._sender = None
+        self._compress = self._get_setting('DASHBOARD_COMPRESS', 'false').strip().lower() in ('1', 'true', 'yes', 'on')
+        self._compress_min_bytes = self._int_setting('DASHBOARD_COMPRESS_MIN_BYTES', 4096)
+        # (host, task uuid) -> when the host started the task, for task result events
+        self._result_starts: dict[tuple[str, str | None], str] = {}
+        self._failure_artifacts = self._get_setting('DASHBOARD_FAILURE_ARTIFACTS', 'false').strip().lower() in ('1', 'true', 'yes', 'on')
+        self._artifact_count = 0
+        # dashboard base URL -> (features from GET /api/capabilities, monotonic time fetched)
+        self._capability_cache: dict[str, tuple[set[str], float]] = {}
+        # (scheme, host:port) -> kept-alive connection. Only the sender thread
+        # talks to the dashboard, so these are never shared between threads.
+        self._connections: dict[tuple[str, str], http.client.HTTPConnection] = {}
+        # (scheme, host:port) -> Proxy-Authorization headers, for plain-HTTP hosts
+        # reached through a forward proxy (HTTP_PROXY).
+        self._forward_proxies: dict[tuple[str, str], dict[str, str]] = {}
+        self._relay_socket = self._get_setting('DASHBOARD_RELAY_SOCKET')
+        # None until first used, False once the relay is missing or has failed this run.
+        self._relay = None
+        self._reset_progress()
+        # (role path, tasks_from) -> task count, shared by every play using the role
+        self._role_task_counts: dict = {}
         self._failed = False
         self._job_name_override = self._get_setting('DASHBOARD_JOB_NAME')
         self._scope_override = self._get_setting('DASHBOARD_SCOPE')
         self._trigger_override = self._get_setting('DASHBOARD_TRIGGERED_BY')
+        self._scope_sample = self._int_setting('DASHBOARD_SCOPE_SAMPLE', 20)
+        # play key -> resolved dashboard_* settings / host summary, so each play is looked up once
+        self._play_settings_cache: dict = {}
+        self._host_summary_cache: dict = {}
         self.playbook_dir = None
         self._options_applied = False
 
@@ -141,6 +695,31 @@ class CallbackModule(CallbackBase):
                 self._trigger_override = triggered_by
         except Exception:
             pass
+        try:
+            relay_socket = self.get_option('dashboard_relay_socket')
+            if relay_socket:
+                self._relay_socket = relay_socket
+        except Exception:
+            pass
+        for option, attr, cast in (
+            ('dashboard_queue_size', '_queue_size', int),
+            ('dashboard_drain_timeout', '_drain_timeout', float),
+            ('dashboard_batch_linger_ms', '_batch_linger_ms', int),
+            ('dashboard_batch_max_lines', '_batch_max_lines', int),
+            ('dashboard_batch_max_bytes', '_batch_max_bytes', int),
+            ('dashboard_compress', '_compress', bool),
+            ('dashboard_compress_min_bytes', '_compress_min_bytes', int),
+            ('dashboard_buffer_max_bytes', '_buffer_max_bytes', int),
+            ('dashboard_buffer_spill', '_buffer_spill', bool),
+            ('dashboard_scope_sample', '_scope_sample', int),
+            ('dashboard_failure_artifacts', '_failure_artifacts', bool),
+        ):
+            try:
+                value = self.get_option(option)
+                if value is not None:
+                    setattr(self, attr, cast(value))
+            except Exception:
+                pass
         self._options_applied = True
 
     def v2_playbook_on_start(self, playbook):
@@ -163,13 +742,20 @@ class CallbackModule(CallbackBase):
             self.playbook_dir = None
         self.job_id = None
         self._job_started = False
+        self._job_start_pending = False
         self._failed = False
-        self._progress_total = 0
-        self._tasks_started = 0
-        self._last_progress_sent = 0
-        self._seen_play_uids = set()
-        self._buffer = []
-        self._pending_lines = []
+        self._artifact_count = 0
+        self._result_starts = {}
+        self._reset_progress()
+        self._play_settings_cache = {}
+        self._host_summary_cache = {}
+        self._buffer.clear()
+        self._buffer = _LogBuffer(self._buffer_max_bytes, self._buffer_spill)
+        with self._pending_lock:
+            self._pending_lines = deque()
+            self._pending_bytes = 0
+            self._pending_dropped = 0
+            self._pending_results = []
         self._sent_any = False
 
     def v2_playbook_on_play_start(self, play):
@@ -211,8 +797,12 @@ class CallbackModule(CallbackBase):
                 self._emit(line)
         except Exception:
             pass
-        # Determine log content (prefer our generated console-style buffer)
-        log_text = "\n".join(self._buffer) or self._read_log_file()
+        # One deadline covers every wait below so a slow or unreachable dashboard
+        # can only add DASHBOARD_DRAIN_TIMEOUT to the run.
+        deadline = time.monotonic() + max(0.0, self._drain_timeout)
+        if self._job_start_pending and self._sender is not None:
+            # Let an in-flight job start return so its job_id can be used below.
+            self._sender.drain(deadline)
 
         # Refresh job_id at the end using all mechanisms (custom stats > file > env)
         if not self.job_id:
@@ -225,8 +815,8 @@ class CallbackModule(CallbackBase):
 
         # If streaming never happened (e.g. job_id appeared very late), fall back to
         # sending the combined log output once.
-        if not self._sent_any and log_text and job_id:
-            self._post_log_chunks(job_id, log_text)
+        if not self._sent_any and job_id:
+            self._post_log_chunks(job_id, self._fallback_chunks())
 
         # Always mark completion if we managed to create a job.
         if job_id:
@@ -237,7 +827,14 @@ class CallbackModule(CallbackBase):
             message = 'Playbook completed with failures.' if self._failed else 'Playbook completed successfully.'
             self._post_completion(job_id, status=status, message=message)
 
-        self._buffer = []
+        if self._sender is not None:
+            if not self._sender.drain(deadline):
+                self._warn("Dashboard did not accept all log updates before the drain timeout.")
+            if self._sender.dropped:
+                self._warn(f"Dropped {self._sender.dropped} dashboard update(s); the send queue was full.")
+                self._sender.dropped = 0
+
+        self._buffer.clear()
         self._job_started = False
 
     # Minimal capture of task events when log file is not present
@@ -246,6 +843,12 @@ class CallbackModule(CallbackBase):
         self._emit(f"\nTASK [{title}] {'*'*74}")
         self._record_task_start(task)
 
+    def v2_runner_on_start(self, host, task):
+        try:
+            self._result_starts[(host.get_name(), getattr(task, '_uuid', None))] = datetime.now(timezone.utc).isoformat()
+        except Exception:
+            pass
+
     def v2_runner_on_ok(self, result):
         host = result._host.get_name()
         deleg = self._delegate_suffix(result)
@@ -253,6 +856,8 @@ class CallbackModule(CallbackBase):
             self._emit(f"changed: [{host}{deleg}]")
         else:
             self._emit(f"ok: [{host}{deleg}]")
+        self._record_host_result(result)
+        self._record_task_result(result, 'changed' if result.is_changed() else 'ok')
 
     def v2_runner_on_failed(self, result, ignore_errors=False):
         host = result._host.get_name()
@@ -260,6 +865,8 @@ class CallbackModule(CallbackBase):
         self._emit(f"fatal: [{host}{deleg}] => {self._short_result(result)}")
         if not ignore_errors:
             self._failed = True
+        self._record_host_result(result, finished=not ignore_errors)
+        self._record_task_result(result, 'ignored' if ignore_errors else 'failed')
         detail = self._format_failure_detail(result)
         if detail:
             try:
@@ -272,12 +879,16 @@ class CallbackModule(CallbackBase):
         host = result._host.get_name()
         deleg = self._delegate_suffix(result)
         self._emit(f"skipping: [{host}{deleg}]")
+        self._record_host_result(result)
+        self._record_task_result(result, 'skipped')
 
     def v2_runner_on_unreachable(self, result):
         host = result._host.get_name()
         deleg = self._delegate_suffix(result)
         self._emit(f"unreachable: [{host}{deleg}] => {self._short_result(result)}")
         self._failed = True
+        self._record_host_result(result, finished=True)
+        self._record_task_result(result, 'unreachable')
         detail = self._format_failure_detail(result, prefix="Host unreachable")
         if detail:
             try:
@@ -318,60 +929,270 @@ class CallbackModule(CallbackBase):
             return None
         return None
 
-    def _read_log_file(self):
+    def _find_log_file(self) -> Path | None:
         # Try configured path, then playbook_dir/ansible.last.log, then search upwards by filename
         try:
             # 1) Direct path
             p = Path(self.log_file)
             if p.exists():
-                return p.read_text(errors='ignore')
+                return p
             # 2) If we know the playbook dir, try its parent (likely ansible project dir)
             if getattr(self, 'playbook_dir', None):
                 try:
                     parent = Path(self.playbook_dir).resolve().parent
                     cand = parent / Path(self.log_file).name
                     if cand.exists():
-                        return cand.read_text(errors='ignore')
+                        return cand
                 except Exception:
                     pass
             # 3) Search upwards for a file with the right name
             up = self._find_upwards(Path(self.log_file).name)
             if up and up.exists():
-                return up.read_text(errors='ignore')
+                return up
         except Exception:
             return None
         return None
 
-    def _post_log_chunks(self, job_id: int, text: str, chunk_size: int = 7000):
-        # Split the text into chunks and post as progress messages
-        i = 0
-        length = len(text)
-        while i < length:
-            chunk = text[i:i+chunk_size]
-            i += chunk_size
-            self._post_progress(job_id, chunk, level="info")
+    def _fallback_chunks(self, chunk_size: int = 7000):
+        # Prefer our generated console-style buffer, then the log file, read a chunk at a time.
+        if self._buffer:
+            yield from self._buffer.iter_chunks(chunk_size)
+            return
+        path = self._find_log_file()
+        if path is None:
+            return
+        try:
+            with open(path, encoding='utf-8', errors='ignore') as handle:
+                while True:
+                    chunk = handle.read(chunk_size)
+                    if not chunk:
+                        break
+                    yield chunk
+        except Exception:
+            return
+
+    def _post_log_chunks(self, job_id: int, chunks):
+        # Post each chunk as a progress message
+        for chunk in chunks:
+            if chunk:
+                self._post_progress(job_id, chunk, level="info")
+
+    def _submit(self, url: str, payload: dict, on_response=None, expect_json: bool = False):
+        # Hand the call to the background sender; hooks return without touching the network.
+        self._get_sender().submit(url, payload, on_response=on_response, expect_json=expect_json)
+
+    def _get_sender(self):
+        if self._sender is None:
+            self._sender = _DashboardSender(
+                self._post_json,
+                self._send_updates,
+                maxsize=self._queue_size,
+                linger=self._batch_linger_ms / 1000.0,
+                max_lines=self._batch_max_lines,
+                max_bytes=self._batch_max_bytes,
+            )
+        return self._sender
+
+    def _send_updates(self, job_id: int, lines: list, progress: int | None, results: list | None = None):
+        """Runs on the sender thread with one coalesced batch of (text, level, ts) lines and task results."""
+        if results and 'task_results' not in self._capabilities():
+            results = []
+        if not lines and not results and progress is None:
+            return
+        relay = self._relay_for(self._api_url('/api/jobs/logs/batch'))
+        if relay is not None:
+            try:
+                relay.send_update(job_id, lines, progress, results or [])
+                return
+            except Exception:
+                self._drop_relay()
+        if self._batch_supported():
+            payload = {
+                'job_id': int(job_id),
+                'lines': [{'message': text, 'level': level or 'info', 'ts': ts} for text, level, ts in lines],
+            }
+            if progress is not None:
+                payload['progress'] = progress
+            if results:
+                payload['task_results'] = results
+            self._post_json(self._api_url('/api/jobs/logs/batch'), payload)
+            return
+        # Older dashboards: one multi-line message per run of same-level lines.
+        runs: list[tuple[list[str], str]] = []
+        for text, level, _ in lines:
+            if runs and runs[-1][1] == level:
+                runs[-1][0].append(text)
+            else:
+                runs.append(([text], level))
+        if not runs:
+            self._post_json(self._api_url('/api/jobs/progress'), self._progress_payload(job_id, None, 'info', progress))
+        for index, (texts, level) in enumerate(runs):
+            value = progress if index == len(runs) - 1 else None
+            self._post_json(self._api_url('/api/jobs/progress'), self._progress_payload(job_id, ''.join(texts), level, value))
+
+    def _batch_supported(self) -> bool:
+        return 'logs_batch' in self._capabilities()
+
+    def _capabilities(self) -> set[str]:
+        base = (self.dashboard_url or '').rstrip('/')
+        now = time.monotonic()
+        cached = self._capability_cache.get(base)
+        if cached is not None and now - cached[1] <= CAPABILITIES_TTL:
+            return cached[0]
+        info = self._get_json(self._api_url('/api/capabilities'))
+        listed = info.get('features') if isinstance(info, dict) else None
+        features = {str(f) for f in listed} if isinstance(listed, list) else set()
+        self._capability_cache[base] = (features, now)
+        return features
+
+    def _relay_for(self, url: str):
+        """The relay client if `url` is on the dashboard the relay forwards to, else None."""
+        if self._relay is False or not self._relay_socket:
+            return None
+        if self._relay is None:
+            try:
+                self._relay = _RelayClient(self._relay_socket)
+            except Exception:
+                # No relay running: talk to the dashboard directly for the rest of the run.
+                self._relay = False
+                return None
+        if not self._relay.url or not url.startswith(f"{self._relay.url}/"):
+            return None
+        return self._relay
+
+    def _drop_relay(self):
+        if self._relay:
+            self._relay.close()
+            self._warn(f"Dashboard relay at {self._relay_socket} stopped answering; sending to the dashboard directly.")
+        self._relay = False
+
+    def _proxy_for(self, scheme: str, netloc: str) -> SplitResult | None:
+        """Proxy URL from HTTP(S)_PROXY for this host, unless NO_PROXY exempts it (as urlopen decides)."""
+        proxy = urllib.request.getproxies().get(scheme)
+        if not proxy or urllib.request.proxy_bypass(netloc):
+            return None
+        return urlsplit(proxy if '://' in proxy else f"http://{proxy}")
+
+    def _connection(self, scheme: str, netloc: str) -> http.client.HTTPConnection:
+        proxy = self._proxy_for(scheme, netloc)
+        address = netloc
+        proxy_headers = {}
+        if proxy is not None:
+            address = proxy.netloc.rpartition('@')[2]
+            if proxy.username is not None:
+                credentials = f"{unquote(proxy.username)}:{unquote(proxy.password or '')}"
+                proxy_headers['Proxy-Authorization'] = f"Basic {base64.b64encode(credentials.encode('utf-8')).decode('ascii')}"
+        if scheme == 'https':
+            conn = http.client.HTTPSConnection(address, timeout=15, context=ssl.create_default_context())
+            if proxy is not None:
+                conn.set_tunnel(netloc, headers=proxy_headers)
+            return conn
+        if proxy is not None:
+            # A plain-HTTP proxy is sent absolute URLs instead of a CONNECT tunnel.
+            self._forward_proxies[(scheme, netloc)] = proxy_headers
+        return http.client.HTTPConnection(address, timeout=15)
+
+    def _request(self, method: str, url: str, body: bytes | None = None, headers: dict | None = None):
+        """Send over the kept-alive connection for the URL's host; returns (status, body) or None."""
+        relay = self._relay_for(url)
+        if relay is not None:
+            try:
+                return relay.request(method, url[len(relay.url):], body, headers or {})
+            except _RelayResponseLost:
+                # The relay may already have forwarded it; sending it again
+                # directly could start or complete a job twice.
+                self._drop_relay()
+                self._warn(f"{method} {url} went to the dashboard relay but got no answer; it may or may not have been applied.")
+                return None
+            except Exception:
+                # Nothing was forwarded (a partly written frame is discarded by the relay).
+                self._drop_relay()
+        parts = urlsplit(url)
+        key = (parts.scheme or 'http', parts.netloc)
+        path = parts.path or '/'
+        if parts.query:
+            path = f"{path}?{parts.query}"
+        for _ in range(2):
+            conn = self._connections.get(key)
+            reused = conn is not None
+            if conn is None:
+                conn = self._connections[key] = self._connection(*key)
+            target, sent_headers = path, headers or {}
+            forward = self._forward_proxies.get(key)
+            if forward is not None:
+                target, sent_headers = f"{key[0]}://{key[1]}{path}", {**sent_headers, **forward}
+            try:
+                try:
+                    conn.request(method, target, body=body, headers=sent_headers)
+                    resp = conn.getresponse()
+                except STALE_CONNECTION_ERRORS:
+                    # A reused connection may simply have been closed by the server
+                    # while idle, before it read the request: retry once on a fresh
+                    # one. Anything else (a timeout, a cut-off response) may have
+                    # been processed already and is not sent twice.
+                    conn.close()
+                    self._connections.pop(key, None)
+                    if reused:
+                        continue
+                    return None
+                content = resp.read()
+                if resp.will_close:
+                    conn.close()
+                    self._connections.pop(key, None)
+                return resp.status, content
+            except Exception:
+                conn.close()
+                self._connections.pop(key, None)
+                return None
+        return None
+
+    def _get_json(self, url: str):
+        result = self._request('GET', url)
+        if result is None or result[0] >= 400:
+            return None
+        try:
+            return json.loads(result[1].decode('utf-8') or '{}')
+        except Exception:
+            return None
 
     def _post_json(self, url: str, payload: dict, expect_json: bool = False):
         try:
             data = json.dumps(payload).encode('utf-8')
-            req = Request(url, data=data, headers={'Content-Type': 'application/json'}, method='POST')
-            with urlopen(req, timeout=15) as resp:
-                content = resp.read()
-                if expect_json:
-                    if not content:
-                        return {}
-                    try:
-                        return json.loads(content.decode('utf-8'))
-                    except Exception:
-                        return {}
+            headers = {'Content-Type': 'application/json'}
+            # The relay compresses its own uploads; the local socket hop is not worth it.
+            if (self._compress and len(data) >= self._compress_min_bytes and self._relay_for(url) is None
+                    and 'gzip_requests' in self._capabilities()):
+                data = gzip.compress(data, compresslevel=5)
+                headers['Content-Encoding'] = 'gzip'
+            result = self._request('POST', url, body=data, headers=headers)
+            if result is None or result[0] >= 400:
                 return None
-        except (URLError, HTTPError, Exception):
+            content = result[1]
+            if expect_json:
+                if not content:
+                    return {}
+                try:
+                    return json.loads(content.decode('utf-8'))
+                except Exception:
+                    return {}
+            return None
+        except Exception:
             # Swallow errors to not break the play
             return None
 
     def _post_progress(self, job_id: int, text: str | None = None, level: str = "info", progress: int | None = None):
         if text is None and progress is None:
             return
+        if progress is not None:
+            try:
+                progress = max(0, min(100, int(progress)))
+            except Exception:
+                progress = None
+        self._sent_any = True
+        # Queued for the sender, which coalesces consecutive updates into one request.
+        self._get_sender().submit_update(job_id, text, level, progress)
+
+    def _progress_payload(self, job_id: int, text: str | None, level: str, progress: int | None) -> dict:
         payload = {
             "job_id": int(job_id),
         }
@@ -380,12 +1201,8 @@ class CallbackModule(CallbackBase):
         if level and (text is not None or level.lower() != "info"):
             payload["level"] = level
         if progress is not None:
-            try:
-                payload["progress"] = max(0, min(100, int(progress)))
-            except Exception:
-                pass
-        self._sent_any = True
-        self._post_json(self._api_url('/api/jobs/progress'), payload)
+            payload["progress"] = progress
+        return payload
 
     def _update_job_id(self, value):
         if value is None:
@@ -411,15 +1228,24 @@ class CallbackModule(CallbackBase):
         return self.job_id
 
     def _flush_pending_lines(self):
-        if not self._pending_lines:
+        if not self._pending_lines and not self._pending_results:
             return
         job_id = self._ensure_job_id()
         if not job_id:
             return
-        pending = self._pending_lines
-        self._pending_lines = []
-        for line, level in pending:
-            self._post_progress(job_id, text=line, level=level)
+        # Held while submitting too, so lines from both threads keep their order.
+        with self._pending_lock:
+            pending = self._pending_lines
+            if self._pending_dropped:
+                pending.appendleft((f"[dashboard_log] {self._pending_dropped} earlier line(s) dropped while waiting for a job ID\n", 'warning'))
+            self._pending_lines = deque()
+            self._pending_bytes = 0
+            self._pending_dropped = 0
+            for line, level in pending:
+                self._post_progress(job_id, text=line, level=level)
+            results, self._pending_results = self._pending_results, []
+            for event in results:
+                self._get_sender().submit_update(job_id, None, 'info', None, result=event)
 
     def _load_env_file(self) -> dict[str, str]:
         settings: dict[str, str] = {}
@@ -442,6 +1268,24 @@ class CallbackModule(CallbackBase):
             return {}
         return settings
 
+    def _int_setting(self, name: str, default: int) -> int:
+        try:
+            return int(str(self._get_setting(name, default)).strip())
+        except Exception:
+            return default
+
+    def _float_setting(self, name: str, default: float) -> float:
+        try:
+            return float(str(self._get_setting(name, default)).strip())
+        except Exception:
+            return default
+
+    def _warn(self, message: str):
+        try:
+            self._display.warning(message)
+        except Exception:
+            pass
+
     def _get_setting(self, name: str, default=None):
         value = os.getenv(name)
         if value is not None:
@@ -467,13 +1311,19 @@ class CallbackModule(CallbackBase):
         pieces = [rendered]
         if split_lines:
             pieces = rendered.splitlines(keepends=True) or [rendered]
-        for piece in pieces:
-            message = piece if piece.endswith('\n') else f"{piece}\n"
-            self._pending_lines.append((message, level))
+        with self._pending_lock:
+            for piece in pieces:
+                message = piece if piece.endswith('\n') else f"{piece}\n"
+                self._pending_lines.append((message, level))
+                self._pending_bytes += len(message)
+            while self._pending_bytes > self._buffer_max_bytes and len(self._pending_lines) > 1:
+                dropped, _ = self._pending_lines.popleft()
+                self._pending_bytes -= len(dropped)
+                self._pending_dropped += 1
         self._flush_pending_lines()
 
     def _maybe_update_dashboard_url(self, play):
-        context = self._collect_play_vars(play)
+        context = self._play_settings(play)
         try:
             url = context.get('dashboard_url') if context else None
             if url:
@@ -490,27 +1340,65 @@ class CallbackModule(CallbackBase):
         except Exception:
             pass
 
-    def _collect_play_vars(self, play):
+    def _play_settings(self, play):
+        """
+        The dashboard_* variables and ansible_limit for a play, resolved once per
+        play with a single VariableManager.get_vars(play=play) call, so extra
+        vars, vars_files, roles and play vars apply with Ansible's own precedence.
+        """
+        key = getattr(play, '_uuid', None) or id(play)
+        cached = self._play_settings_cache.get(key)
+        if cached is not None:
+            return cached
+        vm = self._variable_manager(play)
+        variables = {}
+        if vm is not None and play is not None:
+            try:
+                # No host, so no hostvars; the play's magic vars are built once here.
+                variables = vm.get_vars(play=play, include_hostvars=False)
+            except Exception:
+                variables = {}
+        settings = {}
+        for name in PLAY_SETTING_KEYS:
+            value = variables.get(name)
+            if value not in (None, ''):
+                settings[name] = self._template_setting(play, variables, value)
+        try:
+            from ansible import context as ansible_context
+            subset = ansible_context.CLIARGS.get('subset')
+            if subset:
+                settings['ansible_limit'] = subset
+        except Exception:
+            pass
+        if play is not None:
+            self._play_settings_cache[key] = settings
+        return settings
+
+    def _variable_manager(self, play):
         try:
             if play is None:
-                return {}
+                return None
             if hasattr(play, 'get_variable_manager') and callable(play.get_variable_manager):
-                vm = play.get_variable_manager()
-            else:
-                vm = getattr(play, '_variable_manager', None)
-            loader = getattr(play, '_loader', None)
-            if vm and hasattr(vm, 'get_vars'):
-                data = vm.get_vars(loader=loader, play=play)
-                if isinstance(data, dict):
-                    return data
+                return play.get_variable_manager()
+            return getattr(play, '_variable_manager', None)
         except Exception:
-            pass
-        return {}
+            return None
+
+    def _template_setting(self, play, variables: dict, value):
+        """Render `value` with the play's variables; returned as-is if it is not a template or fails to render."""
+        if not isinstance(value, str) or '{{' not in value:
+            return value
+        loader = getattr(play, '_loader', None)
+        try:
+            from ansible.template import Templar
+            return Templar(loader=loader, variables=variables).template(value)
+        except Exception:
+            return value
 
     def _ensure_job_started(self, play=None):
-        if self._job_started:
+        if self._job_started or self._job_start_pending:
             return
-        context = self._collect_play_vars(play)
+        context = self._play_settings(play)
         job_name = self._job_name_override or context.get('dashboard_job_name') if context else None
         if not job_name:
             job_name = self._derive_job_name(play)
@@ -527,18 +1415,32 @@ class CallbackModule(CallbackBase):
             'triggered_by': triggered_by,
         }
 
-        response = self._post_json(self._api_url('/api/jobs/start'), payload, expect_json=True)
+        # The start call goes through the sender as well; lines emitted meanwhile
+        # wait in _pending_lines until the job_id comes back.
+        self._job_start_pending = True
+        self._submit(self._api_url('/api/jobs/start'), payload, on_response=self._on_job_started, expect_json=True)
+
+    def _on_job_started(self, response):
         job_id = None
         if isinstance(response, dict):
             job_id = response.get('job_id')
+        # Runs on the sender thread while _ensure_job_started may be checking both
+        # flags: mark the job started before clearing the pending flag, so there is
+        # no moment where neither is set and a second start call goes out.
         if job_id:
-            self._update_job_id(job_id)
             self._job_started = True
+        self._job_start_pending = False
+        if job_id:
+            message = f"Dashboard job started (ID: {job_id})"
             try:
-                self._buffer.append(f"Dashboard job started (ID: {job_id})")
+                self._buffer.append(message)
             except Exception:
                 pass
-            self._queue_message(f"Dashboard job started (ID: {job_id})", level='info')
+            with self._pending_lock:
+                # Lines emitted while the start call was in flight follow the notice.
+                self._pending_lines.appendleft((f"{message}\n", 'info'))
+                self._pending_bytes += len(message) + 1
+                self._update_job_id(job_id)
         else:
             message = "Unable to register job with dashboard API."
             try:
@@ -582,40 +1484,50 @@ class CallbackModule(CallbackBase):
             if ',' in limit:
                 return f"servers:{limit}"
             return limit
-        hosts = self._collect_hostnames(play, context)
-        if hosts:
-            unique_hosts = list(dict.fromkeys(hosts))
-            if len(unique_hosts) == 1:
-                return unique_hosts[0]
-            return f"servers:{','.join(unique_hosts)}"
+        pattern, count, sample = self._summarize_hosts(play)
+        if count == 1 and sample:
+            return sample[0]
+        if count and sample:
+            scope = f"servers:{','.join(sample)}"
+            if count > len(sample):
+                # Large plays: a capped sample plus a count instead of every host name.
+                scope += f",+{count - len(sample)} more ({count} hosts in {pattern})"
+            return scope
         return 'servers:unknown'
 
-    def _collect_hostnames(self, play, context):
-        hosts = []
+    def _summarize_hosts(self, play):
+        """(pattern, host count, first few host names) for the play's host pattern, once per play."""
+        key = getattr(play, '_uuid', None) or id(play)
+        cached = self._host_summary_cache.get(key)
+        if cached is None:
+            cached = self._resolve_hosts(play)
+            if play is not None:
+                self._host_summary_cache[key] = cached
+        return cached
+
+    def _resolve_hosts(self, play):
+        pattern = 'all'
         try:
-            vm = None
             if play is not None:
-                if hasattr(play, 'get_variable_manager') and callable(play.get_variable_manager):
-                    vm = play.get_variable_manager()
-                else:
-                    vm = getattr(play, '_variable_manager', None)
+                pattern = getattr(play, 'hosts', None) or 'all'
+                if isinstance(pattern, (list, tuple)):
+                    pattern = ','.join(str(p) for p in pattern)
+            vm = self._variable_manager(play)
             inventory = getattr(vm, '_inventory', None) if vm else None
-            pattern = getattr(play, 'hosts', None) or 'all'
             if inventory and hasattr(inventory, 'get_hosts'):
                 ansible_hosts = inventory.get_hosts(pattern)
-                hosts = [h.get_name() for h in ansible_hosts if getattr(h, 'get_name', None)]
+                limit = max(1, self._scope_sample)
+                sample = []
+                for host in ansible_hosts:
+                    name = host.get_name() if getattr(host, 'get_name', None) else None
+                    if name:
+                        sample.append(name)
+                        if len(sample) >= limit:
+                            break
+                return pattern, len(ansible_hosts), sample
         except Exception:
-            hosts = []
-        if not hosts and context:
-            try:
-                play_hosts = context.get('ansible_play_hosts_all')
-                if isinstance(play_hosts, (list, tuple)):
-                    hosts = [str(h) for h in play_hosts]
-                elif play_hosts:
-                    hosts = [str(play_hosts)]
-            except Exception:
-                pass
-        return [h for h in hosts if h]
+            pass
+        return pattern, 0, []
 
     def _default_triggered_by(self):
         preset = self._get_setting('DASHBOARD_TRIGGERED_BY')
@@ -631,74 +1543,160 @@ class CallbackModule(CallbackBase):
         except Exception:
             return 'ansible'
 
+    # Progress is measured in host-task units: a play contributes tasks x hosts
+    # to the total, and every runner result completes one unit for its host.
+    def _reset_progress(self):
+        self._progress_total = 0
+        self._progress_done = 0
+        self._last_progress_sent = 0
+        self._seen_play_uids = set()
+        self._uncounted_play = None
+        self._play_tasks = 0
+        self._host_done: dict[str, int] = {}
+        self._hosts_finished: set[str] = set()
+
     def _accumulate_total_tasks(self, play):
+        # Only note the play here; its tasks are counted when the first one starts.
+        key = getattr(play, '_uuid', None) or id(play)
+        if key in self._seen_play_uids:
+            return
+        self._seen_play_uids.add(key)
+        self._uncounted_play = play
+        self._play_tasks = 0
+        self._host_done = {}
+        self._hosts_finished = set()
+
+    def _count_current_play(self):
+        play = self._uncounted_play
+        if play is None:
+            return
+        self._uncounted_play = None
         try:
-            key = getattr(play, '_uuid', None) or id(play)
-            if key in self._seen_play_uids:
-                return
-            self._seen_play_uids.add(key)
-            total = self._count_play_tasks(play)
-            if total:
-                self._progress_total += total
+            self._play_tasks = self._count_play_tasks(play)
+            _, hosts, _ = self._summarize_hosts(play)
+            self._progress_total += self._play_tasks * max(1, hosts)
         except Exception:
             pass
 
     def _count_play_tasks(self, play):
+        # Walk the blocks Ansible already loaded instead of play.compile(), which
+        # Ansible runs again itself; role counts are cached across plays.
         try:
-            compiled = play.compile() if hasattr(play, 'compile') else []
             total = 0
-            for block in compiled:
-                total += self._count_block_tasks(block)
+            for section in ('pre_tasks', 'tasks', 'post_tasks'):
+                for block in getattr(play, section, None) or []:
+                    total += self._count_block_tasks(block)
+            seen: set = set()
+            for role in play.get_roles() if hasattr(play, 'get_roles') else []:
+                total += self._count_role_tasks(role, seen)
             return total
         except Exception:
             return 0
 
-    def _count_block_tasks(self, block):
+    def _count_role_tasks(self, role, seen: set):
+        try:
+            from_files = getattr(role, '_from_files', None) or {}
+            key = (getattr(role, '_role_path', None) or role.get_name(), tuple(sorted(from_files.items())))
+        except Exception:
+            return 0
+        if key in seen:
+            return 0
+        seen.add(key)
         total = 0
-        tasks = getattr(block, 'block', None)
-        if not tasks and hasattr(block, 'get_tasks'):
+        try:
+            for dependency in role.get_direct_dependencies():
+                total += self._count_role_tasks(dependency, seen)
+        except Exception:
+            pass
+        count = self._role_task_counts.get(key)
+        if count is None:
             try:
-                tasks = block.get_tasks()
+                count = sum(self._count_block_tasks(block) for block in role.get_task_blocks())
             except Exception:
-                tasks = None
-        if tasks is None:
-            return total
-        for task in tasks:
-            try:
-                action = getattr(task, 'action', None)
-                if action == 'meta':
+                count = 0
+            self._role_task_counts[key] = count
+        return total + count
+
+    def _count_block_tasks(self, block):
+        # rescue sections only run on failure, so they are left out of the estimate
+        total = 0
+        for section in ('block', 'always'):
+            for item in getattr(block, section, None) or []:
+                try:
+                    if hasattr(item, 'block'):
+                        total += self._count_block_tasks(item)
+                    elif getattr(item, 'action', None) != 'meta':
+                        total += 1
+                except Exception:
                     continue
-                total += 1
-                if hasattr(task, 'block'):
-                    total += self._count_block_tasks(task)
-                for rescue in getattr(task, 'rescue', []) or []:
-                    total += self._count_block_tasks(rescue)
-                for always in getattr(task, 'always', []) or []:
-                    total += self._count_block_tasks(always)
-            except Exception:
-                continue
         return total
 
     def _record_task_start(self, task):
+        self._count_current_play()
+
+    def _record_host_result(self, result, finished: bool = False):
+        """
+        Count one completed task for the result's host. `finished` means the host
+        has left the play (unreachable or failed), so its remaining tasks count as done.
+        """
         try:
-            if getattr(task, 'action', None) == 'meta':
+            if type(getattr(result, '_task', None)).__name__ == 'Handler':
                 return
+            host = result._host.get_name()
         except Exception:
-            pass
-        self._tasks_started += 1
-        if self._progress_total <= 0:
             return
-        job_id = self._ensure_job_id()
+        if host in self._hosts_finished:
+            return
+        done = self._host_done.get(host, 0)
+        units = 1
+        if finished:
+            units = max(1, self._play_tasks - done)
+            self._hosts_finished.add(host)
+        self._host_done[host] = done + units
+        self._progress_done += units
+        self._send_progress()
+
+    def _record_task_result(self, result, status: str):
+        """Queue a structured per-host result for the dashboard's task_results table."""
+        try:
+            host = result._host.get_name()
+            task = result._task
+            uuid = getattr(task, '_uuid', None)
+            event = {
+                'host': host,
+                'task_name': task.get_name().strip() if task is not None else 'Unknown task',
+                'task_uuid': uuid,
+                'action': getattr(task, 'action', None),
+                'status': status,
+                'changed': bool(result.is_changed()) if hasattr(result, 'is_changed') else False,
+                'started_at': self._result_starts.pop((host, uuid), None),
+                'ended_at': datetime.now(timezone.utc).isoformat(),
+            }
+        except Exception:
+            return
+        job_id = self.job_id
         if not job_id:
+            with self._pending_lock:
+                if len(self._pending_results) < self._queue_size:
+                    self._pending_results.append(event)
+            return
+        self._get_sender().submit_update(job_id, None, 'info', None, result=event)
+
+    def _send_progress(self):
+        if self._progress_total <= 0:
             return
         try:
-            pct = int((self._tasks_started / max(1, self._progress_total)) * 100)
+            pct = int((self._progress_done / self._progress_total) * 100)
         except Exception:
             pct = 0
         pct = max(0, min(99, pct))
-        if pct > self._last_progress_sent:
-            self._post_progress(job_id, progress=pct)
-            self._last_progress_sent = pct
+        if pct <= self._last_progress_sent:
+            return
+        job_id = self._ensure_job_id()
+        if not job_id:
+            return
+        self._post_progress(job_id, progress=pct)
+        self._last_progress_sent = pct
 
     def _format_failure_detail(self, result, prefix: str | None = None):
         try:
@@ -712,11 +1710,48 @@ class CallbackModule(CallbackBase):
         except Exception:
             task_name = 'Unknown task'
         try:
-            error_json = json.dumps(result._result, default=str)[:1000]
+            error_json = _bounded_json(result._result, FAILURE_PREVIEW_CHARS)
         except Exception:
-            error_json = str(getattr(result, '_result', ''))
+            error_json = str(getattr(result, '_result', ''))[:FAILURE_PREVIEW_CHARS]
         header = prefix or 'Task failed'
-        return f"{header}: {task_name}\nDetails: {error_json}"
+        detail = f"{header}: {task_name}\nDetails: {error_json}"
+        artifact_url = self._upload_failure_artifact(result)
+        if artifact_url:
+            detail = f"{detail}\nFull result: {artifact_url}"
+        return detail
+
+    def _upload_failure_artifact(self, result) -> str | None:
+        """Queue the full result for upload as a job artifact; returns its URL, or None."""
+        if not self._failure_artifacts or not self.job_id:
+            return None
+        # Only reference an artifact the dashboard is known to accept. The sender
+        # fills the capability cache with its first batch, long before a failure.
+        cached = self._capability_cache.get((self.dashboard_url or '').rstrip('/'))
+        if cached is None or 'artifacts' not in cached[0]:
+            return None
+        try:
+            data = dict(result._result)
+            host = result._host.get_name()
+        except Exception:
+            return None
+        self._artifact_count += 1
+        safe_host = ''.join(c if c.isalnum() or c in '._-' else '_' for c in host)[:64]
+        name = f"failure-{self._artifact_count:04d}-{safe_host}.json"
+        url = self._api_url(f"/api/jobs/{int(self.job_id)}/artifacts/{name}")
+
+        def upload():
+            # Serialised and compressed on the sender thread, in pieces, so the
+            # callback hook never pays for the full result.
+            deflater = zlib.compressobj(6, zlib.DEFLATED, 31)
+            body = [deflater.compress(chunk.encode('utf-8')) for chunk in json.JSONEncoder(default=str).iterencode(data)]
+            body.append(deflater.flush())
+            self._request('PUT', url, body=b''.join(body), headers={
+                'Content-Type': 'application/json',
+                'Content-Encoding': 'gzip',
+            })
+
+        self._get_sender().submit_task(upload)
+        return url
 
     def _api_url(self, path: str) -> str:
         base = (self.dashboard_url or 'http://localhost:8000').rstrip('/')
@@ -730,15 +1765,14 @@ class CallbackModule(CallbackBase):
         }
         if message:
             payload['message'] = message
-        self._post_json(self._api_url('/api/jobs/complete'), payload)
+        self._submit(self._api_url('/api/jobs/complete'), payload)
 
     def _short_result(self, result):
         try:
-            data = result._result.copy()
+            data = result._result
             # keep it brief
-            keys = [k for k in data.keys() if k in ("changed", "msg", "rc", "stdout", "stderr", "failed", "skipped")]
-            out = {k: data.get(k) for k in keys}
-            return json.dumps(out, default=str)[:500]
+            out = {k: data[k] for k in SHORT_RESULT_KEYS if k in data}
+            return _bounded_json(out, SHORT_RESULT_CHARS)
         except Exception:
             return "{}"
 
@@ -0,0 +1,491 @@
+#!/usr/bin/env python
+"""
+Local relay for the dashboard_log callback plugin.
+
+On a control node that runs many ansible-playbook processes at once, each
+plugin normally opens its own connection and sends its own stream of requests
+to the dashboard. Run this daemon next to them and point the plugin at its Unix
+socket (DASHBOARD_RELAY_SOCKET): every process then writes framed events to the
+socket, and the relay merges their log lines and progress into batched uploads
+over one kept-alive upstream connection. Plugins fall back to direct HTTP when
+the socket is missing or the relay stops answering.
+
+    python ansible/dashboard_relay.py --socket /run/ansible/dashboard.sock --url http://dashboard:8000
+
+Frames are a `!II` prefix (JSON header length, body length) followed by the
+JSON header and the raw body. Plugins send:
+  - `hello`: answered with the relay's upstream URL, so a plugin aimed at a
+    different dashboard keeps talking to it directly;
+  - `update`: log lines, task results and progress for one job, no reply;
+  - `request`: an API call forwarded as-is, answered with a `response` frame
+    carrying the upstream status (0 when unreachable) and body.
+Updates queued before a request from the same plugin are sent first, so a job
+is never completed ahead of its last log lines. When the dashboard rejects an
+upload (422), only the entries it points at are dropped and the rest is resent.
+
+Stdlib only, like the plugin.
+"""
+
+from __future__ import annotations
+
+import argparse
+import gzip
+import http.client
+import json
+import logging
+import os
+import queue
+import signal
+import socket
+import ssl
+import struct
+import threading
+import time
+from urllib.parse import urlsplit
+
+logger = logging.getLogger('dashboard_relay')
+
+FRAME_PREFIX = struct.Struct('!II')
+MAX_FRAME_BYTES = 64 * 1024 * 1024
+CAPABILITIES_TTL = 60.0
+# Uploads resent after the dashboard rejects some of their entries (422).
+MAX_REJECTED_RETRIES = 2
+# Errors showing that a kept-alive connection was closed before the request was
+# answered; only these are retried (RemoteDisconnected is a ConnectionResetError).
+STALE_CONNECTION_ERRORS = (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError)
+
+_STOP = object()
+
+
+def send_frame(sock: socket.socket, header: dict, body: bytes = b''):
+    data = json.dumps(header).encode('utf-8')
+    sock.sendall(FRAME_PREFIX.pack(len(data), len(body)) + data + body)
+
+
+def _recv_exact(sock: socket.socket, size: int) -> bytes | None:
+    parts = []
+    while size:
+        chunk = sock.recv(min(size, 1024 * 1024))
+        if not chunk:
+            return None
+        parts.append(chunk)
+        size -= len(chunk)
+    return b''.join(parts)
+
+
+def recv_frame(sock: socket.socket) -> tuple[dict, bytes] | None:
+    """Read one frame; None at end of stream."""
+    prefix = _recv_exact(sock, FRAME_PREFIX.size)
+    if prefix is None:
+        return None
+    header_len, body_len = FRAME_PREFIX.unpack(prefix)
+    if header_len + body_len > MAX_FRAME_BYTES:
+        raise ValueError('frame too large')
+    header = _recv_exact(sock, header_len)
+    body = _recv_exact(sock, body_len) if body_len else b''
+    if header is None or body is None:
+        return None
+    return json.loads(header.decode('utf-8')), body
+
+
+def _update_size(header: dict) -> int:
+    # Task results count like log lines against the batch and pending limits.
+    return len(header.get('lines') or []) + len(header.get('task_results') or [])
+
+
+def _without_rejected(batches: list[dict], body: bytes, multi: bool) -> tuple[list[dict], list[str]]:
+    """
+    `batches` minus the lines, task results or progress values a 422 answer
+    points at, plus a note for each dropped entry. Nothing is dropped when the
+    answer can't be tied to particular batches.
+    """
+    try:
+        detail = json.loads(body.decode('utf-8')).get('detail')
+    except Exception:
+        return batches, []
+    if not isinstance(detail, list):
+        return batches, []
+    whole: set[int] = set()
+    entries: dict[tuple[int, str], set[int]] = {}
+    progress: set[int] = set()
+    notes = []
+    for error in detail:
+        loc = list(error.get('loc') or []) if isinstance(error, dict) else []
+        if loc[:1] == ['body']:
+            loc = loc[1:]
+        index = 0
+        if multi:
+            if len(loc) < 2 or loc[0] != 'batches' or not isinstance(loc[1], int) or not 0 <= loc[1] < len(batches):
+                return batches, []
+            index, loc = loc[1], loc[2:]
+        if len(loc) >= 2 and loc[0] in ('lines', 'task_results') and isinstance(loc[1], int):
+            entries.setdefault((index, loc[0]), set()).add(loc[1])
+        elif loc[:1] == ['progress']:
+            progress.add(index)
+        else:
+            # The job id or the batch itself is malformed.
+            whole.add(index)
+        notes.append(f"job {batches[index].get('job_id')!r} {'.'.join(str(part) for part in loc) or 'batch'}: {error.get('msg')}")
+    kept = []
+    for index, batch in enumerate(batches):
+        if index in whole:
+            continue
+        batch = dict(batch)
+        for field in ('lines', 'task_results'):
+            bad = entries.get((index, field))
+            if bad:
+                batch[field] = [entry for position, entry in enumerate(batch.get(field) or []) if position not in bad]
+        if index in progress:
+            batch.pop('progress', None)
+        kept.append(batch)
+    return kept, notes
+
+
+class Upstream:
+    """The one kept-alive HTTP connection to the dashboard; used only from the relay's worker thread."""
+
+    def __init__(self, url: str, compress_min_bytes: int = 4096, verify_tls: bool = True):
+        self.url = url.rstrip('/')
+        parts = urlsplit(self.url)
+        self._scheme = parts.scheme or 'http'
+        self._netloc = parts.netloc
+        self._prefix = parts.path.rstrip('/')
+        self._compress_min_bytes = compress_min_bytes
+        self._verify_tls = verify_tls
+        self._conn: http.client.HTTPConnection | None = None
+        self._features: set[str] = set()
+        self._features_at: float | None = None
+
+    def _connect(self) -> http.client.HTTPConnection:
+        if self._scheme == 'https':
+            context = ssl.create_default_context()
+            if not self._verify_tls:
+                context.check_hostname = False
+                context.verify_mode = ssl.CERT_NONE
+            return http.client.HTTPSConnection(self._netloc, timeout=15, context=context)
+        return http.client.HTTPConnection(self._netloc, timeout=15)
+
+    def request(self, method: str, path: str, body: bytes | None = None, headers: dict | None = None):
+        """Returns (status, body), or None when the dashboard cannot be reached."""
+        for _ in range(2):
+            conn = self._conn
+            reused = conn is not None
+            if conn is None:
+                conn = self._conn = self._connect()
+            try:
+                try:
+                    conn.request(method, f"{self._prefix}{path}", body=body, headers=headers or {})
+                    resp = conn.getresponse()
+                except STALE_CONNECTION_ERRORS:
+                    # An idle kept-alive connection may have been closed by the server
+                    # before it read the request; only then is sending again safe.
+                    conn.close()
+                    self._conn = None
+                    if reused:
+                        continue
+                    return None
+                content = resp.read()
+                if resp.will_close:
+                    conn.close()
+                    self._conn = None
+                return resp.status, content
+            except Exception:
+                conn.close()
+                self._conn = None
+                return None
+        return None
+
+    def features(self) -> set[str]:
+        now = time.monotonic()
+        if self._features_at is None or now - self._features_at > CAPABILITIES_TTL:
+            result = self.request('GET', '/api/capabilities')
+            listed = None
+            if result is not None and result[0] < 400:
+                try:
+                    listed = json.loads(result[1].decode('utf-8')).get('features')
+                except Exception:
+                    listed = None
+            self._features = {str(f) for f in listed} if isinstance(listed, list) else set()
+            self._features_at = now
+        return self._features
+
+    def post_json(self, path: str, payload: dict):
+        data = json.dumps(payload).encode('utf-8')
+        headers = {'Content-Type': 'application/json'}
+        if len(data) >= self._compress_min_bytes and 'gzip_requests' in self.features():
+            data = gzip.compress(data, compresslevel=5)
+            headers['Content-Encoding'] = 'gzip'
+        result = self.request('POST', path, body=data, headers=headers)
+        if result is None or result[0] >= 400:
+            logger.warning("POST %s failed (%s)", path, 'unreachable' if result is None else result[0])
+        return result
+
+
+class _Client:
+    def __init__(self, sock: socket.socket):
+        self.sock = sock
+        self.lock = threading.Lock()
+
+    def reply(self, header: dict, body: bytes = b''):
+        try:
+            with self.lock:
+                send_frame(self.sock, header, body)
+        except OSError:
+            pass
+
+
+class Relay:
+    """
+    Accepts plugin connections on `socket_path` and feeds one worker thread that
+    owns the upstream connection. Updates are held for up to `linger` seconds,
+    or until `max_lines`/`max_bytes` is reached, and sent as one multi-job batch.
+    At most `max_pending` lines wait at once; further updates are dropped.
+    """
+
+    def __init__(self, socket_path: str, upstream: Upstream, linger: float = 0.2, max_lines: int = 2000,
+                 max_bytes: int = 1024 * 1024, max_pending: int = 100000, mode: int = 0o600):
+        self.socket_path = socket_path
+        self.upstream = upstream
+        self._linger = max(0.0, linger)
+        self._max_lines = max(1, max_lines)
+        self._max_bytes = max(1, max_bytes)
+        self._max_pending = max(1, max_pending)
+        self._mode = mode
+        self._queue: queue.Queue = queue.Queue()
+        self._pending_lock = threading.Lock()
+        self._pending_lines = 0
+        self._dropped = 0
+        self._listener = None
+        self._worker = None
+
+    def serve_forever(self):
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+        listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        # bind() creates the socket file with the umask applied; keep it private
+        # until chmod, so no other user can connect in between.
+        previous_umask = os.umask(0o177)
+        try:
+            listener.bind(self.socket_path)
+        finally:
+            os.umask(previous_umask)
+        os.chmod(self.socket_path, self._mode)
+        listener.listen(128)
+        self._listener = listener
+        self._worker = threading.Thread(target=self._run, name='dashboard-relay-upstream', daemon=True)
+        self._worker.start()
+        logger.info("relaying %s to %s", self.socket_path, self.upstream.url)
+        try:
+            while True:
+                try:
+                    conn, _ = listener.accept()
+                except OSError:
+                    break
+                threading.Thread(target=self._read_client, args=(_Client(conn),), daemon=True).start()
+        finally:
+            self.shutdown()
+
+    def shutdown(self, timeout: float = 10.0):
+        """Stop accepting plugins and send whatever is still queued."""
+        listener, self._listener = self._listener, None
+        if listener is None:
+            return
+        try:
+            listener.close()
+        except OSError:
+            pass
+        try:
+            os.unlink(self.socket_path)
+        except OSError:
+            pass
+        self._queue.put(_STOP)
+        if self._worker is not None:
+            self._worker.join(timeout)
+
+    def _read_client(self, client: _Client):
+        try:
+            while True:
+                frame = recv_frame(client.sock)
+                if frame is None:
+                    break
+                header, body = frame
+                op = header.get('op')
+                if op == 'hello':
+                    client.reply({'op': 'hello', 'url': self.upstream.url, 'version': 1})
+                elif op == 'update':
+                    self._accept_update(header)
+                elif op == 'request':
+                    self._queue.put(('request', client, header, body))
+        except (OSError, ValueError) as exc:
+            logger.debug("plugin connection closed: %s", exc)
+        finally:
+            try:
+                client.sock.close()
+            except OSError:
+                pass
+
+    def _accept_update(self, header: dict):
+        count = _update_size(header)
+        with self._pending_lock:
+            if self._pending_lines + count > self._max_pending:
+                self._dropped += 1
+                return
+            self._pending_lines += count
+        self._queue.put(('update', header))
+
+    def _run(self):
+        pending: dict[int, dict] = {}
+        lines = size = 0
+        deadline = 0.0
+        while True:
+            timeout = max(0.0, deadline - time.monotonic()) if pending else None
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                item = None
+            if item is None or item is _STOP or item[0] == 'request':
+                if pending:
+                    self._flush(pending, lines)
+                    pending, lines, size = {}, 0, 0
+                if item is _STOP:
+                    return
+                if item is not None:
+                    self._forward(*item[1:])
+                continue
+            header = item[1]
+            received = header.get('lines') or []
+            try:
+                job_id = int(header['job_id'])
+            except (KeyError, TypeError, ValueError):
+                with self._pending_lock:
+                    self._pending_lines -= _update_size(header)
+                continue
+            if not pending:
+                deadline = time.monotonic() + self._linger
+            batch = pending.setdefault(job_id, {'job_id': job_id, 'lines': []})
+            batch['lines'].extend(received)
+            if header.get('task_results'):
+                batch.setdefault('task_results', []).extend(header['task_results'])
+            lines += _update_size(header)
+            # Malformed lines are left for the dashboard to reject; they must not stop the worker.
+            size += sum(len(str(line.get('message') or '')) for line in received if isinstance(line, dict))
+            if header.get('progress') is not None:
+                batch['progress'] = header['progress']
+            if lines >= self._max_lines or size >= self._max_bytes:
+                self._flush(pending, lines)
+                pending, lines, size = {}, 0, 0
+
+    def _flush(self, pending: dict[int, dict], lines: int):
+        batches = list(pending.values())
+        try:
+            features = self.upstream.features()
+            if 'logs_multi_batch' in features:
+                self._post_batches('/api/logs/batch', batches, multi=True)
+            elif 'logs_batch' in features:
+                for batch in batches:
+                    self._post_batches('/api/jobs/logs/batch', [batch], multi=False)
+            else:
+                for batch in batches:
+                    self._post_progress(batch)
+        except Exception:
+            logger.exception("failed to send %d log line(s)", lines)
+        with self._pending_lock:
+            self._pending_lines -= lines
+            dropped, self._dropped = self._dropped, 0
+        if dropped:
+            logger.warning("dropped %d update(s); more than %d lines were waiting", dropped, self._max_pending)
+
+    def _post_batches(self, path: str, batches: list[dict], multi: bool):
+        # One malformed line from one plugin must not cost every other line in
+        # the upload: drop what the dashboard rejected and send the rest again.
+        for _ in range(MAX_REJECTED_RETRIES + 1):
+            if not batches:
+                return
+            result = self.upstream.post_json(path, {'batches': batches} if multi else batches[0])
+            if result is None or result[0] != 422:
+                return
+            batches, notes = _without_rejected(batches, result[1], multi)
+            if not notes:
+                return
+            logger.warning("dashboard rejected %d entr%s, sending the rest: %s",
+                           len(notes), 'y' if len(notes) == 1 else 'ies', '; '.join(notes[:5]))
+
+    def _post_progress(self, batch: dict):
+        # Dashboards without the batch endpoints: one message per run of same-level lines.
+        runs: list[tuple[list[str], str]] = []
+        for line in batch['lines']:
+            level = line.get('level') or 'info'
+            if runs and runs[-1][1] == level:
+                runs[-1][0].append(line.get('message') or '')
+            else:
+                runs.append(([line.get('message') or ''], level))
+        if not runs:
+            if batch.get('progress') is None:
+                return
+            runs.append(([], 'info'))
+        for index, (texts, level) in enumerate(runs):
+            payload = {'job_id': batch['job_id'], 'level': level}
+            if texts:
+                payload['message'] = ''.join(texts)
+            if index == len(runs) - 1 and batch.get('progress') is not None:
+                payload['progress'] = batch['progress']
+            self.upstream.post_json('/api/jobs/progress', payload)
+
+    def _forward(self, client: _Client, header: dict, body: bytes):
+        headers = {str(k): str(v) for k, v in (header.get('headers') or {}).items()}
+        result = self.upstream.request(str(header.get('method') or 'GET'), str(header.get('path') or '/'), body or None, headers)
+        status, content = result if result is not None else (0, b'')
+        client.reply({'op': 'response', 'id': header.get('id'), 'status': status}, content)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0].strip())
+    parser.add_argument('--socket', default=os.getenv('DASHBOARD_RELAY_SOCKET'),
+                        help='Unix socket to listen on (DASHBOARD_RELAY_SOCKET)')
+    parser.add_argument('--url', default=os.getenv('DASHBOARD_URL', 'http://localhost:8000'),
+                        help='dashboard base URL (DASHBOARD_URL)')
+    parser.add_argument('--linger-ms', type=int, default=int(os.getenv('DASHBOARD_RELAY_LINGER_MS', '200')),
+                        help='how long updates are collected for one upload')
+    parser.add_argument('--max-lines', type=int, default=int(os.getenv('DASHBOARD_RELAY_MAX_LINES', '2000')),
+                        help='send an upload early once it holds this many lines')
+    parser.add_argument('--max-bytes', type=int, default=int(os.getenv('DASHBOARD_RELAY_MAX_BYTES', str(1024 * 1024))),
+                        help='send an upload early once its lines reach this many characters')
+    parser.add_argument('--max-pending', type=int, default=int(os.getenv('DASHBOARD_RELAY_MAX_PENDING', '100000')),
+                        help='log lines held before further updates are dropped')
+    parser.add_argument('--compress-min-bytes', type=int, default=int(os.getenv('DASHBOARD_COMPRESS_MIN_BYTES', '4096')),
+                        help='gzip upstream bodies of at least this size when the dashboard accepts it')
+    parser.add_argument('--mode', default=os.getenv('DASHBOARD_RELAY_SOCKET_MODE', '600'),
+                        help='permissions of the socket file, in octal')
+    parser.add_argument('--no-verify-tls', action='store_true',
+                        default=os.getenv('DASHBOARD_VERIFY_TLS', 'true').strip().lower() in ('0', 'false', 'no', 'off'),
+                        help='skip TLS certificate verification')
+    parser.add_argument('--verbose', '-v', action='store_true')
+    args = parser.parse_args(argv)
+    if not args.socket:
+        parser.error('--socket (or DASHBOARD_RELAY_SOCKET) is required')
+    logging.basicConfig(level=logging.DEBUG if args.verbose else logging.INFO,
+                        format='%(asctime)s %(levelname)s %(name)s: %(message)s')
+    relay = Relay(
+        args.socket,
+        Upstream(args.url, compress_min_bytes=args.compress_min_bytes, verify_tls=not args.no_verify_tls),
+        linger=args.linger_ms / 1000.0,
+        max_lines=args.max_lines,
+        max_bytes=args.max_bytes,
+        max_pending=args.max_pending,
+        mode=int(args.mode, 8),
+    )
+
+    def stop(signum, frame):
+        raise KeyboardInterrupt
+
+    signal.signal(signal.SIGTERM, stop)
+    try:
+        relay.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        relay.shutdown()
+
+
+if __name__ == '__main__':
+    main()
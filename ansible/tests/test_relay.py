@@ -0,0 +1,166 @@
+import json
+import os
+import socket
+import struct
+import threading
+import time
+
+import pytest
+
+import dashboard_relay
+from dashboard_relay import Relay, recv_frame, send_frame
+
+
+class FakeUpstream:
+    url = "http://dashboard.test"
+
+    def __init__(self, features=("logs_multi_batch",)):
+        self._features = set(features)
+        self.posts = []
+        self.requests = []
+
+    def features(self):
+        return self._features
+
+    def post_json(self, path, payload):
+        self.posts.append((path, payload))
+        return 200, b"{}"
+
+    def request(self, method, path, body=None, headers=None):
+        self.requests.append((method, path, body, headers))
+        return 200, b'{"job_id": 7}'
+
+
+def test_frames_round_trip():
+    left, right = socket.socketpair()
+    with left, right:
+        send_frame(left, {"op": "update", "job_id": 1}, b"body")
+        send_frame(left, {"op": "hello"})
+        assert recv_frame(right) == ({"op": "update", "job_id": 1}, b"body")
+        assert recv_frame(right) == ({"op": "hello"}, b"")
+        left.close()
+        assert recv_frame(right) is None
+
+
+def test_oversized_and_truncated_frames():
+    left, right = socket.socketpair()
+    with left, right:
+        left.sendall(struct.pack("!II", dashboard_relay.MAX_FRAME_BYTES, 1))
+        with pytest.raises(ValueError):
+            recv_frame(right)
+    left, right = socket.socketpair()
+    with left, right:
+        left.sendall(struct.pack("!II", 100, 0) + b'{"op"')
+        left.close()
+        assert recv_frame(right) is None
+
+
+def run_worker(relay: Relay, updates: list[dict]):
+    for header in updates:
+        relay._accept_update(header)
+    relay._queue.put(dashboard_relay._STOP)
+    relay._run()
+
+
+def test_updates_are_merged_per_job():
+    upstream = FakeUpstream()
+    relay = Relay("unused", upstream, linger=5.0)
+    run_worker(relay, [
+        {"op": "update", "job_id": 1, "lines": [{"message": "a"}]},
+        {"op": "update", "job_id": 2, "lines": [{"message": "b"}], "progress": 10},
+        {"op": "update", "job_id": 1, "lines": [{"message": "c"}], "task_results": [{"task": "t"}]},
+    ])
+    assert upstream.posts == [("/api/logs/batch", {"batches": [
+        {"job_id": 1, "lines": [{"message": "a"}, {"message": "c"}], "task_results": [{"task": "t"}]},
+        {"job_id": 2, "lines": [{"message": "b"}], "progress": 10},
+    ]})]
+    assert relay._pending_lines == 0
+
+
+def test_update_without_a_job_id_is_dropped_alone():
+    upstream = FakeUpstream()
+    relay = Relay("unused", upstream, linger=5.0)
+    run_worker(relay, [
+        {"op": "update", "lines": [{"message": "no job"}]},
+        {"op": "update", "job_id": "seven", "lines": [{"message": "bad job"}]},
+        {"op": "update", "job_id": 3, "lines": [{"message": "kept"}]},
+    ])
+    assert upstream.posts == [("/api/logs/batch", {"batches": [{"job_id": 3, "lines": [{"message": "kept"}]}]})]
+    assert relay._pending_lines == 0
+
+
+def test_pending_limit_drops_further_updates():
+    upstream = FakeUpstream()
+    relay = Relay("unused", upstream, linger=5.0, max_pending=2)
+    run_worker(relay, [
+        {"op": "update", "job_id": 1, "lines": [{"message": "a"}, {"message": "b"}]},
+        {"op": "update", "job_id": 1, "lines": [{"message": "c"}]},
+    ])
+    assert upstream.posts == [("/api/logs/batch", {"batches": [{"job_id": 1, "lines": [{"message": "a"}, {"message": "b"}]}]})]
+
+
+class ValidatingUpstream(FakeUpstream):
+    """Answers like the dashboard does when a line's message is not a string."""
+
+    def post_json(self, path, payload):
+        self.posts.append((path, payload))
+        detail = [
+            {"loc": ["body", "batches", b, "lines", i, "message"], "msg": "Input should be a valid string"}
+            for b, batch in enumerate(payload["batches"])
+            for i, line in enumerate(batch["lines"])
+            if not isinstance(line.get("message"), str)
+        ]
+        if detail:
+            return 422, json.dumps({"detail": detail}).encode()
+        return 200, b"{}"
+
+
+def test_rejected_lines_are_dropped_and_the_rest_resent():
+    upstream = ValidatingUpstream()
+    relay = Relay("unused", upstream, linger=5.0)
+    run_worker(relay, [
+        {"op": "update", "job_id": 1, "lines": [{"message": "a"}, {"message": None}, {"message": "b"}]},
+        {"op": "update", "job_id": 2, "lines": [{"message": 5}], "progress": 30},
+    ])
+    assert len(upstream.posts) == 2
+    assert upstream.posts[1] == ("/api/logs/batch", {"batches": [
+        {"job_id": 1, "lines": [{"message": "a"}, {"message": "b"}]},
+        {"job_id": 2, "lines": [], "progress": 30},
+    ]})
+    assert relay._pending_lines == 0
+
+
+def test_rejection_without_usable_locations_is_not_retried():
+    upstream = FakeUpstream()
+    upstream.post_json = lambda path, payload: upstream.posts.append(payload) or (422, b'{"detail": "bad"}')
+    relay = Relay("unused", upstream, linger=5.0)
+    run_worker(relay, [{"op": "update", "job_id": 1, "lines": [{"message": "a"}]}])
+    assert len(upstream.posts) == 1
+
+
+def test_relay_serves_plugins_over_its_socket(tmp_path):
+    upstream = FakeUpstream()
+    path = str(tmp_path / "relay.sock")
+    relay = Relay(path, upstream, linger=5.0)
+    server = threading.Thread(target=relay.serve_forever, daemon=True)
+    server.start()
+    for _ in range(100):
+        if relay._listener is not None:
+            break
+        time.sleep(0.01)
+    try:
+        assert os.stat(path).st_mode & 0o777 == 0o600
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as plugin:
+            plugin.settimeout(5)
+            plugin.connect(path)
+            send_frame(plugin, {"op": "hello"})
+            assert recv_frame(plugin)[0] == {"op": "hello", "url": upstream.url, "version": 1}
+            send_frame(plugin, {"op": "update", "job_id": 7, "lines": [{"message": "before"}]})
+            send_frame(plugin, {"op": "request", "id": 1, "method": "POST", "path": "/api/jobs/complete", "headers": {}}, b"{}")
+            header, body = recv_frame(plugin)
+        assert header == {"op": "response", "id": 1, "status": 200} and body == b'{"job_id": 7}'
+        # Updates sent before a request reach the dashboard first.
+        assert upstream.posts == [("/api/logs/batch", {"batches": [{"job_id": 7, "lines": [{"message": "before"}]}]})]
+        assert upstream.requests == [("POST", "/api/jobs/complete", b"{}", {})]
+    finally:
+        relay.shutdown()
@@ -1,16 +1,43 @@
 from __future__ import annotations
 
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect, Query
-from fastapi.responses import JSONResponse
+from fastapi import FastAPI, Request, WebSocket, WebSocketDisconnect, Query
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
-from sqlalchemy import DateTime, Float, Integer, String, Text, create_engine
+from sqlalchemy import Boolean, DateTime, Float, Index, Integer, LargeBinary, MetaData, String, Table, Text, bindparam, case, create_engine, delete, event, func, insert, inspect, select, text, update
+from sqlalchemy.exc import OperationalError
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, sessionmaker
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
 import os
 import asyncio
+import bisect
+import gzip
+import hashlib
+import html
+import importlib
+from collections import deque
+import itertools
 import json
+import math
+import queue
+import re
+import struct
+import threading
+import time
+import zlib
 from pathlib import Path
+from typing import Any, Callable, NamedTuple
+import logging
+
+try:
+    # optional: better ratio and speed for log archives
+    import zstandard
+except ImportError:  # pragma: no cover
+    zstandard = None
+
+logger = logging.getLogger(__name__)
 
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./database.db")
 
@@ -21,15 +48,82 @@ if DATABASE_URL.startswith("sqlite:///"):
         db_path = Path.cwd() / db_path
     db_path.parent.mkdir(parents=True, exist_ok=True)
 
+IS_SQLITE = DATABASE_URL.startswith("sqlite")
+IS_SQLITE_MEMORY = IS_SQLITE and (":memory:" in DATABASE_URL or DATABASE_URL.rstrip("/") in ("sqlite:", "sqlite://"))
+
+# SQLite storage profile, applied to every new connection. Set SQLITE_TUNING=off
+# to fall back to SQLite's defaults (rollback journal, shared read/write pool).
+SQLITE_TUNING = os.getenv("SQLITE_TUNING", "on").strip().lower() not in ("0", "off", "false", "no")
+SQLITE_JOURNAL_MODE = os.getenv("SQLITE_JOURNAL_MODE", "WAL")
+SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+SQLITE_CACHE_SIZE_KB = int(os.getenv("SQLITE_CACHE_SIZE_KB", "65536"))
+SQLITE_MMAP_SIZE_MB = int(os.getenv("SQLITE_MMAP_SIZE_MB", "256"))
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+SQLITE_TEMP_STORE = os.getenv("SQLITE_TEMP_STORE", "MEMORY")
+DB_READ_POOL_SIZE = max(1, int(os.getenv("DB_READ_POOL_SIZE", "8")))
+
+def sqlite_pragmas(read_only: bool = False) -> list[str]:
+    pragmas = [
+        f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}",
+        f"PRAGMA synchronous={SQLITE_SYNCHRONOUS}",
+        # negative cache_size is in KiB rather than pages
+        f"PRAGMA cache_size=-{SQLITE_CACHE_SIZE_KB}",
+        f"PRAGMA mmap_size={SQLITE_MMAP_SIZE_MB * 1024 * 1024}",
+        f"PRAGMA temp_store={SQLITE_TEMP_STORE}",
+    ]
+    if read_only:
+        pragmas.append("PRAGMA query_only=ON")
+    else:
+        # journal_mode is persistent in the file; only the writer needs to set it.
+        pragmas.insert(0, f"PRAGMA journal_mode={SQLITE_JOURNAL_MODE}")
+    return pragmas
+
+def apply_sqlite_profile(target_engine, read_only: bool = False):
+    pragmas = sqlite_pragmas(read_only=read_only)
+
+    @event.listens_for(target_engine, "connect")
+    def _on_connect(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for pragma in pragmas:
+                cursor.execute(pragma)
+        finally:
+            cursor.close()
+
 engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
+if IS_SQLITE and SQLITE_TUNING:
+    apply_sqlite_profile(engine)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Dashboard reads go through their own pool so they never queue behind the
+# writer. With WAL, readers see the last committed snapshot while ingest runs.
+if IS_SQLITE and SQLITE_TUNING and not IS_SQLITE_MEMORY:
+    read_engine = create_engine(
+        DATABASE_URL,
+        connect_args={"check_same_thread": False},
+        pool_size=DB_READ_POOL_SIZE,
+        max_overflow=DB_READ_POOL_SIZE,
+    )
+    apply_sqlite_profile(read_engine, read_only=True)
+else:
+    read_engine = engine
+ReadSession = sessionmaker(autocommit=False, autoflush=False, bind=read_engine)
+
 
 class Base(DeclarativeBase):
     pass
 
 class Job(Base):
     __tablename__ = "jobs"
+    # (start_time, updated_at) serves the range listing and covers the ETag
+    # summary; updated_at alone serves `updated_since` syncs.
+    # Retention deletes old jobs, possibly the newest ones; AUTOINCREMENT keeps
+    # their ids from being handed to new jobs (see JobLog).
+    __table_args__ = (
+        Index("ix_jobs_start_time_updated_at", "start_time", "updated_at"),
+        Index("ix_jobs_updated_at", "updated_at"),
+        {"sqlite_autoincrement": True},
+    )
     id: Mapped[int] = mapped_column(primary_key=True, index=True)
     job_name: Mapped[str] = mapped_column(String)
     scope: Mapped[str] = mapped_column(String)
@@ -38,18 +132,653 @@ class Job(Base):
     progress: Mapped[float] = mapped_column(Float, default=0)
     start_time: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
     end_time: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
+    # Bumped by every write that changes the job row (start, progress, complete).
+    updated_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True, default=datetime.utcnow)
+    # Weekly log partition holding the job's archived log blocks (see LogPartitions).
+    log_partition: Mapped[str | None] = mapped_column(String, nullable=True)
 
 class JobLog(Base):
     __tablename__ = "job_logs"
+    # (job_id, id) turns every log page into an index range scan and gives rows
+    # with equal timestamps a stable order. Ids are cursors (after_id, search's
+    # before_id, FTS rowids) and archived rows are deleted, so they must never
+    # be reused: AUTOINCREMENT instead of a plain rowid.
+    __table_args__ = (Index("ix_job_logs_job_id_id", "job_id", "id"), {"sqlite_autoincrement": True})
     id: Mapped[int] = mapped_column(primary_key=True, index=True)
-    job_id: Mapped[int] = mapped_column(Integer, index=True)
+    job_id: Mapped[int] = mapped_column(Integer)
     ts: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
     level: Mapped[str] = mapped_column(String, default="info")
     message: Mapped[str] = mapped_column(Text)
 
+class JobLogBlock(Base):
+    """
+    A compressed block of consecutive log lines from a finished job.
+    The (job_id, last_id) index over blocks is the archive's offset table: a
+    ranged read only decompresses the blocks whose id span it touches.
+    """
+    __tablename__ = "job_log_blocks"
+    __table_args__ = (Index("ix_job_log_blocks_job_id_last_id", "job_id", "last_id"),)
+    id: Mapped[int] = mapped_column(primary_key=True)
+    job_id: Mapped[int] = mapped_column(Integer)
+    first_id: Mapped[int] = mapped_column(Integer)
+    last_id: Mapped[int] = mapped_column(Integer)
+    line_count: Mapped[int] = mapped_column(Integer)
+    codec: Mapped[str] = mapped_column(String)
+    data: Mapped[bytes] = mapped_column(LargeBinary)
+
+class JobArtifact(Base):
+    """
+    A file attached to a job, such as the full result of a failed task whose log
+    line only carries a preview. Stored gzip-compressed and served on demand.
+    """
+    __tablename__ = "job_artifacts"
+    __table_args__ = (Index("ux_job_artifacts_job_id_name", "job_id", "name", unique=True),)
+    id: Mapped[int] = mapped_column(primary_key=True)
+    job_id: Mapped[int] = mapped_column(Integer)
+    name: Mapped[str] = mapped_column(String)
+    content_type: Mapped[str] = mapped_column(String)
+    size: Mapped[int] = mapped_column(Integer)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+    data: Mapped[bytes] = mapped_column(LargeBinary)
+
+class TaskResult(Base):
+    """
+    One host's result for one task, sent by the callback plugin next to the
+    rendered log lines so per-host questions (which hosts failed task X, the
+    slowest tasks on a host, the play recap) are indexed queries, not text parsing.
+    """
+    __tablename__ = "task_results"
+    __table_args__ = (
+        Index("ix_task_results_job_id_id", "job_id", "id"),
+        Index("ix_task_results_host_ended_at", "host", "ended_at"),
+        Index("ix_task_results_task_name_ended_at", "task_name", "ended_at"),
+        Index("ix_task_results_status_ended_at", "status", "ended_at"),
+        Index("ix_task_results_ended_at", "ended_at"),
+    )
+    id: Mapped[int] = mapped_column(primary_key=True)
+    job_id: Mapped[int] = mapped_column(Integer)
+    host: Mapped[str] = mapped_column(String)
+    task_name: Mapped[str] = mapped_column(String)
+    task_uuid: Mapped[str | None] = mapped_column(String, nullable=True)
+    action: Mapped[str | None] = mapped_column(String, nullable=True)
+    # ok, changed, failed, ignored, skipped or unreachable
+    status: Mapped[str] = mapped_column(String)
+    changed: Mapped[bool] = mapped_column(Boolean, default=False)
+    started_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
+    ended_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+    duration: Mapped[float | None] = mapped_column(Float, nullable=True)
+
+class JobRollup(Base):
+    """
+    Hourly job aggregates keyed by the jobs' start hour, a dimension ("all",
+    "job_name" or "scope"), its value and the job status. api_start and
+    api_complete keep them current so /api/stats reads O(hours) rows.
+    """
+    __tablename__ = "job_rollups"
+    __table_args__ = (Index("ux_job_rollups_dimension_bucket", "dimension", "bucket", "key", "status", unique=True),)
+    id: Mapped[int] = mapped_column(primary_key=True)
+    bucket: Mapped[datetime] = mapped_column(DateTime)
+    dimension: Mapped[str] = mapped_column(String)
+    key: Mapped[str] = mapped_column(String)
+    status: Mapped[str] = mapped_column(String)
+    jobs: Mapped[int] = mapped_column(Integer, default=0)
+    duration_count: Mapped[int] = mapped_column(Integer, default=0)
+    duration_sum: Mapped[float] = mapped_column(Float, default=0.0)
+    # DurationSketch.dumps() of the finished jobs' durations
+    duration_sketch: Mapped[str | None] = mapped_column(Text, nullable=True)
+
+class BusEvent(Base):
+    """A broadcast shared between backend workers by DatabaseEventBus; pruned after a minute."""
+    __tablename__ = "bus_events"
+    # Workers tail by id, so ids must never be reused once the table has been
+    # pruned empty (a plain rowid restarts from max(rowid) + 1).
+    __table_args__ = {"sqlite_autoincrement": True}
+    id: Mapped[int] = mapped_column(primary_key=True)
+    origin: Mapped[str] = mapped_column(String)
+    topics: Mapped[str] = mapped_column(Text)
+    payload: Mapped[str] = mapped_column(Text)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+
 Base.metadata.create_all(bind=engine)
 
-app = FastAPI()
+def ensure_autoincrement(model, keep_rows: bool, floor_sql: str | None = None):
+    """
+    Rebuild `model`'s table with AUTOINCREMENT if it was created without it.
+    A plain rowid hands out max(rowid) + 1, so ids of deleted newest rows come
+    back. With `keep_rows` the rows are copied over (the sequence continues
+    from their highest id, or from `floor_sql` if that is higher); otherwise
+    the table is recreated empty.
+    """
+    if not IS_SQLITE:
+        return
+    table = model.__table__
+    with engine.begin() as conn:
+        sql = conn.exec_driver_sql("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = ?", (table.name,)).scalar()
+        if sql is None or "AUTOINCREMENT" in sql.upper():
+            return
+        logger.info("Rebuilding %s with AUTOINCREMENT ids", table.name)
+        if not keep_rows:
+            conn.exec_driver_sql(f"DROP TABLE {table.name}")
+            table.create(bind=conn)
+            return
+        old = f"{table.name}_before_autoincrement"
+        # Index names are global: drop the old ones before create() adds them back.
+        for (index_name,) in conn.exec_driver_sql(
+            "SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = ? AND sql IS NOT NULL", (table.name,)
+        ).all():
+            conn.exec_driver_sql(f'DROP INDEX "{index_name}"')
+        conn.exec_driver_sql(f"ALTER TABLE {table.name} RENAME TO {old}")
+        table.create(bind=conn)
+        names = [column.name for column in table.columns]
+        previous = Table(old, MetaData(), autoload_with=conn)
+        conn.execute(insert(table).from_select(names, select(*[previous.c[name] for name in names])))
+        # Triggers on the old table go with it; their owners recreate them.
+        conn.exec_driver_sql(f"DROP TABLE {old}")
+        if floor_sql is not None:
+            floor = conn.exec_driver_sql(floor_sql).scalar() or 0
+            # Copying explicit ids already advanced the sequence to the highest one.
+            seq = conn.exec_driver_sql("SELECT seq FROM sqlite_sequence WHERE name = ?", (table.name,)).scalar()
+            if seq is None:
+                conn.exec_driver_sql("INSERT INTO sqlite_sequence (name, seq) VALUES (?, ?)", (table.name, floor))
+            elif floor > seq:
+                conn.exec_driver_sql("UPDATE sqlite_sequence SET seq = ? WHERE name = ?", (floor, table.name))
+
+def ensure_columns():
+    # create_all() skips tables that already exist, so add nullable columns introduced later.
+    inspector = inspect(engine)
+    for table in Base.metadata.sorted_tables:
+        existing = {column["name"] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing:
+                continue
+            with engine.begin() as conn:
+                conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column.type.compile(engine.dialect)}"))
+    with engine.begin() as conn:
+        conn.execute(text("UPDATE jobs SET updated_at = COALESCE(end_time, start_time) WHERE updated_at IS NULL"))
+
+def ensure_indexes():
+    # create_all() skips tables that already exist, so add indexes introduced later.
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
+
+# Columns first, so rebuilt tables copy every column. bus_events only holds the
+# last minute of events; job_logs keeps its rows and continues after the highest
+# id ever handed out, including archived ones.
+ensure_columns()
+ensure_autoincrement(BusEvent, keep_rows=False)
+ensure_autoincrement(JobLog, keep_rows=True, floor_sql="SELECT MAX(last_id) FROM job_log_blocks")
+ensure_autoincrement(Job, keep_rows=True)
+ensure_indexes()
+
+# In-process metrics, served by GET /metrics in the Prometheus text format.
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+def _escape_label(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_labels(names: tuple[str, ...], values: tuple, extra: tuple[tuple[str, object], ...] = ()) -> str:
+    pairs = [f'{name}="{_escape_label(value)}"' for name, value in (*zip(names, values), *extra)]
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+class Metric:
+    """Base for the metric types; values are kept per label tuple and are thread-safe."""
+    kind = "untyped"
+
+    def __init__(self, name: str, help: str, labels: tuple[str, ...] = ()):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self._values: dict[tuple, float] = {}
+        self._lock = threading.Lock()
+        METRICS.append(self)
+
+    def _key(self, labels: dict) -> tuple:
+        return tuple(labels.get(name, "") for name in self.labels)
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            lines.append(f"{self.name}{_format_labels(self.labels, key)} {value}")
+        return lines
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+class Gauge(Metric):
+    """A value that is set, or read from `fn` at scrape time."""
+    kind = "gauge"
+
+    def __init__(self, name: str, help: str, labels: tuple[str, ...] = (), fn: Callable[[], float] | None = None):
+        super().__init__(name, help, labels)
+        self._fn = fn
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def render(self) -> list[str]:
+        if self._fn is not None:
+            self.set(self._fn())
+        return super().render()
+
+@dataclass
+class HistogramState:
+    counts: list[int]  # per bucket, the last one is +Inf
+    total: float = 0.0
+    count: int = 0
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labels: tuple[str, ...] = (), buckets: tuple[float, ...] = LATENCY_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = buckets
+        self._states: dict[tuple, HistogramState] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._states.get(key)
+            if state is None:
+                state = self._states[key] = HistogramState([0] * (len(self.buckets) + 1))
+            state.counts[index] += 1
+            state.total += value
+            state.count += 1
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            items = sorted((key, list(state.counts), state.total, state.count) for key, state in self._states.items())
+        for key, counts, total, count in items:
+            cumulative = 0
+            for bound, bucket_count in zip((*self.buckets, "+Inf"), counts):
+                cumulative += bucket_count
+                lines.append(f"{self.name}_bucket{_format_labels(self.labels, key, (('le', bound),))} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labels, key)} {total}")
+            lines.append(f"{self.name}_count{_format_labels(self.labels, key)} {count}")
+        return lines
+
+METRICS: list[Metric] = []
+
+HTTP_REQUESTS = Counter("dashboard_http_requests_total", "HTTP requests by route and status.", ("method", "route", "status"))
+HTTP_LATENCY = Histogram("dashboard_http_request_duration_seconds", "HTTP request latency by route.", ("method", "route"))
+DB_COMMIT_LATENCY = Histogram("dashboard_db_commit_duration_seconds", "Time to run and commit one writer group.")
+DB_WRITE_OPS = Counter("dashboard_db_write_ops_total", "Operations committed by the database writer.")
+ROWS_INSERTED = Counter("dashboard_rows_inserted_total", "Rows inserted by ingest; rate() gives rows per second.", ("table",))
+WS_FANOUT_LATENCY = Histogram("dashboard_ws_fanout_duration_seconds", "Time to queue one event for every subscribed WebSocket client.")
+WS_EVENTS = Counter("dashboard_ws_events_total", "Events delivered to this process's WebSocket clients.")
+WS_SEND_FAILURES = Counter("dashboard_ws_send_failures_total", "WebSocket sends that failed or timed out (the client is dropped).", ("reason",))
+WS_SLOW_CONSUMERS = Counter("dashboard_ws_slow_consumer_drops_total", "Clients disconnected for falling more than WS_SEND_QUEUE_LIMIT behind.")
+EVENT_LOOP_LAG = Histogram("dashboard_event_loop_lag_seconds", "How late the event loop wakes a sleeping task.")
+EVENT_LOOP_LAG_INTERVAL_S = 0.5
+
+def render_metrics() -> str:
+    lines = []
+    for metric in METRICS:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+async def monitor_event_loop_lag():
+    loop = asyncio.get_running_loop()
+    while True:
+        started = loop.time()
+        await asyncio.sleep(EVENT_LOOP_LAG_INTERVAL_S)
+        EVENT_LOOP_LAG.observe(max(0.0, loop.time() - started - EVENT_LOOP_LAG_INTERVAL_S))
+
+class RequestMetricsMiddleware:
+    """Count and time HTTP requests, labelled by route template (e.g. /api/jobs/{job_id}/logs)."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        started = time.perf_counter()
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            route = scope.get("route")
+            path = getattr(route, "path", None) or "unmatched"
+            HTTP_REQUESTS.inc(method=scope["method"], route=path, status=status)
+            HTTP_LATENCY.observe(time.perf_counter() - started, method=scope["method"], route=path)
+
+# Group-commit tuning for the single database writer.
+DB_WRITER_MAX_BATCH = max(1, int(os.getenv("DB_WRITER_MAX_BATCH", "256")))
+DB_WRITER_MAX_DELAY_MS = max(0.0, float(os.getenv("DB_WRITER_MAX_DELAY_MS", "5")))
+
+_WRITER_STOP = object()
+
+class DatabaseWriter:
+    """
+    Single writer thread that owns the write session.
+
+    Request handlers submit callables taking a Session; the thread drains the
+    queue, runs up to `max_batch` operations (or whatever arrives within
+    `max_delay` seconds) in one transaction and resolves each caller's future
+    once that commit is durable. This keeps SQLite fsyncs off the event loop
+    and matches SQLite's one-writer model. If a group fails, its operations are
+    replayed one by one so a single bad write only fails its own request.
+    """
+
+    def __init__(self, session_factory, max_batch: int = 256, max_delay: float = 0.005):
+        self._session_factory = session_factory
+        self._max_batch = max_batch
+        self._max_delay = max_delay
+        self._queue: queue.Queue = queue.Queue()
+        self._thread: threading.Thread | None = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run, name="db-writer", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: float = 10.0):
+        with self._lock:
+            thread = self._thread
+            self._thread = None
+        if thread is None:
+            return
+        self._queue.put(_WRITER_STOP)
+        thread.join(timeout)
+
+    async def submit(self, op):
+        """Queue `op(db)` for the writer and wait until its group has committed."""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self.start()
+        self._queue.put((op, loop, future))
+        return await future
+
+    def enqueue(self, op):
+        """Queue background work (e.g. log compaction) without waiting for it."""
+        self.start()
+        self._queue.put((op, None, None))
+
+    def _run(self):
+        with self._session_factory() as db:
+            stopping = False
+            while not stopping:
+                item = self._queue.get()
+                if item is _WRITER_STOP:
+                    break
+                group = [item]
+                deadline = time.monotonic() + self._max_delay
+                while len(group) < self._max_batch:
+                    remaining = deadline - time.monotonic()
+                    try:
+                        nxt = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    if nxt is _WRITER_STOP:
+                        stopping = True
+                        break
+                    group.append(nxt)
+                self._commit_group(db, group)
+
+    def queue_depth(self) -> int:
+        return self._queue.qsize()
+
+    def _commit_group(self, db, group):
+        started = time.perf_counter()
+        try:
+            results = [op(db) for op, _, _ in group]
+            db.commit()
+        except Exception:
+            db.rollback()
+            for item in group:
+                self._commit_one(db, item)
+            return
+        DB_COMMIT_LATENCY.observe(time.perf_counter() - started)
+        DB_WRITE_OPS.inc(len(group))
+        for (_, loop, future), result in zip(group, results):
+            _resolve_future(loop, future, result=result)
+
+    def _commit_one(self, db, item):
+        op, loop, future = item
+        started = time.perf_counter()
+        try:
+            result = op(db)
+            db.commit()
+        except Exception as exc:
+            db.rollback()
+            _resolve_future(loop, future, error=exc)
+            return
+        DB_COMMIT_LATENCY.observe(time.perf_counter() - started)
+        DB_WRITE_OPS.inc()
+        _resolve_future(loop, future, result=result)
+
+def _resolve_future(loop, future, result=None, error: BaseException | None = None):
+    if future is None:
+        if error is not None:
+            logger.error("background database write failed: %s", error)
+        return
+
+    def apply():
+        if future.done():
+            return
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+    try:
+        loop.call_soon_threadsafe(apply)
+    except RuntimeError:
+        # Event loop already closed (shutdown); nobody is waiting any more.
+        pass
+
+writer = DatabaseWriter(SessionLocal, max_batch=DB_WRITER_MAX_BATCH, max_delay=DB_WRITER_MAX_DELAY_MS / 1000.0)
+
+# Progress of running jobs is written behind: at most one UPDATE per job per interval.
+JOB_PROGRESS_FLUSH_MS = max(10, int(os.getenv("JOB_PROGRESS_FLUSH_MS", "1000")))
+
+class RunningJobCache:
+    """
+    In-process copy of every running job, authoritative for its progress.
+
+    Progress updates only touch the cache and mark the job dirty; a periodic
+    flush hands the latest value per job to the writer as one bulk UPDATE.
+    Completion removes the job inside the writer's transaction, so later
+    writes for it fall back to the database. Holds job_to_dict() shaped dicts
+    and hands out copies; safe to use from the event loop and the writer thread.
+    `generation` changes with every change to the cache, for ETags of
+    responses that include cached values the database doesn't have yet.
+    """
+
+    def __init__(self):
+        self._jobs: dict[int, dict] = {}
+        self._dirty: set[int] = set()
+        self._lock = threading.Lock()
+        self.generation = 0
+
+    def load(self, db):
+        rows = db.scalars(select(Job).where(Job.status == "running")).all()
+        with self._lock:
+            self._jobs = {job.id: job_to_dict(job) for job in rows}
+            self._dirty.clear()
+            self.generation += 1
+        logger.info("Cached %s running jobs", len(rows))
+
+    def add(self, job: dict):
+        with self._lock:
+            self._jobs[job["id"]] = dict(job)
+            self.generation += 1
+
+    def __len__(self) -> int:
+        return len(self._jobs)
+
+    def refresh(self, job: dict):
+        """Take a newer copy of a job that is already cached (progress handled by another worker)."""
+        with self._lock:
+            if job["id"] in self._jobs:
+                self._jobs[job["id"]] = dict(job)
+                self.generation += 1
+
+    def get(self, job_id: int) -> dict | None:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job is not None else None
+
+    def snapshot(self) -> dict[int, dict]:
+        with self._lock:
+            return {job_id: dict(job) for job_id, job in self._jobs.items()}
+
+    def set_progress(self, job_id: int, progress: float) -> dict | None:
+        """Record progress for a cached job and return it; None if it is not cached."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+            job["progress"] = float(progress)
+            job["updated_at"] = datetime.utcnow().isoformat()
+            self._dirty.add(job_id)
+            self.generation += 1
+            return dict(job)
+
+    def pop(self, job_id: int):
+        with self._lock:
+            if self._jobs.pop(job_id, None) is not None:
+                self.generation += 1
+            self._dirty.discard(job_id)
+
+    def take_dirty(self) -> list[dict]:
+        with self._lock:
+            rows = [{"job_id": job_id, "progress": self._jobs[job_id]["progress"]} for job_id in self._dirty]
+            self._dirty.clear()
+        return rows
+
+    def flush(self):
+        """Queue the pending progress values for the writer; returns the op, or None if clean."""
+        rows = self.take_dirty()
+        if not rows:
+            return None
+
+        def op(db):
+            # Stamped in the writer so updated_at stays ordered with every other
+            # write (updated_since cursors rely on that). The status guard keeps
+            # a flush queued behind a completion from rewinding its progress.
+            now = datetime.utcnow()
+            db.execute(
+                update(Job.__table__)
+                .where(Job.__table__.c.id == bindparam("job_id"), Job.__table__.c.status == "running")
+                .values(progress=bindparam("progress"), updated_at=now),
+                rows,
+            )
+        return op
+
+running_jobs = RunningJobCache()
+
+async def flush_running_jobs_forever():
+    while True:
+        await asyncio.sleep(JOB_PROGRESS_FLUSH_MS / 1000.0)
+        op = running_jobs.flush()
+        if op is not None:
+            writer.enqueue(op)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    writer.start()
+    await event_bus.start()
+    # Before serving, so no start/complete can interleave with the rebuild.
+    await writer.submit(rebuild_job_rollups_if_empty)
+    await writer.submit(running_jobs.load)
+    if LOG_ARCHIVE_ENABLED and LOG_ARCHIVE_BACKFILL:
+        await asyncio.to_thread(schedule_archive_backfill)
+    flusher = asyncio.create_task(flush_running_jobs_forever())
+    retention = asyncio.create_task(enforce_log_retention_forever()) if LOG_RETENTION_DAYS else None
+    lag_monitor = asyncio.create_task(monitor_event_loop_lag())
+    try:
+        yield
+    finally:
+        lag_monitor.cancel()
+        flusher.cancel()
+        if retention is not None:
+            retention.cancel()
+        await event_bus.stop()
+        # Persist write-behind progress, then drain queued writes before the process exits.
+        op = running_jobs.flush()
+        if op is not None:
+            writer.enqueue(op)
+        await asyncio.to_thread(writer.stop)
+
+# Largest request body accepted after gzip decompression.
+MAX_REQUEST_BODY_MB = max(1, int(os.getenv("MAX_REQUEST_BODY_MB", "64")))
+
+# Artifact uploads are stored compressed exactly as received (see api_put_artifact).
+ARTIFACT_UPLOAD_PATH = re.compile(r"^/api/jobs/\d+/artifacts/[^/]+$")
+
+class GzipRequestMiddleware:
+    """
+    Inflate request bodies sent with `Content-Encoding: gzip` (the callback plugin
+    compresses large log batches) before they reach the JSON body parsing.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        encodings = [v for k, v in scope.get("headers", ()) if k == b"content-encoding"]
+        if not encodings or encodings[-1].strip().lower() != b"gzip":
+            return await self.app(scope, receive, send)
+        if scope["method"] == "PUT" and ARTIFACT_UPLOAD_PATH.match(scope["path"]):
+            return await self.app(scope, receive, send)
+        limit = MAX_REQUEST_BODY_MB * 1024 * 1024
+        inflater = zlib.decompressobj(wbits=31)
+        body = bytearray()
+        try:
+            more = True
+            while more:
+                message = await receive()
+                if message["type"] != "http.request":
+                    return
+                body += inflater.decompress(message.get("body", b""), limit + 1 - len(body))
+                more = message.get("more_body", False)
+                if len(body) > limit:
+                    response = JSONResponse({"detail": "Request body too large"}, status_code=413)
+                    return await response(scope, receive, send)
+            body += inflater.flush()
+        except zlib.error:
+            response = JSONResponse({"detail": "Invalid gzip request body"}, status_code=400)
+            return await response(scope, receive, send)
+        headers = [(k, v) for k, v in scope["headers"] if k not in (b"content-encoding", b"content-length")]
+        headers.append((b"content-length", str(len(body)).encode()))
+        sent = False
+
+        async def inflated_receive():
+            nonlocal sent
+            if not sent:
+                sent = True
+                return {"type": "http.request", "body": bytes(body), "more_body": False}
+            return await receive()
+
+        await self.app({**scope, "headers": headers}, inflated_receive, send)
+
+app = FastAPI(lifespan=lifespan)
+# Innermost, so the matched route is visible in its scope after the call.
+app.add_middleware(RequestMetricsMiddleware)
+app.add_middleware(GzipRequestMiddleware)
 
 # Allow overriding CORS origins via env (comma-separated). Defaults to "*" for dev.
 cors_env = os.getenv("BACKEND_CORS_ORIGINS", "*")
@@ -63,28 +792,481 @@ app.add_middleware(
 )
 
 # WebSocket manager
+# Clients subscribe to topics: "jobs" (job list feed: start/progress/complete) and
+# "job:<id>" (that job's log stream and status). Sockets that never send a
+# subscription stay on the "*" topic and receive everything, as before.
+JOBS_TOPIC = "jobs"
+ALL_TOPICS = "*"
+MAX_TOPICS_PER_SOCKET = 64
+
+def job_topic(job_id: int) -> str:
+    return f"job:{job_id}"
+
+def parse_topics(values) -> list[str]:
+    topics = []
+    for value in values or []:
+        topic = str(value).strip()
+        if topic in (JOBS_TOPIC, ALL_TOPICS):
+            topics.append(topic)
+        elif topic.startswith("job:") and topic[4:].isdigit():
+            topics.append(f"job:{int(topic[4:])}")
+    return topics
+
+# Outbound delivery: every socket gets a bounded queue drained by its own sender
+# task, so broadcast() only enqueues and never waits on a slow client.
+WS_SEND_QUEUE_LIMIT = max(1, int(os.getenv("WS_SEND_QUEUE_LIMIT", "2000")))
+WS_FLUSH_INTERVAL_MS = max(0.0, float(os.getenv("WS_FLUSH_INTERVAL_MS", "25")))
+WS_SEND_TIMEOUT_S = max(0.1, float(os.getenv("WS_SEND_TIMEOUT_S", "10")))
+WS_CLOSE_TRY_AGAIN = 1013
+# Recent broadcasts kept for clients that reconnect with ?since=<seq>.
+WS_REPLAY_EVENTS = max(0, int(os.getenv("WS_REPLAY_EVENTS", "5000")))
+# A snapshot sent instead of a replay lists running jobs plus jobs that finished this recently.
+WS_SNAPSHOT_RECENT_MINUTES = max(0, int(os.getenv("WS_SNAPSHOT_RECENT_MINUTES", "60")))
+
+class ClientConnection:
+    """
+    Pending frames for one socket, in order.
+    - job_progress frames are coalesced per job: a queued frame is replaced by
+      the latest one instead of queueing both.
+    - job_log / job_log_batch lines for a job accumulate into the queued
+      job_log_batch frame until the sender flushes it (every WS_FLUSH_INTERVAL_MS),
+      as long as no other frame has been queued behind it.
+    - more than WS_SEND_QUEUE_LIMIT pending frames/lines marks the client as too
+      slow: it gets a `resync` frame and is disconnected.
+    """
+
+    def __init__(self, websocket: WebSocket, on_close):
+        self.websocket = websocket
+        self._on_close = on_close
+        self._entries: deque[dict] = deque()
+        self._progress: dict[int, dict] = {}
+        self._logs: dict[int, dict] = {}
+        self._pending = 0
+        self._wakeup = asyncio.Event()
+        self._task: asyncio.Task | None = None
+        # Held so the slow-consumer close isn't garbage collected mid-flight.
+        self._close_task: asyncio.Task | None = None
+        self.closed = False
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    def enqueue(self, message: dict, data: str | None = None):
+        if self.closed:
+            return
+        kind = message.get("type")
+        job = message.get("job") or {}
+        if kind == "job_progress" and job.get("id") is not None:
+            self._retire(self._progress.get(job["id"]))
+            self._progress[job["id"]] = self._push({"message": message, "data": data}, 1)
+        elif kind in ("job_log", "job_log_batch"):
+            lines = [message["log"]] if kind == "job_log" else list(message.get("logs") or [])
+            raw_id = job.get("id") if job else (lines[0].get("job_id") if lines else None)
+            if raw_id is None:
+                # Nothing to merge on; send it as it came.
+                self._push({"message": message, "data": data}, max(1, len(lines)))
+            else:
+                job_id = int(raw_id)
+                previous = self._logs.get(job_id)
+                if previous is not None and previous is self._last():
+                    # Still the newest frame: the lines join it in place. Once
+                    # anything is queued behind it, merging would send these
+                    # lines (and their seq) ahead of that frame, so a new
+                    # frame starts instead.
+                    merged = previous["message"]
+                    previous["size"] += len(lines)
+                    self._pending += len(lines)
+                else:
+                    merged = {"type": "job_log_batch", "job": None, "logs": []}
+                    self._logs[job_id] = self._push({"message": merged, "data": None, "job_id": job_id}, len(lines))
+                if job:
+                    merged["job"] = job
+                if "seq" in message:
+                    merged["seq"] = message["seq"]
+                merged["logs"].extend(lines)
+        else:
+            if kind in ("job_start", "job_complete") and job.get("id") is not None:
+                # A newer status supersedes any queued progress frame for the job.
+                self._retire(self._progress.pop(job["id"], None))
+            self._push({"message": message, "data": data}, 1)
+        if self._pending > WS_SEND_QUEUE_LIMIT:
+            if self._close_task is None:
+                WS_SLOW_CONSUMERS.inc()
+                self._close_task = asyncio.create_task(self.close(resync=True))
+            return
+        self._wakeup.set()
+
+    def _push(self, entry: dict, size: int) -> dict:
+        entry["size"] = size
+        self._entries.append(entry)
+        self._pending += size
+        return entry
+
+    def _last(self) -> dict | None:
+        for entry in reversed(self._entries):
+            if entry["message"] is not None:
+                return entry
+        return None
+
+    def _retire(self, entry: dict | None):
+        # A superseded progress frame is dropped from its slot, which is skipped
+        # on send; the replacement goes to the tail so frames leave in `seq` order.
+        if entry is None:
+            return
+        entry["message"] = None
+        self._pending -= entry["size"]
+        entry["size"] = 0
+
+    def _pop(self) -> dict:
+        entry = self._entries.popleft()
+        self._pending -= entry["size"]
+        message = entry["message"]
+        if message is not None:
+            kind = message.get("type")
+            if kind == "job_progress":
+                job_id = (message.get("job") or {}).get("id")
+                if job_id is not None and self._progress.get(job_id) is entry:
+                    del self._progress[job_id]
+            elif "job_id" in entry and self._logs.get(entry["job_id"]) is entry:
+                del self._logs[entry["job_id"]]
+        return entry
+
+    async def _run(self):
+        try:
+            while True:
+                await self._wakeup.wait()
+                if WS_FLUSH_INTERVAL_MS:
+                    # Let lines and progress updates accumulate into fewer frames.
+                    await asyncio.sleep(WS_FLUSH_INTERVAL_MS / 1000.0)
+                self._wakeup.clear()
+                while self._entries:
+                    entry = self._pop()
+                    message = entry["message"]
+                    if message is None:
+                        continue
+                    data = entry["data"]
+                    if data is None:
+                        if message.get("type") == "job_log_batch" and not message.get("job") and len(message["logs"]) == 1:
+                            # A lone line keeps the original single-line frame shape.
+                            single = {"type": "job_log", "log": message["logs"][0]}
+                            if "seq" in message:
+                                single["seq"] = message["seq"]
+                            message = single
+                        data = json.dumps(message, default=str)
+                    await asyncio.wait_for(self.websocket.send_text(data), WS_SEND_TIMEOUT_S)
+        except asyncio.CancelledError:
+            raise
+        except Exception as exc:
+            # Send failed or timed out: the socket is dead or hopelessly slow.
+            WS_SEND_FAILURES.inc(reason="timeout" if isinstance(exc, asyncio.TimeoutError) else "error")
+            await self.close()
+
+    async def close(self, resync: bool = False):
+        if self.closed:
+            return
+        self.closed = True
+        self._entries.clear()
+        self._progress.clear()
+        self._logs.clear()
+        self._on_close(self.websocket)
+        if self._task is not None and self._task is not asyncio.current_task():
+            self._task.cancel()
+        try:
+            if resync:
+                # Tell the client its view is stale so it refetches after reconnecting.
+                await asyncio.wait_for(
+                    self.websocket.send_text(json.dumps({"type": "resync", "reason": "slow_consumer"})),
+                    1.0,
+                )
+            await asyncio.wait_for(self.websocket.close(code=WS_CLOSE_TRY_AGAIN if resync else 1011), 1.0)
+        except Exception as exc:
+            # The peer is already gone or not reading; nothing left to tell it.
+            logger.debug("websocket close failed: %r", exc)
+
 class ConnectionManager:
     def __init__(self):
         self.active = []
+        # topic -> subscribed sockets, so fanout only touches interested clients
+        self.topics: dict[str, set[WebSocket]] = {}
+        self.subscriptions: dict[WebSocket, set[str]] = {}
+        self.clients: dict[WebSocket, ClientConnection] = {}
+        # Every broadcast gets the next seq; `epoch` changes per process so a
+        # client can tell a resumable gap from a backend restart.
+        self.seq = 0
+        self.epoch = os.urandom(6).hex()
+        self.history: deque[tuple[int, tuple[str, ...], dict, str]] = deque(maxlen=WS_REPLAY_EVENTS)
 
-    async def connect(self, websocket: WebSocket):
+    async def connect(
+        self,
+        websocket: WebSocket,
+        topics: list[str] | None = None,
+        since: int | None = None,
+        epoch: str | None = None,
+        snapshot=None,
+    ):
+        """
+        Register a socket. With `since`, frames after that seq are replayed when
+        they are still buffered; otherwise `snapshot()` (run in a thread) supplies
+        the current jobs for a single `snapshot` frame. A `hello` frame first
+        tells the client which seq the stream continues from.
+        """
         await websocket.accept()
+        frames = []
+        if since is not None and not self.can_resume(since, epoch):
+            since = self.seq
+            jobs = await asyncio.to_thread(snapshot) if snapshot is not None else []
+            frames.append({"type": "snapshot", "seq": since, "jobs": jobs})
+        # No awaits from here on: replaying and registering happen in one step so
+        # no broadcast can fall between them.
         self.active.append(websocket)
+        self.subscriptions[websocket] = set()
+        self.subscribe(websocket, topics if topics else [ALL_TOPICS])
+        client = self.clients[websocket] = ClientConnection(websocket, on_close=self.disconnect)
+        resumed = since is not None and not frames
+        client.enqueue({"type": "hello", "seq": self.seq if since is None else since, "epoch": self.epoch, "resumed": resumed})
+        for frame in frames:
+            client.enqueue(frame)
+        if since is not None:
+            self.replay(websocket, client, since)
+        client.start()
+
+    def can_resume(self, since: int, epoch: str | None) -> bool:
+        if epoch != self.epoch or since < 0 or since > self.seq:
+            return False
+        if since == self.seq:
+            return True
+        return bool(self.history) and self.history[0][0] <= since + 1
+
+    def replay(self, websocket: WebSocket, client: "ClientConnection", since: int):
+        subscribed = self.subscriptions.get(websocket, set())
+        if not self.history or since >= self.seq:
+            return
+        start = max(0, since + 1 - self.history[0][0])
+        for _, topics, message, data in itertools.islice(self.history, start, None):
+            if ALL_TOPICS in subscribed or not subscribed.isdisjoint(topics):
+                client.enqueue(message, data)
 
     def disconnect(self, websocket: WebSocket):
         try:
             self.active.remove(websocket)
         except ValueError:
             pass
+        for topic in self.subscriptions.pop(websocket, set()):
+            self._remove_subscriber(topic, websocket)
+        client = self.clients.pop(websocket, None)
+        if client is not None and not client.closed:
+            client.closed = True
+            if client._task is not None:
+                client._task.cancel()
+
+    def subscribe(self, websocket: WebSocket, topics: list[str]):
+        current = self.subscriptions.get(websocket)
+        if current is None:
+            return
+        for topic in topics:
+            if topic in current or len(current) >= MAX_TOPICS_PER_SOCKET:
+                continue
+            current.add(topic)
+            self.topics.setdefault(topic, set()).add(websocket)
 
-    async def broadcast(self, message: dict):
-        if not self.active:
+    def unsubscribe(self, websocket: WebSocket, topics: list[str]):
+        current = self.subscriptions.get(websocket)
+        if current is None:
             return
+        for topic in topics:
+            if topic in current:
+                current.discard(topic)
+                self._remove_subscriber(topic, websocket)
+
+    def _remove_subscriber(self, topic: str, websocket: WebSocket):
+        subscribers = self.topics.get(topic)
+        if subscribers is None:
+            return
+        subscribers.discard(websocket)
+        if not subscribers:
+            del self.topics[topic]
+
+    async def handle_message(self, websocket: WebSocket, raw: str):
+        """
+        Apply a client control message:
+        {"action": "subscribe" | "unsubscribe", "topics": ["jobs", "job:12"]}
+        The first such message takes the socket off the catch-all "*" topic.
+        """
+        try:
+            message = json.loads(raw)
+        except (TypeError, ValueError):
+            return
+        if not isinstance(message, dict):
+            return
+        action = message.get("action")
+        if action not in ("subscribe", "unsubscribe"):
+            return
+        topics = parse_topics(message.get("topics"))
+        if ALL_TOPICS not in topics:
+            self.unsubscribe(websocket, [ALL_TOPICS])
+        if action == "subscribe":
+            self.subscribe(websocket, topics)
+        else:
+            self.unsubscribe(websocket, topics)
+        client = self.clients.get(websocket)
+        if client is not None:
+            client.enqueue({"type": "subscribed", "topics": sorted(self.subscriptions.get(websocket, ()))})
+
+    async def broadcast(self, message: dict, topics: tuple[str, ...] = (JOBS_TOPIC,)):
+        """Publish an event on the bus, which delivers it to the sockets of every worker."""
+        await event_bus.publish(message, tuple(topics))
+
+    def deliver(self, message: dict, topics: tuple[str, ...]):
+        """Hand an event to this process's subscribed sockets."""
+        started = time.perf_counter()
+        self.seq += 1
+        message["seq"] = self.seq
+        # Serialise once; per-client queues only re-serialise frames they merge.
         data = json.dumps(message, default=str)
-        await asyncio.gather(*[ws.send_text(data) for ws in list(self.active)], return_exceptions=True)
+        if self.history.maxlen:
+            self.history.append((self.seq, tuple(topics), message, data))
+        targets: set[WebSocket] = set()
+        for topic in (*topics, ALL_TOPICS):
+            targets.update(self.topics.get(topic, ()))
+        for ws in targets:
+            client = self.clients.get(ws)
+            if client is not None:
+                client.enqueue(message, data)
+        WS_EVENTS.inc()
+        WS_FANOUT_LATENCY.observe(time.perf_counter() - started)
 
 manager = ConnectionManager()
 
+# Read at scrape time.
+Gauge("dashboard_db_writer_queue_depth", "Operations waiting for the database writer.", fn=writer.queue_depth)
+Gauge("dashboard_ws_clients", "Connected WebSocket clients.", fn=lambda: len(manager.clients))
+Gauge("dashboard_running_jobs", "Running jobs held in the in-memory cache.", fn=lambda: len(running_jobs))
+
+# Event bus: carries broadcasts to every backend process, so several uvicorn
+# workers (or replicas sharing one database) each serve their own sockets.
+# A bus is built as `factory(deliver)` and provides `async start()`,
+# `async stop()` and `async publish(message, topics)`; it must pass every
+# event, including this process's own, to `deliver(message, topics)` once.
+# uvicorn --workers reads its default from WEB_CONCURRENCY; with more than one
+# worker there, share events through the database unless told otherwise.
+WEB_CONCURRENCY = int(os.getenv("WEB_CONCURRENCY") or "1")
+EVENT_BUS = os.getenv("EVENT_BUS", "").strip() or ("db" if WEB_CONCURRENCY > 1 else "local")
+EVENT_BUS_POLL_MS = max(5, int(os.getenv("EVENT_BUS_POLL_MS", "50")))
+EVENT_BUS_RETENTION_S = 60
+
+class LocalEventBus:
+    """Delivers events in this process only; enough for a single worker."""
+
+    def __init__(self, deliver):
+        self._deliver = deliver
+
+    async def start(self):
+        pass
+
+    async def stop(self):
+        pass
+
+    async def publish(self, message: dict, topics: tuple[str, ...]):
+        self._deliver(message, topics)
+
+class DatabaseEventBus:
+    """
+    Shares events through the `bus_events` table of the shared database.
+
+    Own events are delivered at once and appended to the table by the writer;
+    its group commit puts the events of a burst in one transaction. A tail task reads rows from other workers every EVENT_BUS_POLL_MS, applies
+    them to this worker's running-job cache and delivers them. Rows older than
+    EVENT_BUS_RETENTION_S are pruned.
+    """
+
+    def __init__(self, deliver):
+        self._deliver = deliver
+        self.origin = os.urandom(6).hex()
+        self._last_id = 0
+        self._marks: deque[tuple[float, int]] = deque()
+        self._task: asyncio.Task | None = None
+
+    async def start(self):
+        self._last_id = await asyncio.to_thread(self._max_id)
+        self._task = asyncio.create_task(self._tail())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+
+    async def publish(self, message: dict, topics: tuple[str, ...]):
+        row = {"origin": self.origin, "topics": json.dumps(topics), "payload": json.dumps(message, default=str), "created_at": datetime.utcnow()}
+        self._deliver(message, topics)
+        # The row is bound to the op, not read from shared state when it runs,
+        # so the writer can replay the op after a failed group.
+        writer.enqueue(lambda db: db.execute(insert(BusEvent), [row]))
+
+    def _max_id(self) -> int:
+        with ReadSession() as db:
+            return db.scalar(select(func.max(BusEvent.id))) or 0
+
+    def _read(self, after_id: int) -> list:
+        with ReadSession() as db:
+            return list(db.execute(
+                select(BusEvent.id, BusEvent.origin, BusEvent.topics, BusEvent.payload)
+                .where(BusEvent.id > after_id).order_by(BusEvent.id).limit(1000)
+            ).all())
+
+    async def _tail(self):
+        while True:
+            await asyncio.sleep(EVENT_BUS_POLL_MS / 1000.0)
+            try:
+                await self.poll()
+            except Exception:
+                logger.exception("event bus read failed")
+
+    async def poll(self):
+        """Deliver the events other workers appended since the last poll, then prune."""
+        rows = await asyncio.to_thread(self._read, self._last_id)
+        for row in rows:
+            if row.origin != self.origin:
+                message = json.loads(row.payload)
+                message.pop("seq", None)
+                apply_remote_job_event(message)
+                self._deliver(message, tuple(json.loads(row.topics)))
+            self._last_id = row.id
+        self._prune()
+
+    def _prune(self):
+        now = time.monotonic()
+        if not self._marks or now - self._marks[-1][0] >= EVENT_BUS_RETENTION_S / 4:
+            self._marks.append((now, self._last_id))
+        floor = None
+        while self._marks and now - self._marks[0][0] >= EVENT_BUS_RETENTION_S:
+            floor = self._marks.popleft()[1]
+        if floor:
+            writer.enqueue(lambda db: db.execute(delete(BusEvent).where(BusEvent.id <= floor)))
+
+def apply_remote_job_event(message: dict):
+    # Keep this worker's running-job cache in step with writes handled elsewhere.
+    job = message.get("job")
+    if not job or job.get("id") is None:
+        return
+    kind = message.get("type")
+    if kind == "job_complete":
+        running_jobs.pop(job["id"])
+    elif kind == "job_start":
+        running_jobs.add(job)
+    elif kind == "job_progress":
+        # Only refresh: a late progress event must not bring back a completed job.
+        running_jobs.refresh(job)
+
+def load_event_bus(name: str):
+    if name == "local":
+        return LocalEventBus(manager.deliver)
+    if name == "db":
+        return DatabaseEventBus(manager.deliver)
+    module_name, _, attr = name.partition(":")
+    factory = getattr(importlib.import_module(module_name), attr or "event_bus")
+    return factory(manager.deliver)
+
+event_bus = load_event_bus(EVENT_BUS)
+
 # Pydantic models
 class StartPayload(BaseModel):
     job_name: str
@@ -98,6 +1280,30 @@ class ProgressPayload(BaseModel):
     message: str | None = None
     level: str | None = "info"
 
+class LogLinePayload(BaseModel):
+    message: str
+    level: str | None = "info"
+    ts: datetime | None = None
+
+class TaskResultPayload(BaseModel):
+    host: str
+    task_name: str
+    task_uuid: str | None = None
+    action: str | None = None
+    status: str
+    changed: bool = False
+    started_at: datetime | None = None
+    ended_at: datetime | None = None
+
+class LogBatchPayload(BaseModel):
+    job_id: int
+    progress: float | None = None
+    lines: list[LogLinePayload] = []
+    task_results: list[TaskResultPayload] = []
+
+class MultiLogBatchPayload(BaseModel):
+    batches: list[LogBatchPayload] = []
+
 class CompletePayload(BaseModel):
     job_id: int
     status: str
@@ -114,100 +1320,1533 @@ def job_to_dict(job: Job):
         "progress": float(job.progress or 0),
         "start_time": (job.start_time.isoformat() if job.start_time else None),
         "end_time": (job.end_time.isoformat() if job.end_time else None),
+        "updated_at": (job.updated_at.isoformat() if job.updated_at else None),
     }
 
+def parse_range_cutoff(value: str, now: datetime | None = None) -> datetime:
+    """Translate a range like `24h`, `7d` or `all` into the earliest timestamp it covers."""
+    now = now or datetime.utcnow()
+    value = (value or "").strip().lower()
+    try:
+        if value.endswith("h"):
+            return now - timedelta(hours=int(value[:-1]))
+        if value.endswith("d"):
+            return now - timedelta(days=int(value[:-1]))
+    except ValueError:
+        pass
+    return datetime.min
+
+def format_db_timestamp(value: datetime | None) -> str | None:
+    # Matches how SQLAlchemy stores DateTime values in SQLite.
+    return value.strftime("%Y-%m-%d %H:%M:%S.%f") if value else None
+
+def to_utc_naive(value: datetime | None, fallback: datetime) -> datetime:
+    # Stored timestamps are naive UTC; normalise aware values sent by clients.
+    if value is None:
+        return fallback
+    if value.tzinfo is not None:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+# Log archives
+# When a job completes its rows are compacted into compressed blocks of
+# LOG_ARCHIVE_BLOCK_LINES lines and the per-line rows are deleted. Readers merge
+# archived blocks with any remaining rows, so callers never see the difference.
+LOG_ARCHIVE_ENABLED = os.getenv("LOG_ARCHIVE_ENABLED", "on").strip().lower() not in ("0", "off", "false", "no")
+LOG_ARCHIVE_BLOCK_LINES = max(1, int(os.getenv("LOG_ARCHIVE_BLOCK_LINES", "1000")))
+LOG_ARCHIVE_BLOCKS_PER_STEP = max(1, int(os.getenv("LOG_ARCHIVE_BLOCKS_PER_STEP", "16")))
+LOG_ARCHIVE_BACKFILL = os.getenv("LOG_ARCHIVE_BACKFILL", "off").strip().lower() in ("1", "on", "true", "yes")
+LOG_ARCHIVE_CODEC = os.getenv("LOG_ARCHIVE_CODEC", "zstd" if zstandard is not None else "zlib").strip().lower()
+if LOG_ARCHIVE_CODEC not in ("zstd", "zlib") or (LOG_ARCHIVE_CODEC == "zstd" and zstandard is None):
+    LOG_ARCHIVE_CODEC = "zlib"
+
+class LogRecord(NamedTuple):
+    id: int
+    ts: datetime | None
+    level: str | None
+    message: str | None
+
+def encode_log_block(records: list[LogRecord], codec: str) -> bytes:
+    """
+    Block layout (before compression):
+    line count (u32), line ids (i64 each), n+1 body offsets (u32 each), then the
+    body of JSON-encoded `[ts, level, message]` records. The id/offset table lets
+    a ranged read decode only the lines it needs from a decompressed block.
+    """
+    bodies = [
+        json.dumps([r.ts.isoformat() if r.ts else None, r.level, r.message], separators=(",", ":")).encode("utf-8")
+        for r in records
+    ]
+    offsets = [0]
+    for body in bodies:
+        offsets.append(offsets[-1] + len(body))
+    count = len(records)
+    raw = b"".join([
+        struct.pack(f"<I{count}q{count + 1}I", count, *(r.id for r in records), *offsets),
+        *bodies,
+    ])
+    if codec == "zstd":
+        return zstandard.ZstdCompressor(level=6).compress(raw)
+    return zlib.compress(raw, 6)
+
+def decode_log_block(codec: str, data: bytes, after_id: int | None = None, before_id: int | None = None) -> list[LogRecord]:
+    if codec == "zstd":
+        if zstandard is None:
+            raise RuntimeError("the zstandard package is required to read zstd log archives")
+        raw = zstandard.ZstdDecompressor().decompress(data)
+    else:
+        raw = zlib.decompress(data)
+    (count,) = struct.unpack_from("<I", raw, 0)
+    ids = struct.unpack_from(f"<{count}q", raw, 4)
+    offsets = struct.unpack_from(f"<{count + 1}I", raw, 4 + 8 * count)
+    body_start = 4 + 8 * count + 4 * (count + 1)
+    lo = bisect.bisect_right(ids, after_id) if after_id is not None else 0
+    hi = bisect.bisect_left(ids, before_id) if before_id is not None else count
+    records = []
+    for i in range(lo, hi):
+        ts, level, message = json.loads(raw[body_start + offsets[i]:body_start + offsets[i + 1]])
+        records.append(LogRecord(ids[i], datetime.fromisoformat(ts) if ts else None, level, message))
+    return records
+
+# Log partitions. Archived blocks of finished jobs, and their search entries, go
+# to one SQLite file per ISO week (the week the job was archived), so retention
+# deletes whole files instead of rows. Live lines of running jobs stay in the
+# main database; compaction moves them out when the job completes.
+LOG_PARTITIONS_ENABLED = (
+    IS_SQLITE and not IS_SQLITE_MEMORY
+    and os.getenv("LOG_PARTITIONS", "on").strip().lower() not in ("0", "off", "false", "no")
+)
+LOG_PARTITION_DIR = os.getenv("LOG_PARTITION_DIR") or (
+    str(db_path.parent / "log_partitions") if DATABASE_URL.startswith("sqlite:///") else "log_partitions"
+)
+# Partitions whose week ended more than this many days ago are deleted; 0 keeps everything.
+LOG_RETENTION_DAYS = max(0, int(os.getenv("LOG_RETENTION_DAYS", "0")))
+# Also delete jobs that finished before the retention cutoff, with their task results and artifacts.
+LOG_RETENTION_JOBS = os.getenv("LOG_RETENTION_JOBS", "off").strip().lower() in ("1", "on", "true", "yes")
+LOG_RETENTION_INTERVAL_S = 3600
+
+class LogPartitions:
+    """
+    Router for the weekly log partition files (`logs-<year>w<week>.db`).
+
+    Each partition has its own engine with the job_log_blocks table and, when
+    FTS5 is available, its own job_logs_fts table. Engines are opened lazily;
+    drop() disposes one and deletes its files, which costs the same no matter
+    how many lines the week held and never touches the main database.
+    """
+
+    def __init__(self, directory: str):
+        self._dir = Path(directory)
+        self._engines: dict = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key_for(value: datetime) -> str:
+        year, week, _ = value.isocalendar()
+        return f"{year}w{week:02d}"
+
+    @staticmethod
+    def week_end(key: str) -> datetime:
+        year, week = key.split("w")
+        return datetime.fromisocalendar(int(year), int(week), 1) + timedelta(days=7)
+
+    def path(self, key: str) -> Path:
+        return self._dir / f"logs-{key}.db"
+
+    def keys(self) -> list[str]:
+        """Existing partitions, newest first."""
+        if not self._dir.is_dir():
+            return []
+        keys = [p.name[len("logs-"):-len(".db")] for p in self._dir.glob("logs-*w*.db")]
+        return sorted(keys, reverse=True)
+
+    def keys_since(self, cutoff: datetime) -> list[str]:
+        """Partitions that can hold lines at or after `cutoff`, newest first."""
+        return [key for key in self.keys() if self.week_end(key) > cutoff]
+
+    def engine(self, key: str, create: bool = False):
+        with self._lock:
+            partition_engine = self._engines.get(key)
+            if partition_engine is not None:
+                return partition_engine
+            path = self.path(key)
+            if not path.exists():
+                if not create:
+                    return None
+                path.parent.mkdir(parents=True, exist_ok=True)
+                path.touch()
+            # mode=rw: a reader racing drop() gets an error instead of recreating an empty file.
+            partition_engine = create_engine(
+                f"sqlite:///file:{path}?mode=rw&uri=true", connect_args={"check_same_thread": False}
+            )
+            if SQLITE_TUNING:
+                apply_sqlite_profile(partition_engine)
+            # Creates the table and its indexes when missing.
+            Base.metadata.create_all(bind=partition_engine, tables=[Base.metadata.tables[JobLogBlock.__tablename__]])
+            if LOG_SEARCH_FTS:
+                with partition_engine.begin() as conn:
+                    conn.exec_driver_sql(log_search_ddl(if_not_exists=True))
+            self._engines[key] = partition_engine
+            return partition_engine
+
+    def drop(self, key: str):
+        with self._lock:
+            partition_engine = self._engines.pop(key, None)
+            if partition_engine is not None:
+                partition_engine.dispose()
+            for suffix in ("", "-wal", "-shm"):
+                Path(f"{self.path(key)}{suffix}").unlink(missing_ok=True)
+
+log_partitions = LogPartitions(LOG_PARTITION_DIR)
+
+def enforce_log_retention():
+    """Delete log partitions older than LOG_RETENTION_DAYS (and, optionally, the jobs)."""
+    cutoff = datetime.utcnow() - timedelta(days=LOG_RETENTION_DAYS)
+    for key in log_partitions.keys():
+        if log_partitions.week_end(key) <= cutoff:
+            log_partitions.drop(key)
+            logger.info("Dropped log partition %s", key)
+    if LOG_RETENTION_JOBS:
+        def step(db):
+            if delete_expired_jobs_step(db, cutoff):
+                writer.enqueue(step)
+        writer.enqueue(step)
+
+def delete_log_index_ranges(conn, spans):
+    """Remove the job_logs_fts entries of (job_id, first_id, last_id) spans."""
+    if spans:
+        conn.execute(
+            text("DELETE FROM job_logs_fts WHERE rowid BETWEEN :first AND :last AND job_id = :job_id"),
+            [{"job_id": job_id, "first": first_id, "last": last_id} for job_id, first_id, last_id in spans],
+        )
+
+def delete_expired_jobs_step(db, cutoff: datetime, batch: int = 500) -> bool:
+    """
+    Delete up to `batch` jobs that finished before `cutoff`; return True if more
+    remain. Running jobs are kept however old, since a playbook may still be
+    writing to them.
+    """
+    # start_time <= end_time, so the start_time index narrows the scan.
+    job_ids = db.scalars(
+        select(Job.id)
+        .where(Job.start_time < cutoff, Job.end_time < cutoff, Job.status != "running")
+        .order_by(Job.id)
+        .limit(batch)
+    ).all()
+    if not job_ids:
+        return False
+    # Blocks in a partition that has not been dropped yet go first, with their
+    # search entries; if the main transaction is then lost, the next run finds
+    # the jobs again and only the main database is left to clean.
+    partitioned = db.execute(
+        select(Job.id, Job.log_partition).where(Job.id.in_(job_ids), Job.log_partition.is_not(None))
+    ).all()
+    for key in sorted({row.log_partition for row in partitioned}):
+        partition_engine = log_partitions.engine(key)
+        if partition_engine is None:
+            continue
+        partition_job_ids = [row.id for row in partitioned if row.log_partition == key]
+        with partition_engine.begin() as conn:
+            if LOG_SEARCH_FTS:
+                delete_log_index_ranges(conn, conn.execute(
+                    select(JobLogBlock.job_id, JobLogBlock.first_id, JobLogBlock.last_id).where(JobLogBlock.job_id.in_(partition_job_ids))
+                ).all())
+            conn.execute(delete(JobLogBlock).where(JobLogBlock.job_id.in_(partition_job_ids)))
+    if LOG_SEARCH_FTS:
+        # The main index holds live lines and blocks archived in the main database.
+        delete_log_index_ranges(db, db.execute(
+            select(JobLog.job_id, func.min(JobLog.id), func.max(JobLog.id)).where(JobLog.job_id.in_(job_ids)).group_by(JobLog.job_id)
+        ).all())
+        delete_log_index_ranges(db, db.execute(
+            select(JobLogBlock.job_id, JobLogBlock.first_id, JobLogBlock.last_id).where(JobLogBlock.job_id.in_(job_ids))
+        ).all())
+    for model in (JobLog, JobLogBlock, TaskResult, JobArtifact):
+        db.execute(delete(model).where(model.job_id.in_(job_ids)))
+    db.execute(delete(Job).where(Job.id.in_(job_ids)))
+    return len(job_ids) == batch
+
+async def enforce_log_retention_forever():
+    while True:
+        try:
+            await asyncio.to_thread(enforce_log_retention)
+        except Exception:
+            logger.exception("log retention failed")
+        await asyncio.sleep(LOG_RETENTION_INTERVAL_S)
+
+def archive_log_records(db, job_id: int, records: list[LogRecord]):
+    """Store one block of a job's records in its archive: its log partition, or the main database."""
+    block = {
+        "job_id": job_id,
+        "first_id": records[0].id,
+        "last_id": records[-1].id,
+        "line_count": len(records),
+        "codec": LOG_ARCHIVE_CODEC,
+        "data": encode_log_block(records, LOG_ARCHIVE_CODEC),
+    }
+    if not LOG_PARTITIONS_ENABLED:
+        db.execute(insert(JobLogBlock), [block])
+        return
+    job = db.get(Job, job_id)
+    if job.log_partition is None:
+        job.log_partition = log_partitions.key_for(datetime.utcnow())
+    # The partition commits first. If the main transaction is then replayed or
+    # lost, the rows are still live and archiving them again replaces this block.
+    with log_partitions.engine(job.log_partition, create=True).begin() as conn:
+        conn.execute(
+            delete(JobLogBlock).where(
+                JobLogBlock.job_id == job_id,
+                JobLogBlock.first_id <= block["last_id"],
+                JobLogBlock.last_id >= block["first_id"],
+            )
+        )
+        conn.execute(insert(JobLogBlock), [block])
+        if LOG_SEARCH_FTS:
+            conn.execute(
+                text("INSERT OR REPLACE INTO job_logs_fts(rowid, message, job_id, level, ts) VALUES (:id, :message, :job_id, :level, :ts)"),
+                [
+                    {"id": r.id, "message": r.message, "job_id": job_id, "level": r.level, "ts": format_db_timestamp(r.ts)}
+                    for r in records
+                ],
+            )
+    if LOG_SEARCH_FTS:
+        # The lines are searchable in the partition now; keep the main index to live lines.
+        db.execute(
+            text("DELETE FROM job_logs_fts WHERE rowid BETWEEN :first AND :last AND job_id = :job_id"),
+            {"first": block["first_id"], "last": block["last_id"], "job_id": job_id},
+        )
+
+def compact_job_logs_step(db, job_id: int) -> bool:
+    """Archive up to LOG_ARCHIVE_BLOCKS_PER_STEP blocks of a job's rows; return True if rows remain."""
+    for _ in range(LOG_ARCHIVE_BLOCKS_PER_STEP):
+        rows = db.execute(
+            select(JobLog.id, JobLog.ts, JobLog.level, JobLog.message)
+            .where(JobLog.job_id == job_id)
+            .order_by(JobLog.id.asc())
+            .limit(LOG_ARCHIVE_BLOCK_LINES)
+        ).all()
+        if not rows:
+            return False
+        records = [LogRecord(*row) for row in rows]
+        archive_log_records(db, job_id, records)
+        db.execute(delete(JobLog).where(JobLog.job_id == job_id, JobLog.id <= records[-1].id))
+        if len(records) < LOG_ARCHIVE_BLOCK_LINES:
+            return False
+    return True
+
+def schedule_log_compaction(job_id: int):
+    # Compaction runs on the writer in small steps, each its own transaction, so
+    # archiving a huge job never holds up ingest for other jobs for long.
+    def step(db):
+        if compact_job_logs_step(db, job_id):
+            writer.enqueue(step)
+    writer.enqueue(step)
+
+def schedule_archive_backfill():
+    # Archive jobs that finished before compaction existed (or before a restart).
+    with ReadSession() as db:
+        job_ids = db.scalars(
+            select(Job.id).where(Job.end_time.is_not(None), Job.id.in_(select(JobLog.job_id).distinct()))
+        ).all()
+    for job_id in job_ids:
+        schedule_log_compaction(job_id)
+
+def read_log_blocks(conn, job_id: int, after_id: int | None, before_id: int | None, limit: int | None, backwards: bool) -> list[LogRecord]:
+    archived: list[LogRecord] = []
+    block_cursor = None
+    while limit is None or len(archived) < limit:
+        bq = select(JobLogBlock.first_id, JobLogBlock.codec, JobLogBlock.data).where(JobLogBlock.job_id == job_id)
+        if after_id is not None:
+            bq = bq.where(JobLogBlock.last_id > after_id)
+        if before_id is not None:
+            bq = bq.where(JobLogBlock.first_id < before_id)
+        if block_cursor is not None:
+            bq = bq.where(JobLogBlock.first_id < block_cursor if backwards else JobLogBlock.first_id > block_cursor)
+        bq = bq.order_by(JobLogBlock.first_id.desc() if backwards else JobLogBlock.first_id.asc()).limit(4)
+        blocks = conn.execute(bq).all()
+        for block in blocks:
+            decoded = decode_log_block(block.codec, block.data, after_id, before_id)
+            archived.extend(reversed(decoded) if backwards else decoded)
+        if len(blocks) < 4:
+            break
+        block_cursor = blocks[-1].first_id
+    return archived
+
+def read_job_logs(db, job_id: int, after_id: int | None = None, before_id: int | None = None, limit: int | None = None) -> list[LogRecord]:
+    """
+    Return a job's log records in id order from archived blocks and live rows.
+    With `before_id` (and no `after_id`) the `limit` records closest to the
+    cursor are returned; otherwise the first `limit` records after `after_id`.
+    """
+    backwards = before_id is not None and after_id is None
+    # Blocks archived before partitioning (or with it off) live in the main database.
+    archived = read_log_blocks(db, job_id, after_id, before_id, limit, backwards)
+    partition = db.scalar(select(Job.log_partition).where(Job.id == job_id)) if LOG_PARTITIONS_ENABLED else None
+    partition_engine = log_partitions.engine(partition) if partition else None
+    if partition_engine is not None:
+        with partition_engine.connect() as conn:
+            partitioned = read_log_blocks(conn, job_id, after_id, before_id, limit, backwards)
+        if archived and partitioned:
+            archived = sorted(archived + partitioned, key=lambda r: r.id, reverse=backwards)
+        else:
+            archived = archived or partitioned
+
+    rq = select(JobLog.id, JobLog.ts, JobLog.level, JobLog.message).where(JobLog.job_id == job_id)
+    if after_id is not None:
+        rq = rq.where(JobLog.id > after_id)
+    if before_id is not None:
+        rq = rq.where(JobLog.id < before_id)
+    rq = rq.order_by(JobLog.id.desc() if backwards else JobLog.id.asc())
+    if limit is not None:
+        rq = rq.limit(limit)
+    live = [LogRecord(*row) for row in db.execute(rq)]
+
+    records = archived + live
+    if archived and live:
+        # A block archived just before its rows' delete committed shows up twice.
+        archived_ids = {r.id for r in archived}
+        records = archived + [r for r in live if r.id not in archived_ids]
+        records.sort(key=lambda r: r.id, reverse=backwards)
+    if limit is not None:
+        records = records[:limit]
+    if backwards:
+        records.reverse()
+    return records
+
+# Full-text search over log lines. On SQLite with FTS5, `job_logs_fts` mirrors
+# every inserted log line through a trigger, so the per-line endpoint, the batch
+# endpoint and anything else that inserts into job_logs stay in sync. Compaction
+# deletes rows from job_logs but leaves their FTS entries in place, so archived
+# logs remain searchable; with log partitions the entries move into the
+# partition's own job_logs_fts along with the blocks.
+LOG_SEARCH_TOKENIZER = os.getenv("LOG_SEARCH_TOKENIZER", "unicode61")
+
+def sqlite_has_fts5() -> bool:
+    if not IS_SQLITE:
+        return False
+    with engine.connect() as conn:
+        options = {row[0] for row in conn.exec_driver_sql("PRAGMA compile_options")}
+    return "ENABLE_FTS5" in options
+
+def log_search_ddl(if_not_exists: bool = False) -> str:
+    return (
+        f"CREATE VIRTUAL TABLE {'IF NOT EXISTS ' if if_not_exists else ''}job_logs_fts USING fts5("
+        "message, job_id UNINDEXED, level UNINDEXED, ts UNINDEXED, "
+        f"tokenize = '{LOG_SEARCH_TOKENIZER}')"
+    )
+
+def ensure_log_search() -> bool:
+    if not sqlite_has_fts5():
+        return False
+    with engine.begin() as conn:
+        exists = conn.exec_driver_sql(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'job_logs_fts'"
+        ).first() is not None
+        if not exists:
+            conn.exec_driver_sql(log_search_ddl())
+        conn.exec_driver_sql(
+            "CREATE TRIGGER IF NOT EXISTS job_logs_fts_insert AFTER INSERT ON job_logs BEGIN "
+            "INSERT INTO job_logs_fts(rowid, message, job_id, level, ts) "
+            "VALUES (new.id, new.message, new.job_id, new.level, new.ts); END"
+        )
+        if not exists:
+            # First start with search enabled: index existing rows and archives.
+            conn.exec_driver_sql(
+                "INSERT INTO job_logs_fts(rowid, message, job_id, level, ts) "
+                "SELECT id, message, job_id, level, ts FROM job_logs"
+            )
+            blocks = conn.execute(select(JobLogBlock.job_id, JobLogBlock.codec, JobLogBlock.data))
+            for block in blocks:
+                conn.execute(
+                    text("INSERT INTO job_logs_fts(rowid, message, job_id, level, ts) VALUES (:id, :message, :job_id, :level, :ts)"),
+                    [
+                        {"id": r.id, "message": r.message, "job_id": block.job_id, "level": r.level, "ts": format_db_timestamp(r.ts)}
+                        for r in decode_log_block(block.codec, block.data)
+                    ],
+                )
+    return True
+
+LOG_SEARCH_FTS = ensure_log_search()
+
+def fts_rowid_floor(db, cutoff: datetime) -> int | None:
+    """
+    Smallest FTS rowid whose timestamp is at or after `cutoff`, found by binary
+    search over rowids (log ids grow with time). Lets a range-limited search stop
+    at the range boundary instead of walking every older match.
+    """
+    # ORDER BY rowid LIMIT 1 is a direct lookup; min()/max() would scan the table.
+    first = db.execute(text("SELECT rowid FROM job_logs_fts ORDER BY rowid LIMIT 1")).first()
+    last = db.execute(text("SELECT rowid FROM job_logs_fts ORDER BY rowid DESC LIMIT 1")).first()
+    if first is None or last is None:
+        return None
+    lo, hi = first[0], last[0]
+    target = format_db_timestamp(cutoff)
+    probe = text("SELECT rowid, ts FROM job_logs_fts WHERE rowid >= :rowid ORDER BY rowid LIMIT 1")
+    while lo < hi:
+        mid = (lo + hi) // 2
+        row = db.execute(probe, {"rowid": mid}).first()
+        if row is None:
+            hi = mid
+        elif row.ts is not None and row.ts >= target:
+            hi = mid
+        else:
+            lo = row.rowid + 1
+    return lo
+
+def build_fts_query(q: str) -> str:
+    # Quote each term so punctuation common in Ansible output (brackets, colons,
+    # "=>") is matched literally instead of being parsed as FTS5 syntax.
+    terms = [t.replace('"', '""') for t in q.split() if t]
+    return " ".join(f'"{t}"' for t in terms)
+
+# snippet() marks hits with these private-use characters; render_snippet swaps
+# them for the caller's markers after escaping, so log text can't inject markup.
+SNIPPET_HIT_START = "\ue000"
+SNIPPET_HIT_END = "\ue001"
+
+def render_snippet(snippet: str, highlight_start: str, highlight_end: str) -> str:
+    return (
+        html.escape(snippet, quote=False)
+        .replace(SNIPPET_HIT_START, highlight_start)
+        .replace(SNIPPET_HIT_END, highlight_end)
+    )
+
+# Job rollups
+STATS_DIMENSIONS = ("all", "job_name", "scope")
+
+class DurationSketch:
+    """
+    Mergeable quantile sketch for durations in seconds. Values fall into
+    logarithmic bins with about 1% relative error (the DDSketch scheme), so
+    hourly sketches can be summed and still answer p50/p95.
+    """
+    RELATIVE_ACCURACY = 0.01
+    GAMMA = (1 + RELATIVE_ACCURACY) / (1 - RELATIVE_ACCURACY)
+    LOG_GAMMA = math.log(GAMMA)
+    # Shorter durations are counted as zero.
+    MIN_VALUE = 1e-3
+
+    def __init__(self, bins: dict[int, int] | None = None, zeros: int = 0):
+        self.bins = bins or {}
+        self.zeros = zeros
+
+    @classmethod
+    def loads(cls, raw: str | None) -> "DurationSketch":
+        if not raw:
+            return cls()
+        data = json.loads(raw)
+        return cls({int(k): v for k, v in data.get("b", {}).items()}, data.get("z", 0))
+
+    def dumps(self) -> str:
+        return json.dumps({"z": self.zeros, "b": self.bins}, separators=(",", ":"))
+
+    @property
+    def count(self) -> int:
+        return self.zeros + sum(self.bins.values())
+
+    def add(self, value: float):
+        if value < self.MIN_VALUE:
+            self.zeros += 1
+            return
+        index = math.ceil(math.log(value) / self.LOG_GAMMA)
+        self.bins[index] = self.bins.get(index, 0) + 1
+
+    def merge(self, other: "DurationSketch"):
+        self.zeros += other.zeros
+        for index, count in other.bins.items():
+            self.bins[index] = self.bins.get(index, 0) + count
+
+    def quantile(self, q: float) -> float | None:
+        total = self.count
+        if not total:
+            return None
+        rank = q * (total - 1)
+        seen = self.zeros
+        if rank < seen:
+            return 0.0
+        for index in sorted(self.bins):
+            seen += self.bins[index]
+            if seen > rank:
+                # Midpoint of the bin (GAMMA**(index-1), GAMMA**index].
+                return 2 * self.GAMMA ** index / (self.GAMMA + 1)
+        return None
+
+def stats_bucket(value: datetime) -> datetime:
+    return value.replace(minute=0, second=0, microsecond=0)
+
+def bump_job_rollups(db, job: Job, status: str, jobs: int, duration: float | None = None):
+    """Add `jobs` (may be negative) to the job's rollup rows for `status`, plus one duration sample."""
+    if job.start_time is None:
+        return
+    bucket = stats_bucket(job.start_time)
+    for dimension, key in (("all", ""), ("job_name", job.job_name or ""), ("scope", job.scope or "")):
+        row = db.execute(
+            select(JobRollup).where(
+                JobRollup.dimension == dimension,
+                JobRollup.bucket == bucket,
+                JobRollup.key == key,
+                JobRollup.status == status,
+            )
+        ).scalar_one_or_none()
+        if row is None:
+            row = JobRollup(bucket=bucket, dimension=dimension, key=key, status=status, jobs=0, duration_count=0, duration_sum=0.0)
+            db.add(row)
+            # The writer's session does not autoflush; make the row visible to the next lookup.
+            db.flush()
+        row.jobs += jobs
+        if duration is not None:
+            sketch = DurationSketch.loads(row.duration_sketch)
+            sketch.add(duration)
+            row.duration_sketch = sketch.dumps()
+            row.duration_count += 1
+            row.duration_sum += duration
+
+def job_duration(job: Job) -> float | None:
+    if job.start_time is None or job.end_time is None:
+        return None
+    return max(0.0, (job.end_time - job.start_time).total_seconds())
+
+def rebuild_job_rollups_if_empty(db):
+    # Jobs recorded before rollups existed: aggregate them once in memory, then
+    # insert the rows in one go (per-job bump_job_rollups() is far too slow here).
+    if db.query(JobRollup.id).first() is not None or db.query(Job.id).first() is None:
+        return
+    totals: dict[tuple, list] = {}
+    last_id = 0
+    while True:
+        jobs = db.execute(
+            select(Job.id, Job.job_name, Job.scope, Job.status, Job.start_time, Job.end_time)
+            .where(Job.id > last_id).order_by(Job.id).limit(5000)
+        ).all()
+        if not jobs:
+            break
+        for job in jobs:
+            if job.start_time is None:
+                continue
+            bucket = stats_bucket(job.start_time)
+            duration = job_duration(job)
+            for dimension, key in (("all", ""), ("job_name", job.job_name or ""), ("scope", job.scope or "")):
+                entry = totals.get((dimension, bucket, key, job.status))
+                if entry is None:
+                    entry = totals[(dimension, bucket, key, job.status)] = [0, 0, 0.0, DurationSketch()]
+                entry[0] += 1
+                if duration is not None:
+                    entry[1] += 1
+                    entry[2] += duration
+                    entry[3].add(duration)
+        last_id = jobs[-1].id
+    # OR IGNORE: with several workers, more than one may find the table empty.
+    db.execute(insert(JobRollup).prefix_with("OR IGNORE", dialect="sqlite"), [
+        {"bucket": bucket, "dimension": dimension, "key": key, "status": status, "jobs": n, "duration_count": count,
+         "duration_sum": total, "duration_sketch": sketch.dumps() if count else None}
+        for (dimension, bucket, key, status), (n, count, total, sketch) in totals.items()
+    ])
+    logger.info("Built %s job rollups for jobs up to id %s", len(totals), last_id)
+
+class StatsAccumulator:
+    def __init__(self):
+        self.jobs = 0
+        self.by_status: dict[str, int] = {}
+        self.duration_count = 0
+        self.duration_sum = 0.0
+        self.sketch = DurationSketch()
+
+    def add(self, status: str, jobs: int, duration_count: int = 0, duration_sum: float = 0.0, sketch: DurationSketch | None = None):
+        self.jobs += jobs
+        self.by_status[status] = self.by_status.get(status, 0) + jobs
+        self.duration_count += duration_count
+        self.duration_sum += duration_sum
+        if sketch is not None:
+            self.sketch.merge(sketch)
+
+    def to_dict(self) -> dict:
+        return {
+            "total": self.jobs,
+            "by_status": {k: v for k, v in sorted(self.by_status.items()) if v},
+            "duration": {
+                "count": self.duration_count,
+                "sum": self.duration_sum,
+                "avg": self.duration_sum / self.duration_count if self.duration_count else None,
+                "p50": self.sketch.quantile(0.5),
+                "p95": self.sketch.quantile(0.95),
+            },
+        }
+
 # API endpoints
+# Write handlers build an operation and hand it to the single writer thread so the
+# event loop never blocks on SQLite; they return plain dicts computed inside the
+# transaction and broadcast only after the commit is durable.
 @app.post("/api/jobs/start")
 async def api_start(payload: StartPayload):
-    # Use a session context to ensure connections are returned to the pool
-    with SessionLocal() as db:
-        new_job = Job(job_name=payload.job_name, scope=payload.scope, triggered_by=payload.triggered_by)
+    def op(db):
+        now = datetime.utcnow()
+        new_job = Job(job_name=payload.job_name, scope=payload.scope, triggered_by=payload.triggered_by,
+                      status="running", start_time=now, updated_at=now)
         db.add(new_job)
-        db.commit()
-        db.refresh(new_job)
+        db.flush()
+        bump_job_rollups(db, new_job, new_job.status, 1)
         # optional initial log
-        log = JobLog(job_id=new_job.id, message="Job started")
-        db.add(log)
-        db.commit()
+        db.add(JobLog(job_id=new_job.id, message="Job started"))
+        return job_to_dict(new_job)
 
-        msg = {"type": "job_start", "job": job_to_dict(new_job)}
-        await manager.broadcast(msg)
-        return {"job_id": new_job.id}
+    job = await writer.submit(op)
+    ROWS_INSERTED.inc(table="jobs")
+    ROWS_INSERTED.inc(table="job_logs")
+    running_jobs.add(job)
+    await manager.broadcast({"type": "job_start", "job": job}, topics=(JOBS_TOPIC, job_topic(job["id"])))
+    return {"job_id": job["id"]}
 
 @app.post("/api/jobs/progress")
 async def api_progress(payload: ProgressPayload):
-    with SessionLocal() as db:
-        job = db.query(Job).filter(Job.id == payload.job_id).first()
-        if not job:
-            return JSONResponse(status_code=404, content={"error": "job not found"})
-        if payload.progress is not None:
-            job.progress = payload.progress
+    # Running jobs are served from the cache: a bare progress bump needs no
+    # database round trip, and a message only costs its log insert.
+    if payload.progress is not None:
+        cached = running_jobs.set_progress(payload.job_id, payload.progress)
+    else:
+        cached = running_jobs.get(payload.job_id)
+
+    def op(db):
+        if cached is None:
+            job = db.query(Job).filter(Job.id == payload.job_id).first()
+            if not job:
+                return None
+            if payload.progress is not None:
+                job.progress = payload.progress
+                job.updated_at = datetime.utcnow()
+        log = None
         if payload.message:
-            log = JobLog(job_id=payload.job_id, message=payload.message, level=payload.level or "info")
+            log = JobLog(job_id=payload.job_id, ts=datetime.utcnow(), message=payload.message, level=payload.level or "info")
             db.add(log)
-        db.commit()
-        db.refresh(job)
-        msg = {"type": "job_progress", "job": job_to_dict(job)}
-        await manager.broadcast(msg)
-        # also broadcast log if present
-        if payload.message:
-            await manager.broadcast({"type": "job_log", "log": {"job_id": payload.job_id, "message": payload.message, "level": payload.level, "ts": datetime.utcnow().isoformat()}})
-        return {"ok": True}
+            db.flush()
+        return (cached or job_to_dict(job)), (log.id, log.ts) if log is not None else None
+
+    if cached is not None and not payload.message:
+        result = cached, None
+    else:
+        result = await writer.submit(op)
+    if result is None:
+        return JSONResponse(status_code=404, content={"error": "job not found"})
+    job, log = result
+    await manager.broadcast({"type": "job_progress", "job": job}, topics=(JOBS_TOPIC, job_topic(payload.job_id)))
+    # also broadcast log if present
+    if log is not None:
+        ROWS_INSERTED.inc(table="job_logs")
+        log_id, ts = log
+        await manager.broadcast(
+            {"type": "job_log", "log": {"id": log_id, "job_id": payload.job_id, "message": payload.message, "level": payload.level, "ts": ts.isoformat()}},
+            topics=(job_topic(payload.job_id),),
+        )
+    return {"ok": True}
+
+def log_batch_rows(payload: LogBatchPayload, now: datetime) -> list[dict]:
+    return [
+        {
+            "job_id": payload.job_id,
+            "ts": to_utc_naive(line.ts, now),
+            "level": line.level or "info",
+            "message": line.message,
+        }
+        for line in payload.lines
+    ]
+
+def task_result_rows(payload: LogBatchPayload, now: datetime) -> list[dict]:
+    rows = []
+    for item in payload.task_results:
+        ended_at = to_utc_naive(item.ended_at, now)
+        started_at = to_utc_naive(item.started_at, ended_at) if item.started_at is not None else None
+        rows.append({
+            "job_id": payload.job_id,
+            "host": item.host,
+            "task_name": item.task_name,
+            "task_uuid": item.task_uuid,
+            "action": item.action,
+            "status": item.status,
+            "changed": item.changed,
+            "started_at": started_at,
+            "ended_at": ended_at,
+            "duration": max(0.0, (ended_at - started_at).total_seconds()) if started_at is not None else None,
+        })
+    return rows
+
+def write_log_batch(db, payload: LogBatchPayload, rows: list[dict], results: list[dict] | None = None):
+    """Apply one job's batch inside the writer's transaction; None if the job is unknown."""
+    if payload.progress is not None:
+        job = running_jobs.set_progress(payload.job_id, payload.progress)
+    else:
+        job = running_jobs.get(payload.job_id)
+    if job is None:
+        row = db.query(Job).filter(Job.id == payload.job_id).first()
+        if not row:
+            return None
+        if payload.progress is not None:
+            row.progress = payload.progress
+            row.updated_at = datetime.utcnow()
+        job = job_to_dict(row)
+    ids = []
+    if rows:
+        result = db.execute(insert(JobLog).returning(JobLog.id, sort_by_parameter_order=True), rows)
+        ids = result.scalars().all()
+    if results:
+        db.execute(insert(TaskResult), results)
+    return job, ids
+
+async def broadcast_log_batch(payload: LogBatchPayload, job: dict, ids: list[int], rows: list[dict]):
+    # Log lines only go to watchers of this job; the job list feed just needs progress.
+    if payload.progress is not None:
+        await manager.broadcast({"type": "job_progress", "job": job}, topics=(JOBS_TOPIC,))
+    await manager.broadcast({
+        "type": "job_log_batch",
+        "job": job,
+        "logs": [
+            {"id": log_id, "job_id": r["job_id"], "message": r["message"], "level": r["level"], "ts": r["ts"].isoformat()}
+            for log_id, r in zip(ids, rows)
+        ],
+    }, topics=(job_topic(payload.job_id),))
+
+@app.post("/api/jobs/logs/batch")
+async def api_log_batch(payload: LogBatchPayload):
+    """
+    Append an ordered batch of log lines (and optionally progress) to a job.
+    All lines are written with a single bulk insert and commit, and clients
+    receive one aggregated `job_log_batch` frame instead of a frame per line.
+    """
+    now = datetime.utcnow()
+    rows = log_batch_rows(payload, now)
+    results = task_result_rows(payload, now)
+
+    def op(db):
+        return write_log_batch(db, payload, rows, results)
+
+    result = await writer.submit(op)
+    if result is None:
+        return JSONResponse(status_code=404, content={"error": "job not found"})
+    job, ids = result
+    ROWS_INSERTED.inc(len(rows), table="job_logs")
+    ROWS_INSERTED.inc(len(results), table="task_results")
+    await broadcast_log_batch(payload, job, ids, rows)
+    return {"ok": True, "inserted": len(rows)}
+
+@app.post("/api/logs/batch")
+async def api_multi_log_batch(payload: MultiLogBatchPayload):
+    """
+    Apply log batches for several jobs in one request and one commit. Used by
+    the local relay (ansible/dashboard_relay.py), which merges the output of
+    every playbook running on a control node. Unknown jobs are skipped and
+    listed in `missing`.
+    """
+    now = datetime.utcnow()
+    rows = [log_batch_rows(batch, now) for batch in payload.batches]
+    task_rows = [task_result_rows(batch, now) for batch in payload.batches]
+
+    def op(db):
+        return [
+            write_log_batch(db, batch, batch_rows, batch_results)
+            for batch, batch_rows, batch_results in zip(payload.batches, rows, task_rows)
+        ]
+
+    results = await writer.submit(op)
+    inserted = 0
+    missing = []
+    for batch, batch_rows, batch_results, result in zip(payload.batches, rows, task_rows, results):
+        if result is None:
+            missing.append(batch.job_id)
+            continue
+        job, ids = result
+        inserted += len(batch_rows)
+        ROWS_INSERTED.inc(len(batch_rows), table="job_logs")
+        ROWS_INSERTED.inc(len(batch_results), table="task_results")
+        await broadcast_log_batch(batch, job, ids, batch_rows)
+    return {"ok": True, "inserted": inserted, "missing": missing}
 
 @app.post("/api/jobs/complete")
 async def api_complete(payload: CompletePayload):
-    with SessionLocal() as db:
+    def op(db):
         job = db.query(Job).filter(Job.id == payload.job_id).first()
         if not job:
-            return JSONResponse(status_code=404, content={"error": "job not found"})
+            return None
+        previous_status, first_completion = job.status, job.end_time is None
+        # Out of the cache before this commits: later writes go to the row, and
+        # its pending write-behind progress is superseded by the final state.
+        running_jobs.pop(job.id)
         job.status = payload.status
         job.progress = 100.0
-        job.end_time = datetime.utcnow()
+        job.end_time = job.updated_at = datetime.utcnow()
+        # Move the job to its final status in the rollups; its duration is
+        # only sampled the first time it completes.
+        bump_job_rollups(db, job, previous_status, -1)
+        bump_job_rollups(db, job, job.status, 1, job_duration(job) if first_completion else None)
         if payload.message:
-            log = JobLog(job_id=payload.job_id, message=payload.message, level="info")
-            db.add(log)
-        db.commit()
-        db.refresh(job)
-        await manager.broadcast({"type": "job_complete", "job": job_to_dict(job)})
-        return {"ok": True}
+            db.add(JobLog(job_id=payload.job_id, message=payload.message, level="info"))
+        return job_to_dict(job)
+
+    job = await writer.submit(op)
+    if job is None:
+        return JSONResponse(status_code=404, content={"error": "job not found"})
+    if payload.message:
+        ROWS_INSERTED.inc(table="job_logs")
+    if LOG_ARCHIVE_ENABLED:
+        schedule_log_compaction(payload.job_id)
+    await manager.broadcast({"type": "job_complete", "job": job}, topics=(JOBS_TOPIC, job_topic(payload.job_id)))
+    return {"ok": True}
+
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    """Prometheus text exposition of the in-process metrics."""
+    return Response(render_metrics(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+# Optional API features, so clients such as the callback plugin can detect what
+# this backend accepts before relying on it.
+API_FEATURES = ["logs_batch", "gzip_requests", "artifacts", "logs_multi_batch", "task_results"]
+
+@app.get("/api/capabilities")
+def api_capabilities():
+    return {"features": API_FEATURES}
+
+@app.get("/api/stats")
+def api_stats(range: str = Query("24h"), group_by: str | None = Query(None, pattern="^(job_name|scope)$"), limit: int = Query(20, ge=1, le=500)):
+    """
+    Job counts by status and duration statistics (avg, p50, p95) for jobs
+    started within `range`. Whole hours come from the hourly rollups; only the
+    partial hour at the start of the range is read from the jobs table.
+    With `group_by`, the same figures per job name or scope, busiest first.
+    """
+    cutoff = parse_range_cutoff(range)
+    first_bucket = stats_bucket(cutoff)
+    if first_bucket < cutoff:
+        first_bucket += timedelta(hours=1)
+    dimension = group_by or "all"
+    totals: dict[str, StatsAccumulator] = {}
+    with ReadSession() as db:
+        rows = db.execute(
+            select(JobRollup.key, JobRollup.status, JobRollup.jobs, JobRollup.duration_count, JobRollup.duration_sum, JobRollup.duration_sketch)
+            .where(JobRollup.dimension == dimension, JobRollup.bucket >= first_bucket)
+        ).all()
+        for r in rows:
+            totals.setdefault(r.key, StatsAccumulator()).add(
+                r.status, r.jobs, r.duration_count, r.duration_sum, DurationSketch.loads(r.duration_sketch)
+            )
+        if first_bucket > cutoff:
+            edge = db.query(Job).filter(Job.start_time >= cutoff, Job.start_time < first_bucket).all()
+            for job in edge:
+                key = "" if dimension == "all" else (getattr(job, dimension) or "")
+                duration = job_duration(job)
+                sketch = None
+                if duration is not None:
+                    sketch = DurationSketch()
+                    sketch.add(duration)
+                totals.setdefault(key, StatsAccumulator()).add(job.status, 1, 1 if sketch else 0, duration or 0.0, sketch)
+    if group_by is None:
+        return {"range": range, **totals.get("", StatsAccumulator()).to_dict()}
+    groups = sorted(((key, acc) for key, acc in totals.items() if acc.jobs), key=lambda item: (-item[1].jobs, item[0]))
+    return {"range": range, "group_by": group_by, "groups": [{group_by: key, **acc.to_dict()} for key, acc in groups[:limit]]}
+
+JOB_FIELDS = ("id", "job_name", "scope", "triggered_by", "status", "progress", "start_time", "end_time", "updated_at")
+
+def parse_job_fields(value: str | None) -> list[str] | None:
+    if not value:
+        return list(JOB_FIELDS)
+    fields = ["id"]
+    for name in (f.strip() for f in value.split(",")):
+        if name not in JOB_FIELDS:
+            return None
+        if name not in fields:
+            fields.append(name)
+    return fields
+
+def parse_jobs_cursor(value: str) -> tuple[datetime, int] | None:
+    # "<start_time ISO>,<id>" of the last job on the previous page.
+    try:
+        start, job_id = value.rsplit(",", 1)
+        return datetime.fromisoformat(start), int(job_id)
+    except ValueError:
+        return None
+
+def etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    tags = [t.strip() for t in header.split(",")]
+    return "*" in tags or etag in tags or etag[2:] in tags
 
 @app.get("/api/jobs")
-def api_jobs(range: str = Query("24h")):
-    with SessionLocal() as db:
-        now = datetime.utcnow()
-        if range == "24h":
-            cutoff = now - timedelta(hours=24)
-        elif range == "7d":
-            cutoff = now - timedelta(days=7)
-        elif range == "30d":
-            cutoff = now - timedelta(days=30)
-        else:
-            cutoff = datetime.min
-        rows = db.query(Job).filter(Job.start_time >= cutoff).order_by(Job.start_time.desc()).all()
-        return {"jobs": [job_to_dict(r) for r in rows]}
+def api_jobs(
+    request: Request,
+    range: str = Query("24h"),
+    updated_since: datetime | None = None,
+    fields: str | None = None,
+    limit: int = Query(0, ge=0, le=10000),
+    cursor: str | None = None,
+):
+    """
+    List jobs started within `range`, newest first.
+    - updated_since: only jobs started, updated or completed at or after this
+      time; pass back `updated_cursor` from the previous response.
+    - fields: comma-separated job fields to return (`id` is always included).
+    - limit/cursor: keyset pages; pass `next_cursor` back as `cursor`. limit=0 returns all.
+    Responses carry a weak ETag, and a matching If-None-Match gets a 304.
+    """
+    selected = parse_job_fields(fields)
+    if selected is None:
+        return JSONResponse(status_code=400, content={"error": f"fields must be a subset of {', '.join(JOB_FIELDS)}"})
+    filters = [Job.start_time >= parse_range_cutoff(range)]
+    if updated_since is not None:
+        filters.append(Job.updated_at >= to_utc_naive(updated_since, datetime.utcnow()))
+    page_filters = list(filters)
+    if cursor:
+        position = parse_jobs_cursor(cursor)
+        if position is None:
+            return JSONResponse(status_code=400, content={"error": "invalid cursor"})
+        start, last_id = position
+        page_filters.append((Job.start_time < start) | ((Job.start_time == start) & (Job.id < last_id)))
+    with ReadSession() as db:
+        # Answered from the (start_time, updated_at) index: any start, update or
+        # completion in the range changes the tag. Progress not yet flushed is
+        # only in the running-job cache, so its generation is part of the tag.
+        generation = running_jobs.generation
+        count, last_update, last_id = db.execute(
+            select(func.count(), func.max(Job.updated_at), func.max(Job.id)).where(*filters)
+        ).one()
+        tag_source = f"{count}|{last_update}|{last_id}|{generation}|{range}|{updated_since}|{','.join(selected)}|{limit}|{cursor}"
+        etag = f'W/"{hashlib.blake2b(tag_source.encode(), digest_size=10).hexdigest()}"'
+        headers = {"ETag": etag, "Cache-Control": "no-cache"}
+        if etag_matches(request, etag):
+            return Response(status_code=304, headers=headers)
+        columns = [getattr(Job, name) for name in selected]
+        if "start_time" not in selected:
+            columns.append(Job.start_time)
+        query = select(*columns).where(*page_filters).order_by(Job.start_time.desc(), Job.id.desc())
+        if limit:
+            query = query.limit(limit)
+        rows = db.execute(query).all()
+    # Progress of running jobs is written behind; the cache has the latest.
+    hot = running_jobs.snapshot()
+    jobs = []
+    for row in rows:
+        cached = hot.get(row.id)
+        if cached is not None:
+            jobs.append({name: cached[name] for name in selected})
+            continue
+        job = {}
+        for name in selected:
+            value = getattr(row, name)
+            if isinstance(value, datetime):
+                value = value.isoformat()
+            elif name == "progress":
+                value = float(value or 0)
+            job[name] = value
+        jobs.append(job)
+    next_cursor = None
+    if limit and len(rows) == limit and rows[-1].start_time is not None:
+        next_cursor = f"{rows[-1].start_time.isoformat()},{rows[-1].id}"
+    updated_cursor = last_update.isoformat() if last_update else (updated_since.isoformat() if updated_since else None)
+    return JSONResponse(
+        {"jobs": jobs, "next_cursor": next_cursor, "updated_cursor": updated_cursor},
+        headers=headers,
+    )
 
 @app.get("/api/jobs/{job_id}/logs")
-def api_job_logs(job_id: int, limit: int = 100, offset: int = 0):
+def api_job_logs(
+    job_id: int,
+    limit: int = 100,
+    offset: int = Query(0, deprecated=True),
+    after_id: int | None = None,
+    before_id: int | None = None,
+):
     """
-    Return logs for a job, oldest-first.
+    Return logs for a job, oldest-first (ordered by log id).
     - limit: max number of log entries to return. If <= 0, return all.
-    - offset: number of entries to skip from the start (for pagination).
+    - after_id: return entries with an id greater than this cursor (next page).
+    - before_id: return the entries immediately preceding this cursor (previous page).
+    - offset: deprecated; number of entries to skip from the start. Costs O(offset).
+    `next_cursor` is the value to pass back as `after_id` (or `before_id` when
+    paging backwards) for the following page, or null when there are no more rows.
+    """
+    bounded = bool(limit and limit > 0)
+    skip = offset if offset and offset > 0 and after_id is None and before_id is None else 0
+    with ReadSession() as db:
+        rows = read_job_logs(
+            db,
+            job_id,
+            after_id=after_id,
+            before_id=before_id,
+            limit=(limit + skip) if bounded else None,
+        )
+    if skip:
+        rows = rows[skip:]
+    backwards = before_id is not None and after_id is None
+    next_cursor = None
+    if bounded and len(rows) == limit:
+        next_cursor = rows[0].id if backwards else rows[-1].id
+    return {
+        "logs": [{"id": r.id, "ts": r.ts.isoformat() if r.ts else None, "level": r.level, "message": r.message} for r in rows],
+        "next_cursor": next_cursor,
+    }
+
+LOG_STREAM_PAGE = max(1, int(os.getenv("LOG_STREAM_PAGE", "2000")))
+LOG_STREAM_FLUSH_BYTES = 64 * 1024
+
+def iter_job_log_rows(job_id: int, page_size: int = LOG_STREAM_PAGE):
+    """
+    Yield (id, ts, level, message) rows for a job in id order.
+    Rows are fetched in keyset pages on short read transactions, so memory stays
+    bounded by one page and a long download never pins an old WAL snapshot.
+    """
+    after_id = 0
+    while True:
+        with ReadSession() as db:
+            rows = read_job_logs(db, job_id, after_id=after_id, limit=page_size)
+        if not rows:
+            return
+        yield from rows
+        if len(rows) < page_size:
+            return
+        after_id = rows[-1].id
+
+def format_log_text(row) -> str:
+    # ansible.log-style: "<timestamp> <LEVEL> | <message>"
+    ts = f"{row.ts:%Y-%m-%d %H:%M:%S},{row.ts.microsecond // 1000:03d}" if row.ts else "-"
+    message = row.message or ""
+    if not message.endswith("\n"):
+        message += "\n"
+    return f"{ts} {(row.level or 'info').upper()} | {message}"
+
+def format_log_ndjson(row) -> str:
+    return json.dumps({
+        "id": row.id,
+        "ts": row.ts.isoformat() if row.ts else None,
+        "level": row.level,
+        "message": row.message,
+    }) + "\n"
+
+def stream_job_logs(job_id: int, formatter, compress: bool):
+    encoder = zlib.compressobj(6, zlib.DEFLATED, 31) if compress else None
+    pending: list[str] = []
+    size = 0
+    for row in iter_job_log_rows(job_id):
+        line = formatter(row)
+        pending.append(line)
+        size += len(line)
+        if size >= LOG_STREAM_FLUSH_BYTES:
+            data = "".join(pending).encode("utf-8")
+            pending, size = [], 0
+            if encoder is not None:
+                data = encoder.compress(data)
+            if data:
+                yield data
+    data = "".join(pending).encode("utf-8")
+    if encoder is not None:
+        data = encoder.compress(data) + encoder.flush()
+    if data:
+        yield data
+
+@app.get("/api/jobs/{job_id}/logs/download")
+def api_job_logs_download(
+    job_id: int,
+    format: str = Query("text", pattern="^(text|ndjson)$"),
+    compress: str | None = Query(None, pattern="^gzip$"),
+):
+    """
+    Stream a job's full log as a download without materialising it in memory.
+    - format: `text` (ansible.log-style lines) or `ndjson` (one JSON object per line).
+    - compress: `gzip` to stream a .gz file.
+    """
+    with ReadSession() as db:
+        if db.query(Job.id).filter(Job.id == job_id).first() is None:
+            return JSONResponse(status_code=404, content={"error": "job not found"})
+    if format == "ndjson":
+        formatter, media_type, filename = format_log_ndjson, "application/x-ndjson", f"job-{job_id}-logs.ndjson"
+    else:
+        formatter, media_type, filename = format_log_text, "text/plain; charset=utf-8", f"job-{job_id}-logs.log"
+    gzip_enabled = compress == "gzip"
+    if gzip_enabled:
+        media_type, filename = "application/gzip", f"{filename}.gz"
+    return StreamingResponse(
+        stream_job_logs(job_id, formatter, gzip_enabled),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+# Task results
+TASK_RESULT_STATUSES = ("ok", "changed", "failed", "ignored", "skipped", "unreachable")
+
+def task_result_to_dict(row) -> dict:
+    return {
+        "id": row.id,
+        "job_id": row.job_id,
+        "host": row.host,
+        "task_name": row.task_name,
+        "task_uuid": row.task_uuid,
+        "action": row.action,
+        "status": row.status,
+        "changed": bool(row.changed),
+        "started_at": row.started_at.isoformat() if row.started_at else None,
+        "ended_at": row.ended_at.isoformat() if row.ended_at else None,
+        "duration": row.duration,
+    }
+
+def task_result_filters(range: str, host: str | None, task: str | None, status: str | None, job_id: int | None) -> list:
+    clauses = []
+    cutoff = parse_range_cutoff(range)
+    if cutoff > datetime.min:
+        clauses.append(TaskResult.ended_at >= cutoff)
+    if host:
+        clauses.append(TaskResult.host == host)
+    if task:
+        clauses.append(TaskResult.task_name == task)
+    if status:
+        clauses.append(TaskResult.status.in_([s.strip() for s in status.split(",") if s.strip()]))
+    if job_id is not None:
+        clauses.append(TaskResult.job_id == job_id)
+    return clauses
+
+@app.get("/api/task-results")
+def api_task_results(
+    range: str = Query("7d"),
+    host: str | None = None,
+    task: str | None = None,
+    status: str | None = None,
+    job_id: int | None = None,
+    sort: str = Query("recent", pattern="^(recent|duration)$"),
+    limit: int = Query(100, ge=1, le=1000),
+    before_id: int | None = None,
+):
+    """
+    Per-host task results, filtered by host, exact task name, status
+    (comma-separated) and job, within `range`.
+    - sort=recent: newest first; pass `next_cursor` back as `before_id` for older rows.
+    - sort=duration: the `limit` slowest results, no cursor.
     """
-    with SessionLocal() as db:
-        q = db.query(JobLog).filter(JobLog.job_id == job_id).order_by(JobLog.ts.asc())
-        if offset and offset > 0:
-            q = q.offset(offset)
-        if limit and limit > 0:
-            q = q.limit(limit)
-        rows = q.all()
-        return {"logs": [{"ts": r.ts.isoformat(), "level": r.level, "message": r.message} for r in rows]}
+    query = select(TaskResult).where(*task_result_filters(range, host, task, status, job_id))
+    if sort == "duration":
+        query = query.where(TaskResult.duration.is_not(None)).order_by(TaskResult.duration.desc(), TaskResult.id.desc())
+    else:
+        if before_id is not None:
+            query = query.where(TaskResult.id < before_id)
+        query = query.order_by(TaskResult.id.desc())
+    with ReadSession() as db:
+        rows = db.execute(query.limit(limit)).scalars().all()
+        results = [task_result_to_dict(r) for r in rows]
+    next_cursor = results[-1]["id"] if sort == "recent" and len(results) == limit else None
+    return {"results": results, "next_cursor": next_cursor}
+
+@app.get("/api/task-results/summary")
+def api_task_results_summary(
+    group_by: str = Query("host", pattern="^(host|task)$"),
+    range: str = Query("7d"),
+    host: str | None = None,
+    task: str | None = None,
+    status: str | None = None,
+    job_id: int | None = None,
+    limit: int = Query(100, ge=1, le=1000),
+):
+    """
+    Result counts per status plus average and maximum duration, grouped by host
+    or task name, busiest groups first.
+    """
+    key = TaskResult.host if group_by == "host" else TaskResult.task_name
+    counts = [func.sum(case((TaskResult.status == s, 1), else_=0)).label(s) for s in TASK_RESULT_STATUSES]
+    query = (
+        select(
+            key.label("key"),
+            func.count().label("total"),
+            *counts,
+            func.avg(TaskResult.duration).label("avg_duration"),
+            func.max(TaskResult.duration).label("max_duration"),
+        )
+        .where(*task_result_filters(range, host, task, status, job_id))
+        .group_by(key)
+        .order_by(func.count().desc(), key)
+        .limit(limit)
+    )
+    with ReadSession() as db:
+        rows = db.execute(query).all()
+    return {
+        "group_by": group_by,
+        "groups": [
+            {
+                group_by: r.key,
+                "total": r.total,
+                "counts": {s: int(getattr(r, s) or 0) for s in TASK_RESULT_STATUSES},
+                "avg_duration": r.avg_duration,
+                "max_duration": r.max_duration,
+            }
+            for r in rows
+        ],
+    }
+
+@app.get("/api/jobs/{job_id}/recap")
+def api_job_recap(job_id: int):
+    """PLAY RECAP-style per-host counters for a job, aggregated from its task results."""
+    query = (
+        select(TaskResult.host, TaskResult.status, TaskResult.changed, func.count().label("count"))
+        .where(TaskResult.job_id == job_id)
+        .group_by(TaskResult.host, TaskResult.status, TaskResult.changed)
+    )
+    with ReadSession() as db:
+        if db.query(Job.id).filter(Job.id == job_id).first() is None:
+            return JSONResponse(status_code=404, content={"error": "job not found"})
+        rows = db.execute(query).all()
+    hosts: dict[str, dict] = {}
+    for r in rows:
+        recap = hosts.setdefault(r.host, {"ok": 0, "changed": 0, "unreachable": 0, "failed": 0, "skipped": 0, "ignored": 0})
+        # Same counters as Ansible's recap: ignored failures count as ok (and
+        # as changed when they changed something).
+        if r.status in ("ok", "changed", "ignored"):
+            recap["ok"] += r.count
+            if r.changed:
+                recap["changed"] += r.count
+        if r.status in ("failed", "ignored", "skipped", "unreachable"):
+            recap[r.status] += r.count
+    return {"hosts": [{"host": host, **hosts[host]} for host in sorted(hosts)]}
+
+ARTIFACT_NAME = re.compile(r"^[A-Za-z0-9._-]{1,128}$")
+
+def artifact_to_dict(row) -> dict:
+    return {
+        "id": row.id,
+        "job_id": row.job_id,
+        "name": row.name,
+        "content_type": row.content_type,
+        "size": row.size,
+        "created_at": row.created_at.isoformat() if row.created_at else None,
+    }
+
+def artifact_is_json(content_type: str | None) -> bool:
+    essence = (content_type or "").split(";", 1)[0].strip().lower()
+    return essence == "application/json" or essence.endswith("+json")
+
+def pack_artifact(body: bytes, gzipped: bool, limit: int) -> tuple[bytes, int]:
+    """
+    Return (gzip data, uncompressed size) for an upload. Gzip bodies are only
+    inflated to validate and measure them, never recompressed. Raises
+    OverflowError past `limit` bytes and zlib.error for a corrupt stream.
+    """
+    if not gzipped:
+        if len(body) > limit:
+            raise OverflowError("artifact too large")
+        return gzip.compress(body, compresslevel=6), len(body)
+    inflater = zlib.decompressobj(wbits=31)
+    size = 0
+    pending = body
+    while pending:
+        size += len(inflater.decompress(pending, 1024 * 1024))
+        if size > limit:
+            raise OverflowError("artifact too large")
+        pending = inflater.unconsumed_tail
+    size += len(inflater.flush())
+    if not inflater.eof:
+        raise zlib.error("truncated gzip stream")
+    if size > limit:
+        raise OverflowError("artifact too large")
+    return body, size
+
+@app.put("/api/jobs/{job_id}/artifacts/{name}")
+async def api_put_artifact(job_id: int, name: str, request: Request):
+    """
+    Store an artifact for a job, replacing any artifact with the same name.
+    A body sent with `Content-Encoding: gzip` is stored as uploaded; anything
+    else is compressed here. `Content-Type` is recorded for the listing; downloads
+    are served as JSON or as opaque bytes (see api_job_artifact).
+    """
+    if not ARTIFACT_NAME.match(name):
+        return JSONResponse(status_code=400, content={"error": "invalid artifact name"})
+    limit = MAX_REQUEST_BODY_MB * 1024 * 1024
+    body = bytearray()
+    async for chunk in request.stream():
+        body += chunk
+        if len(body) > limit:
+            return JSONResponse(status_code=413, content={"detail": "Request body too large"})
+    gzipped = request.headers.get("content-encoding", "").strip().lower() == "gzip"
+    content_type = request.headers.get("content-type") or "application/octet-stream"
+    try:
+        data, size = await asyncio.to_thread(pack_artifact, bytes(body), gzipped, limit)
+    except OverflowError:
+        return JSONResponse(status_code=413, content={"detail": "Request body too large"})
+    except zlib.error:
+        return JSONResponse(status_code=400, content={"detail": "Invalid gzip request body"})
+
+    def op(db):
+        if db.query(Job.id).filter(Job.id == job_id).first() is None:
+            return None
+        db.execute(delete(JobArtifact).where(JobArtifact.job_id == job_id, JobArtifact.name == name))
+        artifact = JobArtifact(job_id=job_id, name=name, content_type=content_type, size=size, data=data)
+        db.add(artifact)
+        db.flush()
+        return artifact_to_dict(artifact)
+
+    artifact = await writer.submit(op)
+    if artifact is None:
+        return JSONResponse(status_code=404, content={"error": "job not found"})
+    return artifact
+
+@app.get("/api/jobs/{job_id}/artifacts")
+def api_job_artifacts(job_id: int):
+    with ReadSession() as db:
+        if db.query(Job.id).filter(Job.id == job_id).first() is None:
+            return JSONResponse(status_code=404, content={"error": "job not found"})
+        rows = db.execute(
+            select(JobArtifact.id, JobArtifact.job_id, JobArtifact.name, JobArtifact.content_type, JobArtifact.size, JobArtifact.created_at)
+            .where(JobArtifact.job_id == job_id)
+            .order_by(JobArtifact.id)
+        ).all()
+    return {"artifacts": [artifact_to_dict(r) for r in rows]}
+
+@app.get("/api/jobs/{job_id}/artifacts/{name}")
+def api_job_artifact(job_id: int, name: str, request: Request):
+    """
+    Serve an artifact, still gzip-compressed when the client accepts it.
+    Artifacts are uploaded by clients and served from the dashboard's origin, so
+    they are never rendered: JSON goes out as application/json, everything else
+    as application/octet-stream, always as an attachment.
+    """
+    with ReadSession() as db:
+        row = db.execute(
+            select(JobArtifact.content_type, JobArtifact.data)
+            .where(JobArtifact.job_id == job_id, JobArtifact.name == name)
+        ).first()
+    if row is None:
+        return JSONResponse(status_code=404, content={"error": "artifact not found"})
+    media_type = "application/json" if artifact_is_json(row.content_type) else "application/octet-stream"
+    headers = {
+        "Content-Disposition": f'attachment; filename="{name}"',
+        "X-Content-Type-Options": "nosniff",
+        "Vary": "Accept-Encoding",
+    }
+    if "gzip" in request.headers.get("accept-encoding", "").lower():
+        headers["Content-Encoding"] = "gzip"
+        return Response(content=row.data, media_type=media_type, headers=headers)
+    return Response(content=gzip.decompress(row.data), media_type=media_type, headers=headers)
+
+def search_log_index(conn, match: str, cutoff: datetime, level: str | None, job_id: int | None, limit: int,
+                     before_id: int | None) -> list:
+    """Newest `limit` matches from the job_logs_fts table reachable through `conn`."""
+    clauses = ["job_logs_fts MATCH :match"]
+    params: dict = {"match": match, "limit": limit, "hs": SNIPPET_HIT_START, "he": SNIPPET_HIT_END}
+    if cutoff > datetime.min:
+        floor = fts_rowid_floor(conn, cutoff)
+        if floor is not None:
+            clauses.append("rowid >= :floor")
+            params["floor"] = floor
+        # Timestamps are client-supplied and only roughly follow ids.
+        clauses.append("ts >= :cutoff")
+        params["cutoff"] = format_db_timestamp(cutoff)
+    if before_id is not None:
+        clauses.append("rowid < :before_id")
+        params["before_id"] = before_id
+    if level:
+        clauses.append("level = :level")
+        params["level"] = level
+    if job_id is not None:
+        clauses.append("job_id = :job_id")
+        params["job_id"] = job_id
+    # Only the fixed clauses above are joined in; every value is a bound parameter.
+    where = " AND ".join(clauses)
+    snippet = "snippet(job_logs_fts, 0, :hs, :he, '…', 16)"
+    sql = text(f"SELECT rowid AS id, job_id, level, ts, {snippet} AS snippet FROM job_logs_fts WHERE {where} ORDER BY rowid DESC LIMIT :limit")  # nosec B608
+    return list(conn.execute(sql, params).all())
+
+@app.get("/api/logs/search")
+def api_log_search(
+    q: str = Query(..., min_length=1),
+    range: str = Query("7d"),
+    level: str | None = None,
+    job_id: int | None = None,
+    limit: int = Query(50, ge=1, le=500),
+    before_id: int | None = None,
+    raw: bool = False,
+    highlight_start: str = "<mark>",
+    highlight_end: str = "</mark>",
+):
+    """
+    Search log lines across jobs, newest first.
+    - q: search terms (all must match). With `raw=true`, q is passed to FTS5 as-is.
+    - range: `24h`, `7d`, `30d`, `<n>h`, `<n>d` or `all`.
+    - level / job_id: optional exact filters.
+    - before_id: cursor from the previous page's `next_cursor`.
+    - highlight_start / highlight_end: inserted verbatim around hits; the rest
+      of the snippet is HTML-escaped.
+    """
+    cutoff = parse_range_cutoff(range)
+    with ReadSession() as db:
+        if LOG_SEARCH_FTS:
+            match = q if raw else build_fts_query(q)
+            # Live lines are indexed in the main database, archived ones in their
+            # log partition; only partitions that can hold lines in range are read.
+            if not LOG_PARTITIONS_ENABLED:
+                partitions = []
+            elif job_id is not None:
+                partition = db.scalar(select(Job.log_partition).where(Job.id == job_id))
+                partitions = [partition] if partition else []
+            else:
+                partitions = log_partitions.keys_since(cutoff)
+            try:
+                rows = search_log_index(db, match, cutoff, level, job_id, limit, before_id)
+                for key in partitions:
+                    partition_engine = log_partitions.engine(key)
+                    if partition_engine is None:
+                        continue
+                    with partition_engine.connect() as conn:
+                        rows.extend(search_log_index(conn, match, cutoff, level, job_id, limit, before_id))
+            except OperationalError as exc:
+                return JSONResponse(status_code=400, content={"error": f"invalid search query: {exc.orig}"})
+            if partitions:
+                rows = sorted(rows, key=lambda r: r.id, reverse=True)[:limit]
+            results = [
+                {
+                    "id": r.id,
+                    "job_id": int(r.job_id) if r.job_id is not None else None,
+                    "ts": r.ts.replace(" ", "T") if r.ts else None,
+                    "level": r.level,
+                    "snippet": render_snippet(r.snippet, highlight_start, highlight_end),
+                }
+                for r in rows
+            ]
+            engine_name = "fts5"
+        else:
+            # No FTS5 (or not SQLite): fall back to a scan of live rows.
+            query = select(JobLog.id, JobLog.job_id, JobLog.level, JobLog.ts, JobLog.message).where(
+                JobLog.ts >= cutoff, *[JobLog.message.contains(term, autoescape=True) for term in q.split()]
+            )
+            if before_id is not None:
+                query = query.where(JobLog.id < before_id)
+            if level:
+                query = query.where(JobLog.level == level)
+            if job_id is not None:
+                query = query.where(JobLog.job_id == job_id)
+            rows = list(db.execute(query.order_by(JobLog.id.desc()).limit(limit)).all())
+            results = [
+                {"id": r.id, "job_id": r.job_id, "ts": r.ts.isoformat() if r.ts else None, "level": r.level, "snippet": html.escape(r.message, quote=False)}
+                for r in rows
+            ]
+            engine_name = "scan"
+    next_cursor = results[-1]["id"] if len(results) == limit else None
+    return {"results": results, "next_cursor": next_cursor, "engine": engine_name}
+
+def ws_snapshot_jobs() -> list[dict]:
+    """Running jobs plus recently finished ones, for a client whose gap can't be replayed."""
+    cutoff = datetime.utcnow() - timedelta(minutes=WS_SNAPSHOT_RECENT_MINUTES)
+    with ReadSession() as db:
+        rows = db.scalars(
+            select(Job)
+            .where((Job.status == "running") | (Job.end_time >= cutoff))
+            .order_by(Job.start_time.desc())
+        ).all()
+    hot = running_jobs.snapshot()
+    return [hot.get(j.id) or job_to_dict(j) for j in rows]
 
 @app.websocket("/ws")
-async def websocket(ws: WebSocket):
-    await manager.connect(ws)
+async def websocket(ws: WebSocket, topics: str | None = None, since: int | None = None, epoch: str | None = None):
+    # Optional ?topics=jobs,job:12 subscribes up front; otherwise the client gets
+    # every event until it sends a subscribe message. ?since=<seq>&epoch=<id>
+    # resumes after a reconnect.
+    await manager.connect(
+        ws,
+        parse_topics(topics.split(",")) if topics else None,
+        since=since,
+        epoch=epoch,
+        snapshot=ws_snapshot_jobs,
+    )
     try:
         while True:
-            # server doesn't need inbound messages for now
-            await ws.receive_text()
+            await manager.handle_message(ws, await ws.receive_text())
     except WebSocketDisconnect:
-        manager.disconnect(ws)
\ No newline at end of file
+        manager.disconnect(ws)
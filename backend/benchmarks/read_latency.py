@@ -0,0 +1,159 @@
+#!/usr/bin/env python
+"""
+Read latency of the dashboard endpoints while log ingest is running.
+
+Runs the same workload twice against a fresh SQLite file: once with SQLite's
+defaults (SQLITE_TUNING=off: rollback journal, shared pool) and once with the
+tuned storage profile (WAL, synchronous=NORMAL, separate read-only pool), then
+prints latency percentiles for GET /api/jobs and GET /api/jobs/{id}/logs.
+
+    cd backend
+    python benchmarks/read_latency.py --seconds 10
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import multiprocessing
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+
+
+def percentile(values: list[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    idx = min(len(ordered) - 1, max(0, int(round(pct / 100.0 * (len(ordered) - 1)))))
+    return ordered[idx]
+
+
+def ingest(main, job_ids, batch_size, stop, counter):
+    from sqlalchemy import insert
+
+    main.engine.dispose(close=False)
+    n = 0
+    while not stop.is_set():
+        batch = [
+            {"job_id": job_ids[(n + i) % len(job_ids)], "message": f"changed: [host{n + i}]", "level": "info"}
+            for i in range(batch_size)
+        ]
+        with main.SessionLocal() as db:
+            db.execute(insert(main.JobLog), batch)
+            db.commit()
+        n += batch_size
+        with counter.get_lock():
+            counter.value += batch_size
+
+
+def run_phase(args) -> dict:
+    # The storage profile is read at import time, so the environment must be in
+    # place before app.main is imported.
+    sys.path.insert(0, str(BACKEND_DIR))
+    from fastapi.testclient import TestClient
+    from sqlalchemy import insert
+    import app.main as main
+
+    with main.SessionLocal() as db:
+        for i in range(args.jobs):
+            db.add(main.Job(job_name=f"bench-{i % 20}", scope="servers:bench", triggered_by="bench"))
+        db.commit()
+        job_ids = [j.id for j in db.query(main.Job.id).all()]
+        rows = [{"job_id": job_ids[0], "message": f"ok: [host{i}]", "level": "info"} for i in range(args.seed_lines)]
+        db.execute(insert(main.JobLog), rows)
+        db.commit()
+
+    # Ingest runs in separate processes so it contends for the database file,
+    # not for this interpreter's GIL.
+    stop = multiprocessing.Event()
+    counter = multiprocessing.Value("q", 0)
+    writers = [
+        multiprocessing.Process(target=ingest, args=(main, job_ids, args.batch, stop, counter), daemon=True)
+        for _ in range(args.writers)
+    ]
+    for proc in writers:
+        proc.start()
+
+    # Requests go through the ASGI app so routing, validation and middleware are
+    # part of the measurement. A non-200 answer is counted as a failed read; an
+    # exception aborts the phase.
+    samples: dict[str, list[float]] = {"jobs": [], "logs": []}
+    errors: dict[str, int] = {}
+    paths = {"jobs": "/api/jobs?range=all", "logs": f"/api/jobs/{job_ids[0]}/logs?limit=100&offset=0"}
+    try:
+        with TestClient(main.app) as client:
+            deadline = time.monotonic() + args.seconds
+            while time.monotonic() < deadline:
+                for name, path in paths.items():
+                    started = time.perf_counter()
+                    response = client.get(path)
+                    elapsed = (time.perf_counter() - started) * 1000.0
+                    if response.status_code != 200:
+                        key = f"{name} {response.status_code}"
+                        errors[key] = errors.get(key, 0) + 1
+                        continue
+                    samples[name].append(elapsed)
+    finally:
+        stop.set()
+        for proc in writers:
+            proc.join()
+
+    result = {"errors": errors, "inserted_per_s": round(counter.value / args.seconds)}
+    for name, values in samples.items():
+        result[name] = {
+            "n": len(values),
+            "p50": round(percentile(values, 50), 2),
+            "p95": round(percentile(values, 95), 2),
+            "p99": round(percentile(values, 99), 2),
+            "max": round(max(values), 2) if values else 0.0,
+        }
+    return result
+
+
+def spawn(profile: str, args) -> dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ)
+        env["DATABASE_URL"] = f"sqlite:///{tmp}/bench.db"
+        env["SQLITE_TUNING"] = "on" if profile == "tuned" else "off"
+        cmd = [
+            sys.executable, __file__, "--phase",
+            "--seconds", str(args.seconds), "--jobs", str(args.jobs),
+            "--seed-lines", str(args.seed_lines), "--batch", str(args.batch),
+            "--writers", str(args.writers),
+        ]
+        out = subprocess.run(cmd, env=env, cwd=str(BACKEND_DIR), check=True, stdout=subprocess.PIPE, text=True)
+        return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seconds", type=float, default=10.0, help="duration of each phase")
+    parser.add_argument("--jobs", type=int, default=2000, help="jobs seeded before measuring")
+    parser.add_argument("--seed-lines", type=int, default=50000, help="log lines seeded for the sampled job")
+    parser.add_argument("--batch", type=int, default=200, help="lines per ingest commit")
+    parser.add_argument("--writers", type=int, default=1, help="concurrent ingest processes")
+    parser.add_argument("--phase", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.phase:
+        print(json.dumps(run_phase(args)))
+        return
+
+    results = {profile: spawn(profile, args) for profile in ("legacy", "tuned")}
+    print(f"{'profile':8} {'endpoint':6} {'n':>7} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8}")
+    for profile, result in results.items():
+        for name in ("jobs", "logs"):
+            r = result[name]
+            print(f"{profile:8} {name:6} {r['n']:>7} {r['p50']:>8} {r['p95']:>8} {r['p99']:>8} {r['max']:>8}")
+        failed = ", ".join(f"{n} x {key}" for key, n in result["errors"].items()) or "none"
+        print(f"{profile:8} ingest {result['inserted_per_s']:>7} lines/s, failed reads: {failed}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+import asyncio
+import os
+import tempfile
+
+# app.main reads its settings at import time, so point it at a scratch database first.
+_DATA_DIR = tempfile.mkdtemp(prefix="dashboard-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{_DATA_DIR}/test.db"
+os.environ["LOG_ARCHIVE_BLOCK_LINES"] = "50"
+os.environ["EVENT_BUS"] = "local"
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import func, select
+
+from app import main
+
+
+@pytest.fixture(scope="session")
+def client():
+    with TestClient(main.app) as test_client:
+        yield test_client
+
+
+def drain_writer():
+    """Wait until everything queued on the database writer so far has committed."""
+    asyncio.run(main.writer.submit(lambda db: None))
+
+
+def start_job(client, name="test") -> int:
+    response = client.post("/api/jobs/start", json={"job_name": name, "scope": "all", "triggered_by": "pytest"})
+    assert response.status_code == 200
+    return response.json()["job_id"]
+
+
+def post_lines(client, job_id: int, count: int, word: str = "line"):
+    lines = [{"message": f"{word} {i}"} for i in range(count)]
+    response = client.post("/api/jobs/logs/batch", json={"job_id": job_id, "lines": lines})
+    assert response.status_code == 200
+
+
+def complete_job(client, job_id: int, status: str = "success"):
+    """Complete a job and wait until the writer has archived its log lines."""
+    assert client.post("/api/jobs/complete", json={"job_id": job_id, "status": status}).status_code == 200
+    # Compaction re-queues itself one step at a time; each drain lets one more run.
+    for _ in range(100):
+        drain_writer()
+        with main.ReadSession() as db:
+            live = db.scalar(select(func.count()).select_from(main.JobLog).where(main.JobLog.job_id == job_id))
+        if live == 0:
+            return
+    raise AssertionError(f"job {job_id} still has {live} live log rows")
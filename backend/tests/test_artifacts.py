@@ -0,0 +1,31 @@
+from conftest import start_job
+
+
+def test_html_artifact_is_served_as_opaque_attachment(client):
+    job_id = start_job(client, "artifacts")
+    body = b"<script>alert(1)</script>"
+    put = client.put(f"/api/jobs/{job_id}/artifacts/page.html", content=body, headers={"Content-Type": "text/html"})
+    assert put.status_code == 200
+    assert put.json()["content_type"] == "text/html"
+
+    response = client.get(f"/api/jobs/{job_id}/artifacts/page.html")
+    assert response.status_code == 200
+    assert response.content == body
+    assert response.headers["content-type"] == "application/octet-stream"
+    assert response.headers["content-disposition"] == 'attachment; filename="page.html"'
+    assert response.headers["x-content-type-options"] == "nosniff"
+
+
+def test_json_artifact_keeps_json_type(client):
+    job_id = start_job(client, "artifacts")
+    client.put(f"/api/jobs/{job_id}/artifacts/result.json", content=b'{"ok": true}', headers={"Content-Type": "application/json"})
+    response = client.get(f"/api/jobs/{job_id}/artifacts/result.json")
+    assert response.headers["content-type"].startswith("application/json")
+    assert response.json() == {"ok": True}
+    assert response.headers["content-disposition"].startswith("attachment;")
+
+
+def test_unknown_job_or_bad_name(client):
+    assert client.put("/api/jobs/999999/artifacts/x.txt", content=b"x").status_code == 404
+    job_id = start_job(client, "artifacts")
+    assert client.put(f"/api/jobs/{job_id}/artifacts/..%2Fx", content=b"x").status_code in (400, 404)
@@ -0,0 +1,85 @@
+import asyncio
+import json
+
+from app import main
+
+
+def make_client():
+    return main.ClientConnection(websocket=None, on_close=lambda client: None)
+
+
+def queued(client):
+    return [entry["message"] for entry in client._entries if entry["message"] is not None]
+
+
+def test_log_lines_for_a_job_merge_into_one_frame():
+    client = make_client()
+    client.enqueue({"type": "job_log", "job": {"id": 1}, "log": {"job_id": 1, "message": "a"}, "seq": 1})
+    client.enqueue({"type": "job_log_batch", "job": {"id": 1}, "logs": [{"job_id": 1, "message": "b"}], "seq": 2})
+    frames = queued(client)
+    assert len(frames) == 1
+    assert [line["message"] for line in frames[0]["logs"]] == ["a", "b"]
+    assert frames[0]["seq"] == 2
+    sent = [client._pop()["message"] for _ in range(len(client._entries))]
+    assert [m for m in sent if m is not None] == frames
+    assert client._logs == {} and client._pending == 0
+
+
+def test_log_frame_without_job_id_is_queued_as_is():
+    client = make_client()
+    message = {"type": "job_log_batch", "logs": [], "seq": 1}
+    client.enqueue(message)
+    assert queued(client) == [message]
+
+
+def test_progress_is_coalesced_per_job():
+    client = make_client()
+    for percent in (10, 20, 30):
+        client.enqueue({"type": "job_progress", "job": {"id": 7, "progress": percent}})
+    frames = queued(client)
+    assert [frame["job"]["progress"] for frame in frames] == [30]
+
+
+def test_lines_after_another_frame_are_not_merged_ahead_of_it():
+    client = make_client()
+    client.enqueue({"type": "job_log", "job": {"id": 1}, "log": {"job_id": 1, "message": "a"}, "seq": 1})
+    client.enqueue({"type": "job_complete", "job": {"id": 1, "status": "success"}, "seq": 2})
+    client.enqueue({"type": "job_log", "job": {"id": 1}, "log": {"job_id": 1, "message": "late"}, "seq": 3})
+    client.enqueue({"type": "job_log", "job": {"id": 1}, "log": {"job_id": 1, "message": "later"}, "seq": 4})
+    frames = queued(client)
+    assert [frame["type"] for frame in frames] == ["job_log_batch", "job_complete", "job_log_batch"]
+    assert [line["message"] for line in frames[0]["logs"]] == ["a"]
+    assert [line["message"] for line in frames[2]["logs"]] == ["late", "later"]
+    assert [frame["seq"] for frame in frames] == [1, 2, 4]
+    while client._entries:
+        client._pop()
+    assert client._logs == {} and client._pending == 0
+
+
+def test_slow_consumer_is_closed_once(monkeypatch):
+    monkeypatch.setattr(main, "WS_SEND_QUEUE_LIMIT", 2)
+
+    class Socket:
+        def __init__(self):
+            self.sent = []
+            self.close_codes = []
+
+        async def send_text(self, data):
+            self.sent.append(data)
+
+        async def close(self, code):
+            self.close_codes.append(code)
+
+    async def scenario():
+        socket = Socket()
+        client = main.ClientConnection(websocket=socket, on_close=lambda websocket: None)
+        for job_id in range(5):
+            client.enqueue({"type": "job_start", "job": {"id": job_id}})
+        assert client._close_task is not None
+        await client._close_task
+        return client, socket
+
+    client, socket = asyncio.run(scenario())
+    assert client.closed and not client._entries
+    assert [json.loads(data)["type"] for data in socket.sent] == ["resync"]
+    assert socket.close_codes == [main.WS_CLOSE_TRY_AGAIN]
@@ -0,0 +1,53 @@
+import gzip
+import json
+
+from app import main
+from conftest import complete_job, drain_writer, post_lines, start_job
+
+
+def archived_job_with_late_lines(client, name: str) -> tuple[int, list[str]]:
+    """A finished job whose lines are archived, plus lines that arrived after completion."""
+    job_id = start_job(client, name)
+    post_lines(client, job_id, 120, f"{name} archived")
+    complete_job(client, job_id)
+    post_lines(client, job_id, 5, f"{name} late")
+    drain_writer()
+    messages = [line["message"] for line in client.get(f"/api/jobs/{job_id}/logs", params={"limit": 0}).json()["logs"]]
+    assert messages[-125:] == [f"{name} archived {i}" for i in range(120)] + [f"{name} late {i}" for i in range(5)]
+    return job_id, messages
+
+
+def test_text_download(client):
+    job_id, messages = archived_job_with_late_lines(client, "dl-text")
+    response = client.get(f"/api/jobs/{job_id}/logs/download")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert response.headers["content-disposition"] == f'attachment; filename="job-{job_id}-logs.log"'
+    lines = response.text.splitlines()
+    assert [line.split(" | ", 1)[1] for line in lines] == messages
+    assert lines[-1].split(" | ")[0].endswith("INFO")
+
+
+def test_gzip_ndjson_download(client):
+    job_id, messages = archived_job_with_late_lines(client, "dl-ndjson")
+    response = client.get(f"/api/jobs/{job_id}/logs/download", params={"format": "ndjson", "compress": "gzip"})
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/gzip"
+    assert response.headers["content-disposition"] == f'attachment; filename="job-{job_id}-logs.ndjson.gz"'
+    records = [json.loads(line) for line in gzip.decompress(response.content).decode().splitlines()]
+    assert [r["message"] for r in records] == messages
+    ids = [r["id"] for r in records]
+    assert ids == sorted(set(ids))
+
+
+def test_rows_stream_in_id_order_across_pages(client):
+    job_id, messages = archived_job_with_late_lines(client, "dl-pages")
+    # A page size that splits both archived blocks and the live tail.
+    rows = list(main.iter_job_log_rows(job_id, page_size=7))
+    assert [row.message for row in rows] == messages
+
+
+def test_unknown_job_and_bad_format(client):
+    assert client.get("/api/jobs/999999/logs/download").status_code == 404
+    job_id = start_job(client, "dl-bad")
+    assert client.get(f"/api/jobs/{job_id}/logs/download", params={"format": "xml"}).status_code == 422
@@ -0,0 +1,107 @@
+import asyncio
+
+from sqlalchemy import func, select
+
+from app import main
+
+
+def bus_event_count() -> int:
+    with main.ReadSession() as db:
+        return db.scalar(select(func.count()).select_from(main.BusEvent))
+
+
+def test_publish_reaches_other_bus_after_prune_to_empty(client, monkeypatch):
+    # Retention 0: every poll prunes everything read so far.
+    monkeypatch.setattr(main, "EVENT_BUS_RETENTION_S", 0)
+    seen_a, seen_b = [], []
+    bus_a = main.DatabaseEventBus(lambda message, topics: seen_a.append(message))
+    bus_b = main.DatabaseEventBus(lambda message, topics: seen_b.append(message))
+
+    async def scenario():
+        for bus in (bus_a, bus_b):
+            bus._last_id = await asyncio.to_thread(bus._max_id)
+        await bus_a.publish({"type": "ping", "n": 1}, (main.JOBS_TOPIC,))
+        await main.writer.submit(lambda db: None)
+        await bus_b.poll()
+        await bus_a.poll()
+        await main.writer.submit(lambda db: None)
+        assert bus_event_count() == 0
+        await bus_a.publish({"type": "ping", "n": 2}, (main.JOBS_TOPIC,))
+        await main.writer.submit(lambda db: None)
+        await bus_b.poll()
+
+    asyncio.run(scenario())
+    assert [m["n"] for m in seen_a] == [1, 2]
+    assert [m["n"] for m in seen_b] == [1, 2]
+
+
+def test_poll_skips_own_events(client):
+    seen = []
+    bus = main.DatabaseEventBus(lambda message, topics: seen.append((message, topics)))
+
+    async def scenario():
+        bus._last_id = await asyncio.to_thread(bus._max_id)
+        await bus.publish({"type": "ping"}, (main.JOBS_TOPIC,))
+        await main.writer.submit(lambda db: None)
+        await bus.poll()
+
+    asyncio.run(scenario())
+    assert seen == [({"type": "ping"}, (main.JOBS_TOPIC,))]
+
+
+def test_tail_delivers_other_workers_events_and_updates_running_jobs(client, monkeypatch):
+    monkeypatch.setattr(main, "EVENT_BUS_POLL_MS", 10)
+    seen = []
+    publisher = main.DatabaseEventBus(lambda message, topics: None)
+    listener = main.DatabaseEventBus(lambda message, topics: seen.append(message))
+    job = {"id": 987654, "job_name": "remote", "status": "running", "progress": 0.0}
+
+    async def scenario():
+        await publisher.start()
+        await listener.start()
+        try:
+            await publisher.publish({"type": "job_start", "job": job, "seq": 41}, (main.JOBS_TOPIC,))
+            await main.writer.submit(lambda db: None)
+            for _ in range(100):
+                if seen:
+                    break
+                await asyncio.sleep(0.01)
+        finally:
+            await publisher.stop()
+            await listener.stop()
+
+    try:
+        asyncio.run(scenario())
+        assert [m["type"] for m in seen] == ["job_start"]
+        # The sender's seq is local to its process; the receiver assigns its own.
+        assert "seq" not in seen[0]
+        assert main.running_jobs.get(job["id"])["job_name"] == "remote"
+    finally:
+        main.running_jobs.pop(job["id"])
+
+
+def test_published_rows_survive_a_failed_group(client, monkeypatch):
+    # A writer of its own with a long group window, so both ops share a group.
+    writer = main.DatabaseWriter(main.SessionLocal, max_batch=64, max_delay=0.2)
+    monkeypatch.setattr(main, "writer", writer)
+    bus = main.DatabaseEventBus(lambda message, topics: None)
+
+    def fail(db):
+        raise RuntimeError("boom")
+
+    async def scenario():
+        await bus.publish({"type": "ping", "n": "replayed"}, (main.JOBS_TOPIC,))
+        failing = writer.submit(fail)
+        try:
+            await failing
+        except RuntimeError:
+            pass
+        await writer.submit(lambda db: None)
+
+    try:
+        asyncio.run(scenario())
+    finally:
+        writer.stop()
+    with main.ReadSession() as db:
+        payloads = db.scalars(select(main.BusEvent.payload).where(main.BusEvent.origin == bus.origin)).all()
+    assert payloads == ['{"type": "ping", "n": "replayed"}']
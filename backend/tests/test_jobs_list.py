@@ -0,0 +1,59 @@
+from conftest import complete_job, start_job
+
+
+def job_ids(response) -> list[int]:
+    return [job["id"] for job in response.json()["jobs"]]
+
+
+def test_cursor_pages_match_the_full_list(client):
+    for i in range(5):
+        start_job(client, f"list-{i}")
+    full = job_ids(client.get("/api/jobs", params={"range": "all"}))
+    paged, cursor = [], None
+    while True:
+        params = {"range": "all", "limit": 2, "fields": "id"}
+        if cursor:
+            params["cursor"] = cursor
+        body = client.get("/api/jobs", params=params).json()
+        paged.extend(job["id"] for job in body["jobs"])
+        cursor = body["next_cursor"]
+        if cursor is None:
+            break
+    assert paged == full
+    assert client.get("/api/jobs", params={"cursor": "not-a-cursor"}).status_code == 400
+
+
+def test_updated_since_returns_only_changed_jobs(client):
+    untouched = start_job(client, "sync-untouched")
+    changed = start_job(client, "sync-changed")
+    cursor = client.get("/api/jobs", params={"range": "all"}).json()["updated_cursor"]
+    assert cursor is not None
+
+    created = start_job(client, "sync-new")
+    complete_job(client, changed, "failed")
+    body = client.get("/api/jobs", params={"range": "all", "updated_since": cursor}).json()
+    jobs = {job["id"]: job for job in body["jobs"]}
+    assert created in jobs and changed in jobs
+    assert untouched not in jobs
+    assert jobs[changed]["status"] == "failed"
+    assert body["updated_cursor"] >= cursor
+
+
+def test_fields_projection(client):
+    start_job(client, "fields")
+    jobs = client.get("/api/jobs", params={"fields": "status,job_name"}).json()["jobs"]
+    assert jobs and set(jobs[0]) == {"id", "status", "job_name"}
+    assert client.get("/api/jobs", params={"fields": "id,password"}).status_code == 400
+
+
+def test_etag_answers_304_until_a_job_changes(client):
+    first = client.get("/api/jobs")
+    etag = first.headers["etag"]
+    assert etag.startswith('W/"')
+    again = client.get("/api/jobs", headers={"If-None-Match": etag})
+    assert again.status_code == 304 and again.content == b""
+
+    start_job(client, "etag")
+    changed = client.get("/api/jobs", headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["etag"] != etag
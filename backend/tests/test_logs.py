@@ -0,0 +1,81 @@
+from sqlalchemy import func, select
+
+from app import main
+from conftest import complete_job, drain_writer, post_lines, start_job
+
+
+def page_forward(client, job_id: int, limit: int) -> list[dict]:
+    logs, cursor = [], 0
+    while cursor is not None:
+        body = client.get(f"/api/jobs/{job_id}/logs", params={"limit": limit, "after_id": cursor}).json()
+        logs.extend(body["logs"])
+        cursor = body["next_cursor"]
+    return logs
+
+
+def page_backward(client, job_id: int, limit: int) -> list[dict]:
+    logs, cursor = [], 2**62
+    while cursor is not None:
+        body = client.get(f"/api/jobs/{job_id}/logs", params={"limit": limit, "before_id": cursor}).json()
+        logs[:0] = body["logs"]
+        cursor = body["next_cursor"]
+    return logs
+
+
+def test_cursor_pages_of_a_running_job(client):
+    job_id = start_job(client, "paging-live")
+    post_lines(client, job_id, 75, "live")
+    everything = client.get(f"/api/jobs/{job_id}/logs", params={"limit": 0}).json()
+    expected = [line["message"] for line in everything["logs"]]
+    # The backend's own "Job started" line comes first.
+    assert expected[-75:] == [f"live {i}" for i in range(75)]
+    assert everything["next_cursor"] is None
+
+    for limit in (1, 10, 75, 76):
+        forward = page_forward(client, job_id, limit)
+        assert [line["message"] for line in forward] == expected
+        assert [line["message"] for line in page_backward(client, job_id, limit)] == expected
+        ids = [line["id"] for line in forward]
+        assert ids == sorted(set(ids))
+
+
+def test_paging_spans_archived_blocks_and_live_rows(client):
+    job_id = start_job(client, "paging")
+    post_lines(client, job_id, 175, "paging")
+    complete_job(client, job_id)
+    # Lines that arrive after completion stay live behind the archived blocks.
+    post_lines(client, job_id, 3, "late")
+    drain_writer()
+    with main.ReadSession() as db:
+        live = db.scalar(select(func.count()).select_from(main.JobLog).where(main.JobLog.job_id == job_id))
+    assert live == 3
+
+    everything = client.get(f"/api/jobs/{job_id}/logs", params={"limit": 0}).json()
+    expected = [line["message"] for line in everything["logs"]]
+    assert expected[-178:] == [f"paging {i}" for i in range(175)] + [f"late {i}" for i in range(3)]
+
+    for limit in (1, 40, 50, 177):
+        forward = page_forward(client, job_id, limit)
+        assert [line["message"] for line in forward] == expected
+        assert [line["message"] for line in page_backward(client, job_id, limit)] == expected
+
+
+def test_archiving_the_newest_rows_does_not_free_their_ids(client):
+    job_id = start_job(client, "ids")
+    post_lines(client, job_id, 60, "ids")
+    complete_job(client, job_id)
+    archived = client.get(f"/api/jobs/{job_id}/logs", params={"limit": 0}).json()["logs"]
+    other = start_job(client, "ids-next")
+    post_lines(client, other, 1, "next")
+    drain_writer()
+    newer = client.get(f"/api/jobs/{other}/logs", params={"limit": 0}).json()["logs"]
+    assert min(line["id"] for line in newer) > max(line["id"] for line in archived)
+
+
+def test_deprecated_offset_still_pages(client):
+    job_id = start_job(client, "offset")
+    post_lines(client, job_id, 120, "offset")
+    complete_job(client, job_id)
+    body = client.get(f"/api/jobs/{job_id}/logs", params={"limit": 10, "offset": 55}).json()
+    # Entry 0 is the backend's "Job started" line.
+    assert [line["message"] for line in body["logs"]] == [f"offset {i}" for i in range(54, 64)]
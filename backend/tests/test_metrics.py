@@ -0,0 +1,11 @@
+from conftest import start_job
+
+
+def test_metrics_exposition(client):
+    start_job(client, "metrics")
+    body = client.get("/metrics").text
+    assert "# TYPE dashboard_http_requests_total counter" in body
+    assert 'dashboard_http_requests_total{method="POST",route="/api/jobs/start",status="200"}' in body
+    assert 'dashboard_http_request_duration_seconds_bucket{method="POST",route="/api/jobs/start",le="+Inf"}' in body
+    assert "dashboard_running_jobs " in body
+    assert "dashboard_db_writer_queue_depth " in body
@@ -0,0 +1,71 @@
+import os
+import sqlite3
+import subprocess
+import sys
+from datetime import datetime
+from pathlib import Path
+
+from app import main
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+
+
+def test_job_logs_gain_autoincrement_and_keep_rows(tmp_path):
+    path = tmp_path / "legacy.db"
+    with sqlite3.connect(path) as conn:
+        # Shape of job_logs / job_log_blocks before ids were AUTOINCREMENT.
+        conn.executescript(
+            """
+            CREATE TABLE job_logs (id INTEGER NOT NULL, job_id INTEGER NOT NULL, ts DATETIME NOT NULL,
+                                   level VARCHAR NOT NULL, message TEXT NOT NULL, PRIMARY KEY (id));
+            CREATE INDEX ix_job_logs_job_id_id ON job_logs (job_id, id);
+            CREATE TABLE job_log_blocks (id INTEGER NOT NULL, job_id INTEGER NOT NULL, first_id INTEGER NOT NULL,
+                                         last_id INTEGER NOT NULL, line_count INTEGER NOT NULL, codec VARCHAR NOT NULL,
+                                         data BLOB NOT NULL, PRIMARY KEY (id));
+            INSERT INTO job_logs VALUES (7, 1, '2024-01-01 00:00:00', 'info', 'kept');
+            """
+        )
+        records = [main.LogRecord(i, datetime(2024, 1, 1), "info", f"archived {i}") for i in range(8, 41)]
+        conn.execute(
+            "INSERT INTO job_log_blocks VALUES (1, 1, 8, 40, 33, 'zlib', ?)",
+            (main.encode_log_block(records, "zlib"),),
+        )
+    env = dict(os.environ, DATABASE_URL=f"sqlite:///{path}", EVENT_BUS="local")
+    subprocess.run([sys.executable, "-c", "import app.main"], cwd=BACKEND_DIR, env=env, check=True)
+
+    with sqlite3.connect(path) as conn:
+        schema = conn.execute("SELECT sql FROM sqlite_master WHERE name = 'job_logs'").fetchone()[0]
+        assert "AUTOINCREMENT" in schema.upper()
+        assert conn.execute("SELECT id, message FROM job_logs").fetchall() == [(7, "kept")]
+        indexes = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = 'job_logs'")}
+        assert "ix_job_logs_job_id_id" in indexes
+        # Continues after the highest archived id, not just the highest live one.
+        conn.execute("INSERT INTO job_logs (job_id, ts, level, message) VALUES (1, '2024-01-01 00:00:01', 'info', 'new')")
+        assert conn.execute("SELECT id FROM job_logs WHERE message = 'new'").fetchone()[0] == 41
+
+
+def test_jobs_gain_autoincrement_and_later_columns(tmp_path):
+    path = tmp_path / "legacy-jobs.db"
+    with sqlite3.connect(path) as conn:
+        # The first jobs table: plain rowid, no updated_at or log_partition yet.
+        conn.executescript(
+            """
+            CREATE TABLE jobs (id INTEGER NOT NULL, job_name VARCHAR NOT NULL, scope VARCHAR NOT NULL,
+                               triggered_by VARCHAR NOT NULL, status VARCHAR NOT NULL, progress FLOAT NOT NULL,
+                               start_time DATETIME NOT NULL, end_time DATETIME, PRIMARY KEY (id));
+            CREATE INDEX ix_jobs_id ON jobs (id);
+            INSERT INTO jobs VALUES (3, 'site', 'all', 'cron', 'success', 100, '2024-01-01 00:00:00', '2024-01-01 00:05:00');
+            """
+        )
+    env = dict(os.environ, DATABASE_URL=f"sqlite:///{path}", EVENT_BUS="local")
+    subprocess.run([sys.executable, "-c", "import app.main"], cwd=BACKEND_DIR, env=env, check=True)
+
+    with sqlite3.connect(path) as conn:
+        schema = conn.execute("SELECT sql FROM sqlite_master WHERE name = 'jobs'").fetchone()[0]
+        assert "AUTOINCREMENT" in schema.upper() and "log_partition" in schema
+        assert conn.execute("SELECT id, job_name, updated_at FROM jobs").fetchall() == [(3, "site", "2024-01-01 00:05:00")]
+        # Deleting the newest job must not free its id.
+        conn.execute("DELETE FROM jobs")
+        conn.execute("INSERT INTO jobs (job_name, scope, triggered_by, status, progress, start_time) "
+                     "VALUES ('next', 'all', 'cron', 'running', 0, '2024-01-02 00:00:00')")
+        assert conn.execute("SELECT id FROM jobs").fetchone()[0] == 4
@@ -0,0 +1,58 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import select, text, update
+
+from app import main
+from conftest import complete_job, drain_writer, post_lines, start_job
+
+
+def fts_job_ids(conn) -> set[int]:
+    return {int(row[0]) for row in conn.execute(text("SELECT DISTINCT job_id FROM job_logs_fts"))}
+
+
+def test_expired_jobs_lose_their_search_entries_and_running_jobs_stay(client):
+    if not main.LOG_SEARCH_FTS or not main.LOG_PARTITIONS_ENABLED:
+        pytest.skip("needs FTS5 and log partitions")
+    finished = start_job(client, "expired-finished")
+    post_lines(client, finished, 120, "retention")
+    complete_job(client, finished)
+    abandoned = start_job(client, "expired-abandoned")
+    post_lines(client, abandoned, 10, "retention")
+    kept = start_job(client, "recent")
+    post_lines(client, kept, 10, "retention")
+    drain_writer()
+
+    with main.ReadSession() as db:
+        key = db.scalar(select(main.Job.log_partition).where(main.Job.id == finished))
+    assert key is not None
+    with main.log_partitions.engine(key).connect() as conn:
+        assert finished in fts_job_ids(conn)
+
+    old = datetime.utcnow() - timedelta(days=30)
+    cutoff = datetime.utcnow() - timedelta(days=7)
+
+    def age(db):
+        db.execute(update(main.Job).where(main.Job.id == finished).values(start_time=old, end_time=old))
+        db.execute(update(main.Job).where(main.Job.id == abandoned).values(start_time=old))
+    main.writer.enqueue(age)
+    drain_writer()
+
+    def step(db):
+        while main.delete_expired_jobs_step(db, cutoff):
+            pass
+    main.writer.enqueue(step)
+    drain_writer()
+
+    with main.engine.connect() as conn:
+        indexed = fts_job_ids(conn)
+        remaining = {row[0] for row in conn.execute(text("SELECT id FROM jobs"))}
+    assert finished not in indexed
+    assert abandoned in indexed and kept in indexed
+    # A job still marked running is kept however old it is.
+    assert finished not in remaining and abandoned in remaining and kept in remaining
+    with main.log_partitions.engine(key).connect() as conn:
+        assert finished not in fts_job_ids(conn)
+        assert conn.execute(text("SELECT count(*) FROM job_log_blocks WHERE job_id = :id"), {"id": finished}).scalar() == 0
+    assert main.running_jobs.get(abandoned) is not None
+    assert main.running_jobs.get(kept) is not None
@@ -0,0 +1,87 @@
+import os
+import sqlite3
+import subprocess
+import sys
+from pathlib import Path
+
+from app import main
+from conftest import complete_job, drain_writer, start_job
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+
+
+def stored_progress(job_id: int) -> float:
+    with main.ReadSession() as db:
+        return db.get(main.Job, job_id).progress
+
+
+def test_running_jobs_are_cached_until_completion(client):
+    job_id = start_job(client, "cache-lifecycle")
+    drain_writer()
+    assert main.running_jobs.get(job_id)["status"] == "running"
+
+    assert client.post("/api/jobs/progress", json={"job_id": job_id, "progress": 35}).status_code == 200
+    assert main.running_jobs.get(job_id)["progress"] == 35.0
+    op = main.running_jobs.flush()
+    if op is not None:
+        # Otherwise the background flusher already took it.
+        main.writer.enqueue(op)
+    drain_writer()
+    assert stored_progress(job_id) == 35.0
+
+    complete_job(client, job_id)
+    assert main.running_jobs.get(job_id) is None
+    # Progress for a finished job goes straight to the database.
+    assert client.post("/api/jobs/progress", json={"job_id": job_id, "progress": 5}).status_code == 200
+    assert stored_progress(job_id) == 5.0
+
+
+def test_flush_behind_a_completion_does_not_rewind_progress(client):
+    job_id = start_job(client, "cache-guard")
+    drain_writer()
+    cache = main.RunningJobCache()
+    cache.add(main.running_jobs.get(job_id))
+    cache.set_progress(job_id, 40)
+    op = cache.flush()
+    assert op is not None and cache.flush() is None
+
+    complete_job(client, job_id)
+    main.writer.enqueue(op)
+    drain_writer()
+    assert stored_progress(job_id) == 100.0
+
+
+def test_jobs_etag_changes_with_cached_progress(client):
+    job_id = start_job(client, "cache-etag")
+    drain_writer()
+    first = client.get("/api/jobs", params={"range": "all"})
+    etag = first.headers["etag"]
+    assert client.get("/api/jobs", params={"range": "all"}, headers={"If-None-Match": etag}).status_code == 304
+
+    client.post("/api/jobs/progress", json={"job_id": job_id, "progress": 60})
+    second = client.get("/api/jobs", params={"range": "all"}, headers={"If-None-Match": etag})
+    assert second.status_code == 200 and second.headers["etag"] != etag
+    [job] = [job for job in second.json()["jobs"] if job["id"] == job_id]
+    assert job["progress"] == 60.0
+
+
+SHUTDOWN_SCRIPT = """
+from fastapi.testclient import TestClient
+from app import main
+
+with TestClient(main.app) as client:
+    job_id = client.post("/api/jobs/start", json={"job_name": "shutdown", "scope": "all", "triggered_by": "pytest"}).json()["job_id"]
+    client.post("/api/jobs/progress", json={"job_id": job_id, "progress": 42})
+print(job_id)
+"""
+
+
+def test_shutdown_writes_cached_progress(tmp_path):
+    path = tmp_path / "shutdown.db"
+    # The periodic flush never runs in time; only the shutdown flush can store it.
+    env = dict(os.environ, DATABASE_URL=f"sqlite:///{path}", EVENT_BUS="local", JOB_PROGRESS_FLUSH_MS="600000")
+    result = subprocess.run([sys.executable, "-c", SHUTDOWN_SCRIPT], cwd=BACKEND_DIR, env=env, check=True,
+                            capture_output=True, text=True)
+    job_id = int(result.stdout.strip().splitlines()[-1])
+    with sqlite3.connect(path) as conn:
+        assert conn.execute("SELECT progress FROM jobs WHERE id = ?", (job_id,)).fetchone() == (42.0,)
@@ -0,0 +1,73 @@
+import pytest
+
+from app import main
+from conftest import complete_job, drain_writer, post_lines, start_job
+
+
+def search(client, **params):
+    response = client.get("/api/logs/search", params={"range": "all", **params})
+    assert response.status_code == 200
+    return response.json()
+
+
+def test_search_finds_live_and_archived_lines(client):
+    if not main.LOG_SEARCH_FTS:
+        pytest.skip("needs FTS5")
+    archived = start_job(client, "search-archived")
+    post_lines(client, archived, 120, "zebrafish")
+    complete_job(client, archived)
+    live = start_job(client, "search-live")
+    post_lines(client, live, 3, "zebrafish")
+    drain_writer()
+
+    body = search(client, q="zebrafish", limit=500)
+    job_ids = [r["job_id"] for r in body["results"]]
+    assert job_ids.count(archived) == 120
+    assert job_ids.count(live) == 3
+    ids = [r["id"] for r in body["results"]]
+    assert ids == sorted(ids, reverse=True)
+    assert all("<mark>zebrafish</mark>" in r["snippet"] for r in body["results"])
+
+    # job_id narrows the search to that job, including its log partition.
+    body = search(client, q="zebrafish 7", job_id=archived)
+    assert {r["job_id"] for r in body["results"]} == {archived}
+    assert {r["snippet"] for r in body["results"]} == {"<mark>zebrafish</mark> <mark>7</mark>"}
+
+
+def test_search_escapes_log_text(client):
+    if not main.LOG_SEARCH_FTS:
+        pytest.skip("needs FTS5")
+    job_id = start_job(client, "search-escape")
+    message = '<img src=x onerror="alert(1)"> okapi & co'
+    client.post("/api/jobs/logs/batch", json={"job_id": job_id, "lines": [{"message": message}]})
+    drain_writer()
+
+    [hit] = search(client, q="okapi", job_id=job_id)["results"]
+    assert "<img" not in hit["snippet"]
+    assert "&lt;img" in hit["snippet"] and "&amp; co" in hit["snippet"]
+    assert "<mark>okapi</mark>" in hit["snippet"]
+
+    [hit] = search(client, q="okapi", job_id=job_id, highlight_start="[", highlight_end="]")["results"]
+    assert "[okapi]" in hit["snippet"] and "<mark>" not in hit["snippet"]
+
+
+def test_search_treats_terms_literally(client):
+    if not main.LOG_SEARCH_FTS:
+        pytest.skip("needs FTS5")
+    job_id = start_job(client, "search-literal")
+    lines = [{"message": 'ok: [web1] => {"changed": false}'}, {"message": "failed: [web2] NOT OR"}]
+    client.post("/api/jobs/logs/batch", json={"job_id": job_id, "lines": lines})
+    drain_writer()
+
+    # FTS5 operators and punctuation are quoted rather than parsed.
+    assert len(search(client, q="[web1] =>", job_id=job_id)["results"]) == 1
+    assert len(search(client, q='NOT "changed', job_id=job_id)["results"]) == 0
+    assert len(search(client, q="NOT OR", job_id=job_id)["results"]) == 1
+
+
+def test_bad_raw_query_is_rejected(client):
+    if not main.LOG_SEARCH_FTS:
+        pytest.skip("needs FTS5")
+    response = client.get("/api/logs/search", params={"q": '"unterminated', "raw": "true"})
+    assert response.status_code == 400
+    assert response.json()["error"].startswith("invalid search query")
@@ -0,0 +1,79 @@
+import random
+
+import pytest
+from sqlalchemy import select
+
+from app import main
+from conftest import drain_writer, start_job
+
+
+def rollups(job_name: str) -> dict[str, tuple[int, int]]:
+    with main.ReadSession() as db:
+        rows = db.execute(
+            select(main.JobRollup.status, main.JobRollup.jobs, main.JobRollup.duration_count)
+            .where(main.JobRollup.dimension == "job_name", main.JobRollup.key == job_name)
+        ).all()
+    return {r.status: (r.jobs, r.duration_count) for r in rows}
+
+
+def complete(client, job_id: int, status: str):
+    assert client.post("/api/jobs/complete", json={"job_id": job_id, "status": status}).status_code == 200
+    drain_writer()
+
+
+def test_sketch_quantiles_stay_within_the_relative_error():
+    rng = random.Random(20)
+    values = [rng.uniform(0.5, 5000) for _ in range(5000)]
+    sketch = main.DurationSketch()
+    for value in values:
+        sketch.add(value)
+    ordered = sorted(values)
+    for q in (0.5, 0.95):
+        exact = ordered[int(q * (len(ordered) - 1))]
+        assert sketch.quantile(q) == pytest.approx(exact, rel=0.02)
+
+
+def test_sketches_merge_and_round_trip():
+    first, second, whole = main.DurationSketch(), main.DurationSketch(), main.DurationSketch()
+    for value in (0.0, 0.5, 2.0, 30.0):
+        first.add(value)
+        whole.add(value)
+    for value in (0.0001, 7.0, 600.0):
+        second.add(value)
+        whole.add(value)
+    first.merge(main.DurationSketch.loads(second.dumps()))
+    assert (first.bins, first.zeros, first.count) == (whole.bins, whole.zeros, 7)
+    assert first.quantile(0.0) == 0.0
+    assert main.DurationSketch().quantile(0.5) is None
+
+
+def test_completion_moves_the_job_between_rollup_statuses(client):
+    job_id = start_job(client, "rollup-complete")
+    drain_writer()
+    assert rollups("rollup-complete") == {"running": (1, 0)}
+
+    complete(client, job_id, "success")
+    assert rollups("rollup-complete") == {"running": (0, 0), "success": (1, 1)}
+
+    # A second completion changes the status but does not add another duration.
+    complete(client, job_id, "failed")
+    assert rollups("rollup-complete") == {"running": (0, 0), "success": (0, 1), "failed": (1, 0)}
+
+
+def test_stats_group_by_job_name_and_scope(client):
+    for status in ("success", "success", "failed"):
+        job_id = client.post("/api/jobs/start", json={"job_name": "stats-grouped", "scope": "stats-scope", "triggered_by": "pytest"}).json()["job_id"]
+        complete(client, job_id, status)
+
+    body = client.get("/api/stats", params={"range": "24h", "group_by": "job_name", "limit": 500}).json()
+    [group] = [g for g in body["groups"] if g["job_name"] == "stats-grouped"]
+    assert group["total"] == 3 and group["by_status"] == {"failed": 1, "success": 2}
+    assert group["duration"]["count"] == 3 and group["duration"]["p95"] is not None
+
+    body = client.get("/api/stats", params={"range": "24h", "group_by": "scope", "limit": 500}).json()
+    [group] = [g for g in body["groups"] if g["scope"] == "stats-scope"]
+    assert group["total"] == 3
+
+    overall = client.get("/api/stats", params={"range": "24h"}).json()
+    assert overall["total"] >= 3 and "groups" not in overall
+    assert client.get("/api/stats", params={"group_by": "host"}).status_code == 422
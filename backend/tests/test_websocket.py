@@ -0,0 +1,66 @@
+from app import main
+from conftest import post_lines, start_job
+
+
+def receive_until(ws, kind: str, limit: int = 50) -> dict:
+    for _ in range(limit):
+        frame = ws.receive_json()
+        if frame.get("type") == kind:
+            return frame
+    raise AssertionError(f"no {kind} frame")
+
+
+def test_hello_then_live_events(client):
+    with client.websocket_connect("/ws?topics=jobs") as ws:
+        hello = ws.receive_json()
+        assert hello["type"] == "hello" and hello["epoch"] == main.manager.epoch
+        job_id = start_job(client, "ws-live")
+        frame = receive_until(ws, "job_start")
+        assert frame["job"]["id"] == job_id and frame["seq"] > hello["seq"]
+
+
+def frame_job_id(frame: dict) -> int:
+    if "job" in frame:
+        return frame["job"]["id"]
+    if "log" in frame:
+        return frame["log"]["job_id"]
+    raise AssertionError(f"unexpected frame {frame}")
+
+
+def test_job_topic_only_receives_that_job(client):
+    watched = start_job(client, "ws-watched")
+    other = start_job(client, "ws-other")
+    with client.websocket_connect(f"/ws?topics=job:{watched}") as ws:
+        assert ws.receive_json()["type"] == "hello"
+        post_lines(client, other, 3)
+        client.post("/api/jobs/progress", json={"job_id": other, "progress": 50, "message": "other line"})
+        client.post("/api/jobs/complete", json={"job_id": other, "status": "success"})
+        post_lines(client, watched, 3)
+        client.post("/api/jobs/complete", json={"job_id": watched, "status": "success"})
+        frames = []
+        while not frames or frames[-1]["type"] != "job_complete":
+            frames.append(ws.receive_json())
+    assert {frame_job_id(frame) for frame in frames} == {watched}
+    assert [frame["type"] for frame in frames] == ["job_log_batch", "job_complete"]
+
+
+def test_resume_replays_missed_events(client):
+    with client.websocket_connect("/ws?topics=jobs") as ws:
+        hello = ws.receive_json()
+    missed = start_job(client, "ws-missed")
+    query = f"/ws?topics=jobs&since={hello['seq']}&epoch={hello['epoch']}"
+    with client.websocket_connect(query) as ws:
+        resumed = ws.receive_json()
+        assert resumed == {"type": "hello", "seq": hello["seq"], "epoch": hello["epoch"], "resumed": True}
+        frame = receive_until(ws, "job_start")
+        assert frame["job"]["id"] == missed and frame["seq"] == hello["seq"] + 1
+
+
+def test_unknown_epoch_gets_a_snapshot(client):
+    running = start_job(client, "ws-snapshot")
+    with client.websocket_connect("/ws?topics=jobs&since=1&epoch=stale") as ws:
+        hello = ws.receive_json()
+        assert hello["type"] == "hello" and hello["resumed"] is False
+        snapshot = ws.receive_json()
+        assert snapshot["type"] == "snapshot" and snapshot["seq"] == hello["seq"]
+        assert running in {job["id"] for job in snapshot["jobs"]}
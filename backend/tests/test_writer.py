@@ -0,0 +1,82 @@
+import asyncio
+
+import pytest
+from sqlalchemy import select
+
+from app import main
+
+
+@pytest.fixture
+def writer():
+    # A writer of its own with a long group window, so concurrent submits share a group.
+    instance = main.DatabaseWriter(main.SessionLocal, max_batch=64, max_delay=0.2)
+    yield instance
+    instance.stop()
+
+
+def add_job(name: str, calls: list | None = None):
+    def op(db):
+        if calls is not None:
+            calls.append(name)
+        job = main.Job(job_name=name, scope="all", triggered_by="pytest")
+        db.add(job)
+        db.flush()
+        return job.id
+    return op
+
+
+def job_names(ids) -> set[str]:
+    with main.ReadSession() as db:
+        return set(db.scalars(select(main.Job.job_name).where(main.Job.id.in_(ids))))
+
+
+def test_future_resolves_after_commit(client, writer):
+    async def scenario():
+        job_id = await writer.submit(add_job("writer-committed"))
+        # A different connection sees the row as soon as the caller is resumed.
+        return job_id, job_names([job_id])
+
+    job_id, names = asyncio.run(scenario())
+    assert isinstance(job_id, int)
+    assert names == {"writer-committed"}
+
+
+def test_failed_group_is_replayed_one_by_one(client, writer):
+    calls = []
+
+    def fail(db):
+        calls.append("fail")
+        raise ValueError("bad write")
+
+    async def scenario():
+        return await asyncio.gather(
+            writer.submit(add_job("writer-before", calls)),
+            writer.submit(fail),
+            writer.submit(add_job("writer-after", calls)),
+            return_exceptions=True,
+        )
+
+    before, failed, after = asyncio.run(scenario())
+    assert isinstance(failed, ValueError)
+    assert job_names([before, after]) == {"writer-before", "writer-after"}
+    # The group ran up to the failure, rolled back, then every op ran on its own.
+    assert calls == ["writer-before", "fail", "writer-before", "fail", "writer-after"]
+
+
+def test_ops_run_in_submission_order(client, writer):
+    order = []
+
+    def record(n):
+        def op(db):
+            order.append(n)
+            return n
+        return op
+
+    async def scenario():
+        for n in range(5):
+            writer.enqueue(record(n))
+        return await asyncio.gather(*(writer.submit(record(n)) for n in range(5, 20)))
+
+    results = asyncio.run(scenario())
+    assert results == list(range(5, 20))
+    assert order == list(range(20))
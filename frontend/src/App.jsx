@@ -126,6 +126,30 @@ function computeProgressPercent(job) {
   return value
 }
 
+const LOG_PAGE_SIZE = 1000
+
+// Append incoming log entries, skipping ids we already hold and keeping id order
+// when live events and paged history interleave.
+function mergeLogEntries(existing, incoming) {
+  if (!incoming.length) return existing
+  const last = existing.length ? existing[existing.length - 1] : null
+  const lastId = last && last.id != null ? last.id : null
+  if (lastId == null || incoming.every(entry => entry && entry.id != null && entry.id > lastId)) {
+    return [...existing, ...incoming.filter(Boolean)]
+  }
+  const seen = new Set()
+  existing.forEach(entry => {
+    if (entry && entry.id != null) seen.add(entry.id)
+  })
+  const fresh = incoming.filter(entry => entry && (entry.id == null || !seen.has(entry.id)))
+  if (!fresh.length) return existing
+  const merged = [...existing, ...fresh]
+  if (merged.every(entry => entry.id != null)) {
+    merged.sort((a, b) => a.id - b.id)
+  }
+  return merged
+}
+
 function formatDuration(startIso, endIso) {
   if (!startIso) return '—'
   const start = new Date(startIso)
@@ -157,11 +181,21 @@ export default function App() {
   const [error, setError] = useState(null)
   const [logsError, setLogsError] = useState(null)
   const [scopeFilter, setScopeFilter] = useState('')
+  const [resyncToken, setResyncToken] = useState(0)
+  const [stats, setStats] = useState(null)
+  const [statsToken, setStatsToken] = useState(0)
 
   const wsRef = useRef(null)
   const reconnectTimerRef = useRef(null)
   const logsContainerRef = useRef(null)
   const selectedJobRef = useRef(null)
+  const subscribedJobRef = useRef(null)
+  const resyncPendingRef = useRef(false)
+  const lastSeqRef = useRef(null)
+  const jobsRef = useRef({})
+  const epochRef = useRef(null)
+  const statsTimerRef = useRef(null)
+  const jobsSyncRef = useRef({ range: null, cursor: null })
 
   const connectWebSocket = useCallback(() => {
     if (wsRef.current) {
@@ -172,12 +206,64 @@ export default function App() {
       }
     }
     const protocol = window.location.protocol === 'https:' ? 'wss' : 'ws'
-    const ws = new WebSocket(`${protocol}://${window.location.host}/ws`)
-    ws.onopen = () => ws.send('hello')
+    // Only receive the job list feed plus logs for the job being viewed, and
+    // resume from the last event we saw so the server replays the gap.
+    const topics = ['jobs']
+    if (selectedJobRef.current != null) topics.push(`job:${selectedJobRef.current}`)
+    subscribedJobRef.current = selectedJobRef.current
+    let query = `?topics=${encodeURIComponent(topics.join(','))}`
+    if (lastSeqRef.current != null && epochRef.current && !resyncPendingRef.current) {
+      query += `&since=${lastSeqRef.current}&epoch=${encodeURIComponent(epochRef.current)}`
+    }
+    const ws = new WebSocket(`${protocol}://${window.location.host}/ws${query}`)
+    ws.onopen = () => {
+      if (subscribedJobRef.current !== selectedJobRef.current) {
+        // The selection changed while the socket was connecting.
+        if (subscribedJobRef.current != null) {
+          ws.send(JSON.stringify({ action: 'unsubscribe', topics: [`job:${subscribedJobRef.current}`] }))
+        }
+        if (selectedJobRef.current != null) {
+          ws.send(JSON.stringify({ action: 'subscribe', topics: [`job:${selectedJobRef.current}`] }))
+        }
+        subscribedJobRef.current = selectedJobRef.current
+      }
+      if (resyncPendingRef.current) {
+        // We were dropped as a slow consumer and missed events: refetch state.
+        resyncPendingRef.current = false
+        setResyncToken(token => token + 1)
+      }
+    }
     ws.onmessage = event => {
       try {
         const msg = JSON.parse(event.data)
-        if (msg.type === 'job_start' || msg.type === 'job_progress' || msg.type === 'job_complete') {
+        if (typeof msg.seq === 'number' && (lastSeqRef.current == null || msg.seq > lastSeqRef.current)) {
+          lastSeqRef.current = msg.seq
+        }
+        if (msg.type === 'hello') {
+          epochRef.current = msg.epoch
+          lastSeqRef.current = msg.seq
+        } else if (msg.type === 'snapshot') {
+          // The gap was too old to replay: take the server's view of active jobs.
+          const incoming = Array.isArray(msg.jobs) ? msg.jobs : []
+          const ids = new Set(incoming.map(job => job && job.id))
+          // A job we still show as running but the server no longer lists finished
+          // too long ago for the snapshot, so fall back to a full reload.
+          const stale = Object.values(jobsRef.current).some(
+            job => job && canonicalStatus(job.status) === 'running' && !ids.has(job.id)
+          )
+          setJobs(prev => {
+            const next = { ...prev }
+            incoming.forEach(job => {
+              if (job && job.id != null) next[job.id] = job
+            })
+            return next
+          })
+          if (stale) {
+            setResyncToken(token => token + 1)
+          } else if (selectedJobRef.current != null) {
+            openJob(selectedJobRef.current)
+          }
+        } else if (msg.type === 'job_start' || msg.type === 'job_progress' || msg.type === 'job_complete') {
           const job = msg.job
           if (job && job.id != null) {
             setJobs(prev => {
@@ -186,10 +272,32 @@ export default function App() {
               return next
             })
           }
+          if (msg.type !== 'job_progress' && !statsTimerRef.current) {
+            // Starts and completions change the metric cards; refetch them at most once a second.
+            statsTimerRef.current = setTimeout(() => {
+              statsTimerRef.current = null
+              setStatsToken(token => token + 1)
+            }, 1000)
+          }
+        } else if (msg.type === 'resync') {
+          resyncPendingRef.current = true
         } else if (msg.type === 'job_log') {
           const logEntry = msg.log
           if (logEntry && selectedJobRef.current && logEntry.job_id === selectedJobRef.current) {
-            setLogs(prev => [...prev, logEntry])
+            setLogs(prev => mergeLogEntries(prev, [logEntry]))
+          }
+        } else if (msg.type === 'job_log_batch') {
+          const job = msg.job
+          if (job && job.id != null) {
+            setJobs(prev => ({ ...prev, [job.id]: job }))
+          }
+          const entries = Array.isArray(msg.logs) ? msg.logs : []
+          const selected = selectedJobRef.current
+          if (selected != null && entries.length) {
+            const matching = entries.filter(entry => entry && entry.job_id === selected)
+            if (matching.length) {
+              setLogs(prev => mergeLogEntries(prev, matching))
+            }
           }
         }
       } catch (error) {
@@ -210,13 +318,20 @@ export default function App() {
     wsRef.current = ws
   }, [])
 
-  useEffect(() => { loadJobs(range) }, [range])
+  useEffect(() => { loadJobs(range) }, [range, resyncToken])
+
+  useEffect(() => { loadStats(range) }, [range, resyncToken, statsToken])
+
+  useEffect(() => {
+    if (resyncToken && selectedJobRef.current != null) openJob(selectedJobRef.current)
+  }, [resyncToken])
 
   useEffect(() => {
     connectWebSocket()
     return () => {
       if (wsRef.current) wsRef.current.close()
       if (reconnectTimerRef.current) clearTimeout(reconnectTimerRef.current)
+      if (statsTimerRef.current) clearTimeout(statsTimerRef.current)
     }
   }, [connectWebSocket])
 
@@ -224,6 +339,24 @@ export default function App() {
     selectedJobRef.current = selectedJob
   }, [selectedJob])
 
+  useEffect(() => {
+    jobsRef.current = jobs
+  }, [jobs])
+
+  useEffect(() => {
+    const ws = wsRef.current
+    if (!ws || ws.readyState !== WebSocket.OPEN) return
+    const previous = subscribedJobRef.current
+    if (previous === selectedJob) return
+    if (previous != null) {
+      ws.send(JSON.stringify({ action: 'unsubscribe', topics: [`job:${previous}`] }))
+    }
+    if (selectedJob != null) {
+      ws.send(JSON.stringify({ action: 'subscribe', topics: [`job:${selectedJob}`] }))
+    }
+    subscribedJobRef.current = selectedJob
+  }, [selectedJob])
+
   useEffect(() => {
     setScopeFilter('')
   }, [selectedJob])
@@ -247,8 +380,13 @@ export default function App() {
 
   async function loadJobs(r) {
     setIsLoading(true)
+    // Refreshes of the same range only fetch jobs changed since the last load.
+    const sync = jobsSyncRef.current
+    const incremental = sync.range === r && sync.cursor != null
     try {
-      const res = await fetch(`${API_BASE}/api/jobs?range=${encodeURIComponent(r)}`)
+      let url = `${API_BASE}/api/jobs?range=${encodeURIComponent(r)}`
+      if (incremental) url += `&updated_since=${encodeURIComponent(sync.cursor)}`
+      const res = await fetch(url)
       if (!res.ok) {
         throw new Error(`Request failed with status ${res.status}`)
       }
@@ -259,6 +397,12 @@ export default function App() {
           map[job.id] = job
         }
       })
+      jobsSyncRef.current = { range: r, cursor: data.updated_cursor ?? null }
+      if (incremental) {
+        setJobs(prev => ({ ...prev, ...map }))
+        setError(null)
+        return
+      }
       setJobs(map)
       setError(null)
       setPage(0)
@@ -275,6 +419,20 @@ export default function App() {
     }
   }
 
+  async function loadStats(r) {
+    try {
+      const res = await fetch(`${API_BASE}/api/stats?range=${encodeURIComponent(r)}`)
+      if (!res.ok) {
+        throw new Error(`Request failed with status ${res.status}`)
+      }
+      setStats(await res.json())
+    } catch (err) {
+      // Older backends have no /api/stats; the cards fall back to the loaded job list.
+      console.error('Failed to load stats', err)
+      setStats(null)
+    }
+  }
+
   async function openJob(jobId) {
     setSelectedJob(jobId)
     selectedJobRef.current = jobId
@@ -284,12 +442,20 @@ export default function App() {
     if (jobId == null) return
     setIsLogsLoading(true)
     try {
-      const res = await fetch(`${API_BASE}/api/jobs/${jobId}/logs?limit=0`)
-      if (!res.ok) {
-        throw new Error(`Request failed with status ${res.status}`)
-      }
-      const data = await res.json()
-      setLogs(data.logs || [])
+      // Page through the history with the id cursor so each request stays small
+      // and the first lines render before the whole log has arrived.
+      let cursor = null
+      do {
+        const cursorParam = cursor != null ? `&after_id=${encodeURIComponent(cursor)}` : ''
+        const res = await fetch(`${API_BASE}/api/jobs/${jobId}/logs?limit=${LOG_PAGE_SIZE}${cursorParam}`)
+        if (!res.ok) {
+          throw new Error(`Request failed with status ${res.status}`)
+        }
+        const data = await res.json()
+        if (selectedJobRef.current !== jobId) return
+        setLogs(prev => mergeLogEntries(prev, data.logs || []))
+        cursor = data.next_cursor ?? null
+      } while (cursor != null)
       setLogsError(null)
     } catch (err) {
       console.error('Failed to load logs', err)
@@ -328,30 +494,32 @@ export default function App() {
 
   const metrics = useMemo(() => {
     const summary = { total: 0, running: 0, success: 0, failed: 0, pending: 0, successRate: 0 }
-    const values = Object.values(jobs)
-    if (!values.length) return summary
-    values.forEach(job => {
-      const key = canonicalStatus(job.status)
+    // Server-side rollups for the range; the job list is only counted when they are unavailable.
+    const counts = stats && stats.by_status
+      ? Object.entries(stats.by_status)
+      : Object.values(jobs).map(job => [job.status, 1])
+    counts.forEach(([status, count]) => {
+      const key = canonicalStatus(status)
       switch (key) {
         case 'running':
-          summary.running += 1
+          summary.running += count
           break
         case 'success':
-          summary.success += 1
+          summary.success += count
           break
         case 'failed':
-          summary.failed += 1
+          summary.failed += count
           break
         case 'pending':
         default:
-          summary.pending += 1
+          summary.pending += count
           break
       }
+      summary.total += count
     })
-    summary.total = values.length
     summary.successRate = summary.total ? Math.round((summary.success / summary.total) * 100) : 0
     return summary
-  }, [jobs])
+  }, [jobs, stats])
 
   const effectivePageSize = pageSize > 0 ? pageSize : sortedJobs.length || 1
   const pageCount = Math.max(1, Math.ceil(sortedJobs.length / effectivePageSize))
@@ -419,20 +587,12 @@ export default function App() {
 
   function downloadLogs() {
     if (selectedJob == null || !logs.length) return
-    const text = logs
-      .map(entry => {
-        const ts = formatLocal(entry.ts || entry.timestamp)
-        const level = (entry.level || 'info').toUpperCase()
-        return `[${ts}] [${level}] ${entry.message || ''}`
-      })
-      .join('\n')
-    const blob = new Blob([text], { type: 'text/plain;charset=utf-8' })
-    const url = URL.createObjectURL(blob)
+    // The backend streams the full log from the database, so the browser never
+    // has to assemble a giant string from the in-memory view.
     const anchor = document.createElement('a')
-    anchor.href = url
-    anchor.download = `job-${selectedJob}-logs.txt`
+    anchor.href = `${API_BASE}/api/jobs/${selectedJob}/logs/download?format=text`
+    anchor.download = `job-${selectedJob}-logs.log`
     anchor.click()
-    URL.revokeObjectURL(url)
   }
 
   async function copyLogs() {